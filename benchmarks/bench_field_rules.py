@@ -0,0 +1,265 @@
+"""
+Micro-benchmark das regras de extração de campos (src/field_rules.py).
+
+Mede o tempo de cada regra sobre um conjunto de textos e, com --compare,
+confere se a saída é idêntica à da implementação original (regex montadas a
+cada chamada) e quanto tempo ela levava.
+
+Uso:
+    python benchmarks/bench_field_rules.py --input data/processed_data/metadados_extraidos.jsonl
+    python benchmarks/bench_field_rules.py --synthetic 500 --compare
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from field_rules import FIELD_RULES, extract_fields  # noqa: E402
+from full_text_store import FullTextStore, REF_FIELD, TEXT_FIELD  # noqa: E402
+from record_io import iter_records  # noqa: E402
+
+DEFAULT_INPUT = os.path.join("data", "processed_data", "metadados_extraidos.jsonl")
+
+
+# =========================
+# IMPLEMENTAÇÃO ORIGINAL (referência)
+# =========================
+
+def legacy_extract_fields(full_text, filename):
+    """Cópia das regras como estavam em extract_metadata() antes do field_rules."""
+    metadata = {}
+
+    lines = [line.strip() for line in full_text.split('\n') if line.strip()]
+    text_normalized = ' '.join(lines)  # noqa: F841 (calculado e não usado no original)
+
+    proc_regex = r"\d{7}-\d{2}\.\d{4}\.\d\.\d{2}\.\d{4}"
+    proc = re.search(proc_regex, full_text)
+    if proc:
+        metadata["processo"] = proc.group(0)
+    else:
+        proc_filename = re.search(proc_regex, filename)
+        if proc_filename:
+            metadata["processo"] = proc_filename.group(0)
+
+    nt_regex = r"(?:Nota\s+T[ée]cnica|Parecer|Parecer\s+T[ée]cnico)\s*(?:n[º°\.]?|número)?\s*(\d+(?:[./-]\d{4})?)"
+    nt = re.search(nt_regex, full_text[:2000], re.IGNORECASE)
+    if nt:
+        metadata["n_nota_tecnica"] = nt.group(1)
+    else:
+        nt_filename = re.match(r"^(\d+)\s", filename)
+        if nt_filename:
+            metadata["n_nota_tecnica"] = nt_filename.group(1)
+
+    cid_regexes = [
+        r"CID(?:-10)?\s*[:\-]?\s*([A-Z]\d{2}(?:\.?\d{1})?)",
+        r"CID\s*[:\-]?\s*([A-Z]\s?\d{2}(?:\.?\d{1})?)",
+        r"Diagnóstico.*([A-Z]\d{2}(?:\.\d{1})?)",
+    ]
+    for regex in cid_regexes:
+        cid_match = re.search(regex, full_text, re.IGNORECASE | re.DOTALL)
+        if cid_match:
+            metadata["cid"] = cid_match.group(1).replace(" ", "")
+            break
+
+    assunto_regex = r"Assunto\s*[:\-]\s*(.*?)(?=(?:I\s*[\-\)]|1\.|DA IDENTIFICAÇÃO|DA CONSULTA|DADOS DO PROCESSO|$))"
+    assunto_match = re.search(assunto_regex, full_text, re.IGNORECASE | re.DOTALL)
+    if assunto_match:
+        assunto_limpo = assunto_match.group(1).strip().replace('\n', ' ')
+        metadata["Assunto"] = assunto_limpo[:500] if len(assunto_limpo) > 500 else assunto_limpo
+
+    termos_objeto = ["Solicita", "Requer", "Prescrição", "Medicamento", "Fármaco", "Procedimento"]
+    for termo in termos_objeto:
+        obj_match = re.search(fr"{termo}(?:ção)?\s*[:\-]?\s*([^.;\n]*?[a-zA-Z]{{3,}}[^.;\n]*)", full_text, re.IGNORECASE)
+        if obj_match:
+            possivel_objeto = obj_match.group(1).strip()
+            if len(possivel_objeto) > 3 and "..." not in possivel_objeto:
+                if metadata.get("objeto") is None:
+                    metadata["objeto"] = possivel_objeto
+                elif possivel_objeto not in metadata["objeto"]:
+                    metadata["objeto"] += f" | {possivel_objeto}"
+
+    conclusao_regex = r"(?:V\)|IV\)|Conclusão|Considerações Finais)\s*[:\-]?\s*(.*?)(?:Goiânia|Este é o parecer|$)"
+    conclusao_match = re.search(conclusao_regex, full_text, re.IGNORECASE | re.DOTALL)
+    if conclusao_match:
+        texto_conclusao = conclusao_match.group(1).lower()
+        if "favorável" in texto_conclusao and "desfavorável" not in texto_conclusao:
+            metadata["desfecho"] = "Favorável"
+        elif "desfavorável" in texto_conclusao:
+            metadata["desfecho"] = "Desfavorável"
+        elif "parcialmente" in texto_conclusao:
+            metadata["desfecho"] = "Parcialmente Favorável"
+        else:
+            metadata["desfecho"] = "Inconclusivo / Não Identificado Explicitamente"
+    else:
+        if "favorável" in full_text[-2000:].lower():
+            metadata["desfecho"] = "Favorável (Inferido)"
+
+    data_regex = r"Goiânia(?:-GO)?\s*,?\s*(\d{1,2})\s*de\s*([A-Za-zç]+)\s*de\s*(\d{4})"
+    datas_encontradas = re.findall(data_regex, full_text, re.IGNORECASE)
+    if datas_encontradas:
+        dia, mes, ano = datas_encontradas[-1]
+        metadata["data_do_envio"] = f"{dia} de {mes} de {ano}"
+
+    return metadata
+
+
+# =========================
+# TEXTOS DE ENTRADA
+# =========================
+
+MESES = ["janeiro", "fevereiro", "março", "abril", "maio", "junho", "julho",
+         "agosto", "setembro", "outubro", "novembro", "dezembro"]
+
+FILLER = ("O paciente apresenta quadro clínico compatível com a patologia descrita, "
+          "com indicação de tratamento conforme protocolo clínico e diretrizes terapêuticas. ")
+
+
+def synthetic_text(rng, pages):
+    """Texto no formato de uma NT/Parecer, com variações que exercitam todas as regras."""
+    parts = []
+    if rng.random() < 0.9:
+        parts.append(f"NOTA TÉCNICA Nº {rng.randint(1, 999)}/{rng.randint(2019, 2025)}")
+    parts.append(f"Processo nº {rng.randint(10**6, 10**7 - 1)}-{rng.randint(10, 99)}."
+                 f"{rng.randint(2019, 2025)}.8.09.{rng.randint(1000, 9999)}")
+    parts.append(f"Assunto: {rng.choice(['fornecimento de medicamento', 'cirurgia bariátrica', 'home care'])}")
+    parts.append(rng.choice(["I - DA CONSULTA", "DA IDENTIFICAÇÃO", "1. Relatório"]))
+    if rng.random() < 0.3:
+        # Diagnóstico sem "CID:" -> cai no terceiro padrão
+        parts.append("Diagnóstico: neoplasia maligna")
+    else:
+        parts.append(f"CID-10: {rng.choice('CEGJMF')}{rng.randint(0, 99):02d}.{rng.randint(0, 9)}")
+    parts.append(f"Solicita: {rng.choice(['pembrolizumabe 200 mg', 'insulina glargina', 'exame oncotype'])}")
+    if rng.random() < 0.5:
+        parts.append("Prescrição médica: uso contínuo conforme relatório")
+
+    for _ in range(pages):
+        parts.append(FILLER * rng.randint(20, 40))
+        if rng.random() < 0.2:
+            parts.append(f"Referência ao item {rng.choice('ABCD')}{rng.randint(10, 99)} do protocolo.")
+
+    conclusao = rng.choice(["favorável ao pleito", "desfavorável ao pleito",
+                            "parcialmente favorável", "sem elementos suficientes"])
+    if rng.random() < 0.9:
+        parts.append(f"IV) Conclusão: {conclusao}.")
+    parts.append(f"Goiânia, {rng.randint(1, 28)} de {rng.choice(MESES)} de {rng.randint(2019, 2025)}")
+    return "\n".join(parts) + "\n"
+
+
+def load_texts(args):
+    if args.synthetic:
+        rng = random.Random(args.seed)
+        return [(f"{i:04d} N.T sintetica.pdf", synthetic_text(rng, rng.choice([1, 3, 8, 20])))
+                for i in range(args.synthetic)]
+
+    if not os.path.exists(args.input):
+        sys.exit(f"Arquivo não encontrado: {args.input} (use --synthetic N para textos gerados)")
+
+    texts = []
+    store = None
+    for record in iter_records(args.input):
+        text = record.get(TEXT_FIELD)
+        if text is None and record.get(REF_FIELD):
+            # Texto no store inteiro_teor/ ao lado do arquivo de entrada
+            if store is None:
+                store = FullTextStore(os.path.join(os.path.dirname(os.path.abspath(args.input)), "inteiro_teor"))
+            text = store.get_text(record[REF_FIELD])
+        texts.append((record.get("source_filename") or "", text or ""))
+        if args.limit and len(texts) >= args.limit:
+            break
+    if store is not None:
+        store.close()
+    return texts
+
+
+# =========================
+# MEDIÇÃO
+# =========================
+
+def run(texts, repeat):
+    timings = {}
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for filename, text in texts:
+            extract_fields(text, filename, timings)
+    total = time.perf_counter() - start
+    return total, timings
+
+
+def run_legacy(texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for filename, text in texts:
+            legacy_extract_fields(text, filename)
+    return time.perf_counter() - start
+
+
+def compare(texts):
+    mismatches = []
+    for filename, text in texts:
+        expected = legacy_extract_fields(text, filename)
+        got = extract_fields(text, filename)
+        if expected != got:
+            mismatches.append((filename, expected, got))
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", default=DEFAULT_INPUT, help="JSON ou JSONL com inteiro_teor")
+    parser.add_argument("--limit", type=int, help="Máximo de documentos lidos do --input")
+    parser.add_argument("--synthetic", type=int, help="Usa N textos sintéticos em vez do --input")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--compare", action="store_true",
+                        help="Confere a saída e o tempo contra a implementação original")
+    parser.add_argument("--output", help="Salva os resultados em JSON")
+    args = parser.parse_args()
+
+    texts = load_texts(args)
+    n_docs = len(texts) * args.repeat
+    total_chars = sum(len(t) for _, t in texts)
+    print(f"{len(texts)} documentos, {total_chars / 1e6:.1f} M caracteres, {args.repeat} repetições")
+
+    total, timings = run(texts, args.repeat)
+
+    print("")
+    print(f"{'Campo':<16} {'Total (ms)':>12} {'µs/doc':>10} {'%':>7}")
+    results = {"documents": len(texts), "repeat": args.repeat, "chars": total_chars, "fields": {}}
+    rows = [(name, region) for name, _rule, region in FIELD_RULES] + [("_lower", "preparo")]
+    for name, region in rows:
+        t = timings.get(name, 0.0)
+        share = t / total * 100 if total else 0
+        print(f"{name:<16} {t * 1000:>12.1f} {t / n_docs * 1e6:>10.1f} {share:>6.1f}%")
+        results["fields"][name] = {"region": region, "seconds": t, "us_per_doc": t / n_docs * 1e6}
+    print(f"{'TOTAL':<16} {total * 1000:>12.1f} {total / n_docs * 1e6:>10.1f}")
+    results["total_seconds"] = total
+
+    if args.compare:
+        legacy_total = run_legacy(texts, args.repeat)
+        mismatches = compare(texts)
+        speedup = legacy_total / total if total else 0
+        print("")
+        print(f"Implementação original: {legacy_total * 1000:.1f} ms ({speedup:.1f}x mais lenta)")
+        print(f"Divergências de saída: {len(mismatches)}")
+        for filename, expected, got in mismatches[:10]:
+            diff = {k: (expected.get(k), got.get(k)) for k in set(expected) | set(got) if expected.get(k) != got.get(k)}
+            print(f"  {filename}: {diff}")
+        results["legacy_total_seconds"] = legacy_total
+        results["mismatches"] = len(mismatches)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+        print(f"\nResultados salvos em {args.output}")
+
+    if args.compare and results["mismatches"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Compara os perfis de índice do 02_index_legacy.py (PERFIS_INDICE) carregando
+o mesmo corpus em cada um:
+
+    ingest    docs/s e MB/s do _bulk, com as mesmas opções de lote e threads
+    store     tamanho do índice em disco depois do force merge (1 segmento)
+    queries   latência (p50/p95, ms) de um conjunto fixo de buscas montadas
+              com search.py, medida no cliente e pelo `took` do Elasticsearch
+
+Precisa de um Elasticsearch de verdade (ELASTICSEARCH_URL): tamanho em disco
+e latência não têm significado no Elasticsearch falso de fake_services.py.
+Cada perfil vai para um índice próprio (natjus_bench_<perfil>), fora do alias
+de produção, apagado no fim a menos que --manter.
+
+Uso:
+    python benchmarks/bench_index_profiles.py --entrada data/processed_data/metadados_com_url.json
+    python benchmarks/bench_index_profiles.py --perfis busca armazenamento --rodadas 50 --output resultados/perfis.json
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from bulk_ingest import bulk_ingest  # noqa: E402
+from generate_report import percentile  # noqa: E402
+from record_io import read_records  # noqa: E402
+from search import SearchQuery, build_aggregates  # noqa: E402
+
+indexer = importlib.import_module("02_index_legacy")
+
+INDEX_PREFIX = "natjus_bench_"
+ROUNDS = 20
+TEXT_TERMS = ["medicamento", "tratamento oncológico", "fornecimento de insulina", "cirurgia bariátrica"]
+
+
+def top_value(table):
+    """Valor mais frequente de uma tabela de agregados, ignorando vazios."""
+    return next((value for value in table if not value.startswith("(")), None)
+
+
+def sample_queries(entrada):
+    """
+    Buscas de referência (nome -> corpo), com valores de filtro tirados do
+    próprio corpus para que todas tenham resultados.
+    """
+    aggregates = build_aggregates(read_records(entrada))
+    cid = top_value(aggregates["por_cid"])
+    desfecho = top_value(aggregates["por_desfecho"])
+    months = [month for month in aggregates["por_mes"] if not month.startswith("(")]
+    nota = next((record.get("n_nota_tecnica") for record in read_records(entrada)
+                 if record.get("n_nota_tecnica")), None)
+    assunto = next((record.get("Assunto") for record in read_records(entrada)
+                    if record.get("Assunto") and len(record["Assunto"]) <= 256), None)
+
+    queries = {f"texto: {term}": SearchQuery(term).body() for term in TEXT_TERMS}
+    if cid:
+        queries["filtro cid"] = SearchQuery(filters={"cid": cid}).body()
+    if desfecho:
+        queries["texto + desfecho"] = SearchQuery(TEXT_TERMS[0], {"desfecho": desfecho}).body()
+    if months:
+        queries["período, por data"] = SearchQuery(date_from=f"{months[0]}-01", date_to=f"{months[-1]}-28",
+                                                   sort="data").body()
+    if nota:
+        queries["n_nota_tecnica.exato"] = {"query": {"term": {"n_nota_tecnica.exato": nota}}, "size": 10}
+    if assunto:
+        queries["Assunto.exato"] = {"query": {"term": {"Assunto.exato": assunto}}, "size": 10}
+    return queries
+
+
+def load_profile(es, perfil, entrada, options):
+    """Cria o índice do perfil, carrega o corpus e deixa o índice pronto para buscas."""
+    name = INDEX_PREFIX + perfil
+    if es.indices.exists(index=name):
+        es.indices.delete(index=name)
+
+    body = indexer.montar_mapping(perfil)
+    body["settings"].update(indexer.CONFIG_CARGA)
+    es.indices.create(index=name, body=body)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        totals = bulk_ingest(es, indexer.gerar_docs(read_records(entrada), indice=name), **options)
+
+    start = time.perf_counter()
+    es.indices.put_settings(index=name, settings={"index": indexer.config_busca(perfil)})
+    es.indices.forcemerge(index=name, max_num_segments=1)
+    es.indices.refresh(index=name)
+    merge_seconds = time.perf_counter() - start
+
+    stats = es.indices.stats(index=name, metric=["store", "docs"])["indices"][name]["primaries"]
+    return name, {
+        "documents": totals["success"],
+        "failed": totals["failed"],
+        "seconds": round(totals["seconds"], 3),
+        "docs_per_second": round(totals["success"] / totals["seconds"], 2) if totals["seconds"] else None,
+        "mb_per_second": round(totals["bytes"] / 1e6 / totals["seconds"], 2) if totals["seconds"] else None,
+        "merge_seconds": round(merge_seconds, 3),
+        "store_mb": round(stats["store"]["size_in_bytes"] / 1e6, 3),
+        "bytes_per_doc": round(stats["store"]["size_in_bytes"] / max(1, stats["docs"]["count"])),
+    }
+
+
+def time_queries(es, name, queries, rounds):
+    results = {}
+    for label, body in queries.items():
+        es.search(index=name, body=body, request_cache=False)   # aquecimento
+        client_ms, took_ms = [], []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            response = es.search(index=name, body=body, request_cache=False)
+            client_ms.append((time.perf_counter() - start) * 1000)
+            took_ms.append(response.get("took", 0))
+        client_ms.sort()
+        took_ms.sort()
+        results[label] = {
+            "hits": response["hits"]["total"]["value"],
+            "p50_ms": round(percentile(client_ms, 50), 2),
+            "p95_ms": round(percentile(client_ms, 95), 2),
+            "took_p50_ms": percentile(took_ms, 50),
+        }
+        if not results[label]["hits"]:
+            # Toda busca de referência usa valores do corpus: sem resultado é
+            # campo mapeado com o nome errado, não latência boa
+            print(f"AVISO: '{label}' não retornou documentos em {name}")
+    return results
+
+
+def print_summary(results):
+    profiles = results["profiles"]
+    print(f"\n{'perfil':<15} {'docs/s':>10} {'MB/s':>8} {'índice MB':>10} {'bytes/doc':>10} {'p50 médio ms':>13}")
+    for perfil, values in profiles.items():
+        queries = values["queries"].values()
+        mean_p50 = sum(query["p50_ms"] for query in queries) / max(1, len(queries))
+        ingest = values["ingest"]
+        print(f"{perfil:<15} {ingest['docs_per_second'] or 0:>10.1f} {ingest['mb_per_second'] or 0:>8.2f} "
+              f"{ingest['store_mb']:>10.2f} {ingest['bytes_per_doc']:>10} {mean_p50:>13.2f}")
+
+    labels = next(iter(profiles.values()))["queries"].keys() if profiles else []
+    for label in labels:
+        row = " | ".join(f"{perfil} {query['p50_ms']:.1f}/{query['p95_ms']:.1f}"
+                         for perfil, query in ((perfil, values["queries"][label])
+                                               for perfil, values in profiles.items()))
+        print(f" {label:<32} p50/p95 ms: {row}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entrada", default=indexer.FILE_JSON_ENTRADA,
+                        help="JSON ou JSONL de entrada da indexação (metadados_com_url.json)")
+    parser.add_argument("--perfis", nargs="+", choices=list(indexer.PERFIS_INDICE),
+                        default=list(indexer.PERFIS_INDICE))
+    parser.add_argument("--rodadas", type=int, default=ROUNDS, help="Execuções de cada busca por perfil")
+    parser.add_argument("--threads", type=int, default=indexer.BULK_THREADS)
+    parser.add_argument("--lote-docs", type=int, default=indexer.BULK_MAX_DOCS)
+    parser.add_argument("--lote-mb", type=float, default=indexer.BULK_MAX_MB)
+    parser.add_argument("--manter", action="store_true", help="Não apaga os índices natjus_bench_* no fim")
+    parser.add_argument("--output", help="Salva os resultados em JSON")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.entrada):
+        sys.exit(f"Entrada não encontrada: {args.entrada}")
+
+    es = indexer.conectar_elastic()
+    if not es:
+        sys.exit(1)
+
+    options = indexer.opcoes_bulk(args.threads, args.lote_docs, args.lote_mb)
+    queries = sample_queries(args.entrada)
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "environment": {"python": platform.python_version(), "elasticsearch": es.info()["version"]["number"]},
+        "params": {key: value for key, value in vars(args).items() if key != "output"},
+        "profiles": {},
+    }
+
+    created = []
+    try:
+        for perfil in args.perfis:
+            print(f"Perfil {perfil}: carregando {args.entrada}...")
+            name, ingest = load_profile(es, perfil, args.entrada, options)
+            created.append(name)
+            print(f"Perfil {perfil}: {len(queries)} buscas x {args.rodadas} rodadas...")
+            results["profiles"][perfil] = {"ingest": ingest, "queries": time_queries(es, name, queries, args.rodadas)}
+    finally:
+        if not args.manter:
+            for name in created:
+                es.indices.delete(index=name)
+
+    print_summary(results)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+        print(f"\nResultados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
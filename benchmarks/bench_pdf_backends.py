@@ -0,0 +1,113 @@
+"""
+Throughput dos backends de texto (src/pdf_backends.py) por modo de páginas.
+
+Para cada combinação backend x modo, extrai o texto de uma amostra de PDFs e
+aplica as regras de campos, reportando documentos/s, páginas/s, MB/s e a
+concordância dos campos com a referência (pdfplumber + window). Assim dá para
+escolher a combinação mais rápida que ainda preserva os metadados do corpus.
+
+Uso:
+    python benchmarks/bench_pdf_backends.py --pdf-dir "data/raw_data/NT e PARECERES" --limit 200
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from field_rules import FIELD_RULES, extract_fields  # noqa: E402
+from pdf_backends import BACKENDS, PAGE_MODES, open_document, select_pages, join_pages  # noqa: E402
+
+DEFAULT_PDF_DIR = os.path.join("data", "raw_data", "NT e PARECERES")
+REFERENCE = ("pdfplumber", "window")
+
+
+def run_combination(pdf_files, backend, page_mode):
+    stats = {"documents": 0, "errors": 0, "pages_total": 0, "pages_parsed": 0,
+             "bytes": 0, "chars": 0, "seconds": 0.0}
+    fields = {}
+
+    for path in pdf_files:
+        name = os.path.basename(path)
+        start = time.perf_counter()
+        try:
+            with open_document(path, backend) as doc:
+                text = join_pages(doc, select_pages(doc, page_mode))
+                stats["pages_total"] += doc.page_count
+                stats["pages_parsed"] += doc.pages_parsed
+            fields[name] = extract_fields(text, name)
+        except Exception:
+            stats["errors"] += 1
+            continue
+        finally:
+            stats["seconds"] += time.perf_counter() - start
+
+        stats["documents"] += 1
+        stats["bytes"] += os.path.getsize(path)
+        stats["chars"] += len(text)
+
+    return stats, fields
+
+
+def agreement(reference, fields):
+    """Percentual de documentos em que cada campo coincide com a referência."""
+    names = [name for name, _rule, _region in FIELD_RULES]
+    common = [doc for doc in reference if doc in fields]
+    if not common:
+        return {}
+    return {name: sum(reference[doc].get(name) == fields[doc].get(name) for doc in common) / len(common) * 100
+            for name in names}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf-dir", default=DEFAULT_PDF_DIR)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--page-modes", nargs="+", default=PAGE_MODES, choices=PAGE_MODES)
+    parser.add_argument("--output", help="Salva os resultados em JSON")
+    args = parser.parse_args()
+
+    pdf_files = sorted(glob.glob(os.path.join(args.pdf_dir, "*.pdf")))[:args.limit]
+    if not pdf_files:
+        sys.exit(f"Nenhum PDF encontrado em {args.pdf_dir}")
+
+    combinations = [REFERENCE] + [(b, m) for b in args.backends for m in args.page_modes if (b, m) != REFERENCE]
+    print(f"{len(pdf_files)} PDFs de {args.pdf_dir}\n")
+    print(f"{'Backend':<11} {'Páginas':<8} {'docs/s':>8} {'pág/s':>8} {'MB/s':>7} "
+          f"{'lidas':>7} {'erros':>6} {'concord.':>9}")
+
+    results = []
+    reference_fields = None
+    for backend, page_mode in combinations:
+        stats, fields = run_combination(pdf_files, backend, page_mode)
+        if reference_fields is None:
+            reference_fields = fields
+
+        seconds = stats["seconds"] or 1e-9
+        agree = agreement(reference_fields, fields)
+        mean_agree = sum(agree.values()) / len(agree) if agree else 0.0
+        read_share = stats["pages_parsed"] / stats["pages_total"] * 100 if stats["pages_total"] else 0.0
+
+        print(f"{backend:<11} {page_mode:<8} {stats['documents'] / seconds:>8.2f} "
+              f"{stats['pages_parsed'] / seconds:>8.1f} {stats['bytes'] / 1e6 / seconds:>7.2f} "
+              f"{read_share:>6.0f}% {stats['errors']:>6} {mean_agree:>8.1f}%")
+
+        results.append({"backend": backend, "page_mode": page_mode, **stats,
+                        "docs_per_second": stats["documents"] / seconds,
+                        "field_agreement": agree})
+
+    print("\n'lidas' = páginas interpretadas / páginas totais; "
+          f"'concord.' = campos iguais aos de {REFERENCE[0]} + {REFERENCE[1]}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+        print(f"Resultados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Benchmark ponta a ponta: extração, normalização de datas, upload e indexação.
+
+Gera um corpus sintético de Notas Técnicas / Pareceres (synthetic_corpus.py),
+sobe um S3 e um Elasticsearch falsos em memória (fake_services.py) e mede,
+com os próprios módulos de src/:
+
+    extraction   extract_metadata (pending_files + process_files + export_outputs),
+                 com a acurácia dos campos em relação ao gabarito do corpus
+    dates        converter_data do indexador, com cache frio e quente
+    upload       processar_arquivos do 01_pre_process (envio e reexecução idempotente)
+    indexing     indexar_dados do 02_index_legacy (--recriar e reexecução incremental)
+
+Tudo roda offline, numa pasta temporária; os dados de produção não são
+tocados. Os resultados vão para JSON (--output) e podem ser comparados com
+uma execução anterior (--baseline).
+
+Uso:
+    python benchmarks/bench_pipeline.py --docs 200 --output resultados/pipeline.json
+    python benchmarks/bench_pipeline.py --corpus-dir /tmp/corpus_natjus --baseline resultados/pipeline.json
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+
+from extraction_cache import ExtractionCache  # noqa: E402
+from fake_services import FakeElasticsearch, FakeS3  # noqa: E402
+from full_text_store import FullTextStore  # noqa: E402
+from normalization import normalize_date, normalize_record  # noqa: E402
+from record_io import JsonlSink, iter_records  # noqa: E402
+from synthetic_corpus import generate_corpus  # noqa: E402
+
+DATE_ROUNDS = 50
+
+# Métrica principal de cada etapa na comparação com --baseline (maior é melhor)
+HEADLINE = {
+    "extraction": "docs_per_second",
+    "dates": "warm_calls_per_second",
+    "upload": "docs_per_second",
+    "indexing": "docs_per_second",
+}
+
+
+def load_modules(raw_dir, processed_dir, s3, es):
+    """
+    Aponta os módulos de src/ para as pastas temporárias e os serviços falsos.
+    As variáveis precisam estar definidas antes do import: os caminhos e
+    endpoints são lidos no carregamento dos módulos.
+    """
+    os.environ["NATJUS_RAW_DATA_DIR"] = raw_dir
+    os.environ["NATJUS_PROCESSED_DATA_DIR"] = processed_dir
+    os.environ["MINIO_ENDPOINT"] = s3.endpoint
+    os.environ["ELASTICSEARCH_URL"] = es.url
+
+    extraction = importlib.import_module("extract_metadata")
+    uploader = importlib.import_module("01_pre_process")
+    indexer = importlib.import_module("02_index_legacy")
+
+    # Só os avisos: um log por PDF distorceria as medições
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("elastic_transport").setLevel(logging.WARNING)
+    return extraction, uploader, indexer
+
+
+def quiet(function, *args, **kwargs):
+    """Executa `function` descartando o que ela imprime; retorna (resultado, segundos)."""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def rate(count, seconds):
+    return round(count / seconds, 2) if seconds else None
+
+
+# =========================
+# ETAPAS
+# =========================
+
+def bench_extraction(extraction, manifest, workers, backend, page_mode):
+    version = extraction.extractor_version(backend, page_mode)
+    cache = ExtractionCache(extraction.CACHE_DB)
+
+    start = time.perf_counter()
+    pdf_files, hashes = extraction.pending_files(cache, version)
+    errors = 0
+    with JsonlSink(extraction.OUTPUT_JSONL) as sink, FullTextStore(extraction.FULL_TEXT_DIR) as full_texts:
+        for _pdf, _data, error in extraction.process_files(cache, pdf_files, hashes, version, sink,
+                                                            workers=workers, full_texts=full_texts,
+                                                            backend=backend, page_mode=page_mode):
+            errors += error is not None
+    extraction.export_outputs()
+    seconds = time.perf_counter() - start
+    cache.close()
+
+    # Acurácia: o gabarito passa pela mesma normalização da extração
+    expected = {doc["source_filename"]: normalize_record(dict(doc)) for doc in manifest}
+    fields = ["processo", "cid", "desfecho", "data_do_envio"]
+    hits = dict.fromkeys(fields, 0)
+    for record in iter_records(extraction.OUTPUT_JSONL):
+        reference = expected.get(record.get("source_filename"), {})
+        for field in fields:
+            hits[field] += record.get(field) == reference.get(field)
+
+    pages = sum(doc["pages"] for doc in manifest)
+    megabytes = sum(os.path.getsize(path) for path in pdf_files) / 1e6
+    return {
+        "documents": len(pdf_files),
+        "pages": pages,
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "docs_per_second": rate(len(pdf_files), seconds),
+        "pages_per_second": rate(pages, seconds),
+        "mb_per_second": rate(megabytes, seconds),
+        "field_accuracy": {field: round(hits[field] / len(manifest) * 100, 1) for field in fields},
+    }
+
+
+def bench_dates(indexer, manifest, rounds=DATE_ROUNDS):
+    values = [doc["data_do_envio"] for doc in manifest if doc["data_do_envio"]]
+    calls = len(values) * rounds
+
+    normalize_date.cache_clear()
+    start = time.perf_counter()
+    for value in values:
+        indexer.converter_data(value)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for value in values:
+            indexer.converter_data(value)
+    warm = time.perf_counter() - start
+
+    return {
+        "values": len(values),
+        "unique_values": len(set(values)),
+        "cold_seconds": round(cold, 6),
+        "cold_calls_per_second": rate(len(values), cold),
+        "warm_calls": calls,
+        "warm_seconds": round(warm, 6),
+        "warm_calls_per_second": rate(calls, warm),
+    }
+
+
+def bench_upload(extraction, uploader, s3, workers):
+    entrada = extraction.OUTPUT_JSONL
+    documents = sum(1 for _ in iter_records(entrada))
+
+    _, first = quiet(uploader.processar_arquivos, workers, entrada=entrada)
+    stored = sum(len(objects) for objects in s3.buckets.values())
+    megabytes = sum(len(obj["data"]) for objects in s3.buckets.values() for obj in objects.values()) / 1e6
+
+    requests_before = s3.requests
+    _, rerun = quiet(uploader.processar_arquivos, workers, entrada=entrada)
+
+    return {
+        "documents": documents,
+        "objects_stored": stored,
+        "workers": workers,
+        "seconds": round(first, 3),
+        "docs_per_second": rate(documents, first),
+        "mb_per_second": rate(megabytes, first),
+        "rerun_seconds": round(rerun, 3),
+        "rerun_requests": s3.requests - requests_before,
+    }
+
+
+def bench_indexing(uploader, indexer, es, options):
+    entrada = uploader.FILE_JSON_SAIDA
+    documents = sum(1 for _ in iter_records(entrada))
+
+    bulk_before = es.bulk_requests
+    _, rebuild = quiet(indexer.indexar_dados, entrada, recriar=True, opcoes=options)
+    bulk_requests = es.bulk_requests - bulk_before
+    indexed = es.count(indexer.INDEX_NAME)
+
+    bulk_before = es.bulk_requests
+    _, incremental = quiet(indexer.indexar_dados, entrada, opcoes=options)
+
+    return {
+        "documents": documents,
+        "indexed": indexed,
+        "threads": options["threads"],
+        "bulk_requests": bulk_requests,
+        "bulk_mb": round(es.bulk_bytes / 1e6, 3),
+        "seconds": round(rebuild, 3),
+        "docs_per_second": rate(documents, rebuild),
+        "incremental_seconds": round(incremental, 3),
+        "incremental_bulk_requests": es.bulk_requests - bulk_before,
+    }
+
+
+# =========================
+# RELATÓRIO
+# =========================
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    print(f"\nComparação com {baseline_path} ({baseline.get('timestamp', '?')}):")
+    for stage, metric in HEADLINE.items():
+        old = baseline.get("stages", {}).get(stage, {}).get(metric)
+        new = results["stages"].get(stage, {}).get(metric)
+        if not old or not new:
+            continue
+        print(f" {stage:<11} {metric:<22} {old:>12.2f} -> {new:>12.2f} ({(new / old - 1) * 100:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=100, help="Tamanho do corpus sintético")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--corpus-dir", help="Reaproveita (ou gera, se vazia) o corpus nesta pasta")
+    parser.add_argument("--workers", type=int, default=1, help="Processos de extração")
+    parser.add_argument("--upload-workers", type=int, default=4)
+    parser.add_argument("--index-threads", type=int, default=2)
+    parser.add_argument("--bulk-docs", type=int, default=500)
+    parser.add_argument("--bulk-mb", type=float, default=10)
+    parser.add_argument("--backend", default="pdfplumber")
+    parser.add_argument("--page-mode", default="window")
+    parser.add_argument("--output", help="Salva os resultados em JSON")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparação")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="natjus_bench_")
+    raw_dir = args.corpus_dir or os.path.join(workdir, "raw")
+    processed_dir = os.path.join(workdir, "processed")
+
+    manifest_path = os.path.join(raw_dir, "manifest.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        print(f"Corpus reaproveitado: {len(manifest)} PDFs em {raw_dir}")
+    else:
+        start = time.perf_counter()
+        manifest = generate_corpus(raw_dir, args.docs, args.seed)
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        print(f"Corpus gerado: {len(manifest)} PDFs em {time.perf_counter() - start:.1f} s")
+
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count()},
+        "params": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "corpus": {"documents": len(manifest), "pages": sum(doc["pages"] for doc in manifest)},
+        "stages": {},
+    }
+
+    try:
+        with FakeS3() as s3, FakeElasticsearch() as es:
+            extraction, uploader, indexer = load_modules(raw_dir, processed_dir, s3, es)
+            stages = results["stages"]
+
+            print("Extração...")
+            stages["extraction"] = bench_extraction(extraction, manifest, args.workers,
+                                                    args.backend, args.page_mode)
+            print("Datas (converter_data)...")
+            stages["dates"] = bench_dates(indexer, manifest)
+            print("Upload (S3 falso)...")
+            stages["upload"] = bench_upload(extraction, uploader, s3, args.upload_workers)
+            print("Indexação (_bulk falso)...")
+            options = indexer.opcoes_bulk(args.index_threads, args.bulk_docs, args.bulk_mb)
+            stages["indexing"] = bench_indexing(uploader, indexer, es, options)
+    finally:
+        logging.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for stage, values in results["stages"].items():
+        print(f"\n[{stage}]")
+        for key, value in values.items():
+            print(f" {key:<26} {value}")
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+        print(f"\nResultados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,453 @@
+"""
+Substitutos locais do MinIO (S3) e do Elasticsearch para os benchmarks.
+
+Servidores HTTP em memória, em threads do próprio processo, que implementam
+apenas o que o pipeline usa:
+
+    FakeS3             -> bucket HEAD/PUT, objeto PUT/HEAD/GET (com Range),
+                          upload multipart e listagem (ListObjectsV2)
+    FakeElasticsearch  -> info, criação/remoção de índices, aliases, settings,
+                          refresh/forcemerge, _bulk, _search (com scroll) e _count
+
+Não há persistência nem autenticação. Os tempos medidos contra eles refletem
+o custo do lado do cliente (serialização, conexões, paralelismo), não o de um
+cluster real; servem para comparar execuções entre si, offline.
+"""
+import datetime
+import hashlib
+import itertools
+import json
+import re
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+from xml.sax.saxutils import escape
+
+
+class _Server:
+    handler = None
+
+    def __init__(self, port=0):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self.handler)
+        self.httpd.service = self
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        return self.httpd.server_port
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, *args):
+        pass
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+
+# =========================
+# S3
+# =========================
+
+class _S3Handler(_Handler):
+    def split_path(self):
+        url = urlparse(self.path)
+        parts = url.path.lstrip("/").split("/", 1)
+        bucket = unquote(parts[0])
+        key = unquote(parts[1]) if len(parts) > 1 and parts[1] else None
+        return bucket, key, parse_qs(url.query, keep_blank_values=True)
+
+    def read_payload(self):
+        data = self.read_body()
+        # Upload com assinatura por blocos (aws-chunked)
+        if self.headers.get("x-amz-content-sha256", "").startswith("STREAMING"):
+            payload, pos = bytearray(), 0
+            while True:
+                end = data.index(b"\r\n", pos)
+                size = int(data[pos:end].split(b";")[0], 16)
+                pos = end + 2
+                if size == 0:
+                    break
+                payload += data[pos:pos + size]
+                pos += size + 2
+            data = bytes(payload)
+        return data
+
+    def error(self, status, code):
+        body = f'<?xml version="1.0"?><Error><Code>{code}</Code><Message>{code}</Message></Error>'
+        self.send(status, body.encode(), {"Content-Type": "application/xml"})
+
+    def xml(self, body):
+        self.send(200, body.encode(), {"Content-Type": "application/xml"})
+
+    def handle_any(self):
+        service = self.service
+        bucket, key, query = self.split_path()
+        payload = self.read_payload() if self.command in ("PUT", "POST") else b""
+
+        with service.lock:
+            service.requests += 1
+            objects = service.buckets.get(bucket)
+
+            if self.command == "GET" and "location" in query:
+                return self.xml('<?xml version="1.0"?><LocationConstraint '
+                                'xmlns="http://s3.amazonaws.com/doc/2006-03-01/"></LocationConstraint>')
+            if self.command == "PUT" and key is None:
+                service.buckets.setdefault(bucket, {})
+                return self.send(200)
+            if objects is None:
+                return self.error(404, "NoSuchBucket")
+            if key is None:
+                if self.command == "HEAD":
+                    return self.send(200)
+                return self.list_objects(bucket, objects, query)
+
+            if self.command == "PUT":
+                if "partNumber" in query:
+                    service.uploads[query["uploadId"][0]][int(query["partNumber"][0])] = payload
+                    return self.send(200, headers={"ETag": f'"{hashlib.md5(payload).hexdigest()}"'})
+                etag = hashlib.md5(payload).hexdigest()
+                objects[key] = {"data": payload, "etag": etag, "mtime": formatdate(usegmt=True),
+                                "type": self.headers.get("Content-Type", "application/octet-stream")}
+                return self.send(200, headers={"ETag": f'"{etag}"'})
+
+            if self.command == "POST":
+                return self.multipart(bucket, key, objects, query)
+
+            if self.command == "DELETE":
+                objects.pop(key, None)
+                return self.send(204)
+
+            obj = objects.get(key)
+            if obj is None:
+                return self.error(404, "NoSuchKey")
+            headers = {"ETag": f'"{obj["etag"]}"', "Content-Type": obj["type"], "Last-Modified": obj["mtime"]}
+            if self.command == "HEAD":
+                self.send_response(200)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(obj["data"])))
+                return self.end_headers()
+            return self.get_object(obj, headers)
+
+    def get_object(self, obj, headers):
+        data = obj["data"]
+        byte_range = self.headers.get("Range")
+        if not byte_range:
+            return self.send(200, data, headers)
+        start, end = re.match(r"bytes=(\d*)-(\d*)", byte_range).groups()
+        if start == "":
+            start, end = len(data) - int(end), len(data) - 1
+        else:
+            start, end = int(start), int(end) if end else len(data) - 1
+        end = min(end, len(data) - 1)
+        headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+        return self.send(206, data[start:end + 1], headers)
+
+    def multipart(self, bucket, key, objects, query):
+        service = self.service
+        if "uploads" in query:
+            upload_id = hashlib.md5(f"{key}{time.time()}".encode()).hexdigest()
+            service.uploads[upload_id] = {}
+            return self.xml(f'<?xml version="1.0"?><InitiateMultipartUploadResult><Bucket>{bucket}</Bucket>'
+                            f'<Key>{escape(key)}</Key><UploadId>{upload_id}</UploadId>'
+                            f'</InitiateMultipartUploadResult>')
+        if "uploadId" in query:
+            parts = service.uploads.pop(query["uploadId"][0])
+            ordered = [parts[number] for number in sorted(parts)]
+            digest = hashlib.md5(b"".join(hashlib.md5(part).digest() for part in ordered)).hexdigest()
+            etag = f"{digest}-{len(ordered)}"
+            objects[key] = {"data": b"".join(ordered), "etag": etag, "mtime": formatdate(usegmt=True),
+                            "type": "application/pdf"}
+            return self.xml(f'<?xml version="1.0"?><CompleteMultipartUploadResult><Bucket>{bucket}</Bucket>'
+                            f'<Key>{escape(key)}</Key><ETag>"{etag}"</ETag></CompleteMultipartUploadResult>')
+        return self.error(400, "InvalidRequest")
+
+    def list_objects(self, bucket, objects, query):
+        prefix = query.get("prefix", [""])[0]
+        keys = sorted(key for key in objects if key.startswith(prefix))
+        contents = "".join(
+            f"<Contents><Key>{escape(key)}</Key><LastModified>2024-01-01T00:00:00.000Z</LastModified>"
+            f"<ETag>&quot;{objects[key]['etag']}&quot;</ETag><Size>{len(objects[key]['data'])}</Size>"
+            f"<StorageClass>STANDARD</StorageClass></Contents>"
+            for key in keys
+        )
+        return self.xml(f'<?xml version="1.0"?><ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+                        f'<Name>{bucket}</Name><Prefix>{escape(prefix)}</Prefix><KeyCount>{len(keys)}</KeyCount>'
+                        f'<MaxKeys>1000</MaxKeys><IsTruncated>false</IsTruncated>{contents}</ListBucketResult>')
+
+    do_GET = do_HEAD = do_PUT = do_POST = do_DELETE = handle_any
+
+
+class FakeS3(_Server):
+    handler = _S3Handler
+
+    def __init__(self, port=0):
+        super().__init__(port)
+        self.buckets = {}
+        self.uploads = {}
+
+    @property
+    def endpoint(self):
+        """host:porta, no formato de MINIO_ENDPOINT."""
+        return f"127.0.0.1:{self.port}"
+
+
+# =========================
+# ELASTICSEARCH
+# =========================
+
+def _valid_date(value):
+    try:
+        return bool(re.fullmatch(r"\d{4}-\d{2}-\d{2}", value)) and bool(datetime.date.fromisoformat(value))
+    except ValueError:
+        return False
+
+
+class _EsHandler(_Handler):
+    def reply(self, status, body=None):
+        data = b"" if body is None else json.dumps(body).encode()
+        self.send(status, data, {"Content-Type": "application/json", "X-Elastic-Product": "Elasticsearch"})
+
+    def not_found(self):
+        return self.reply(404, {"error": {"type": "index_not_found_exception"}, "status": 404})
+
+    def handle_any(self):
+        service = self.service
+        url = urlparse(self.path)
+        parts = [unquote(part) for part in url.path.strip("/").split("/") if part]
+        query = parse_qs(url.query)
+        body = self.read_body()
+
+        with service.lock:
+            service.requests += 1
+            return self.route(service, parts, query, body)
+
+    def route(self, service, parts, query, body):
+        method = self.command
+        if not parts:
+            return self.reply(200, {"version": {"number": "8.11.0"}, "tagline": "You Know, for Search"})
+        if parts[-1] == "_bulk":
+            return self.bulk(service, body, parts[0] if len(parts) == 2 else None)
+        if parts == ["_aliases"]:
+            return self.update_aliases(service, json.loads(body)["actions"])
+        if parts[0] == "_alias":
+            found = {name: {"aliases": {parts[1]: {}}} for name, index in service.indices.items()
+                     if parts[1] in index["aliases"]}
+            return self.reply(200 if found else 404, found if method != "HEAD" else None)
+        if parts[:2] == ["_search", "scroll"]:
+            if method == "DELETE":
+                return self.reply(200, {"succeeded": True})
+            scroll_id = json.loads(body)["scroll_id"]
+            return self.scroll_page(service, scroll_id, 1000)
+
+        name, rest = parts[0], parts[1:]
+        targets = service.resolve(name)
+        if not rest:
+            if method == "HEAD":
+                return self.reply(200 if targets else 404)
+            if method == "PUT":
+                if name in service.indices:
+                    return self.reply(400, {"error": {"type": "resource_already_exists_exception"}, "status": 400})
+                spec = json.loads(body or b"{}")
+                service.create_index(name, spec.get("settings", {}), spec.get("aliases", {}))
+                return self.reply(200, {"acknowledged": True, "index": name})
+            if method == "DELETE":
+                for target in targets:
+                    service.indices.pop(target)
+                return self.reply(200, {"acknowledged": True})
+            if not targets:
+                return self.not_found() if "*" not in name else self.reply(200, {})
+            return self.reply(200, {target: {"aliases": {alias: {} for alias in service.indices[target]["aliases"]},
+                                             "settings": {"index": service.indices[target]["settings"]}}
+                                    for target in targets})
+
+        operation = rest[0]
+        if operation == "_doc" and len(rest) == 2 and method in ("PUT", "POST"):
+            if not targets:
+                service.create_index(name)
+                targets = [name]
+            service.indices[targets[0]]["docs"][rest[1]] = json.loads(body)
+            return self.reply(201, {"_index": targets[0], "_id": rest[1], "result": "created"})
+        if not targets:
+            return self.not_found()
+        if operation == "_settings":
+            if method == "PUT":
+                settings = json.loads(body)
+                for target in targets:
+                    service.indices[target]["settings"].update(settings.get("index", settings))
+                return self.reply(200, {"acknowledged": True})
+            return self.reply(200, {target: {"settings": {"index": service.indices[target]["settings"]}}
+                                    for target in targets})
+        if operation in ("_refresh", "_forcemerge", "_flush"):
+            return self.reply(200, {"_shards": {"total": 1, "successful": 1, "failed": 0}})
+        if operation == "_stats":
+            # Tamanho aproximado: JSON dos documentos, sem compressão nem estruturas do Lucene
+            stats = {}
+            for target in targets:
+                docs = service.indices[target]["docs"]
+                size = sum(len(json.dumps(doc)) for doc in docs.values())
+                stats[target] = {"primaries": {"docs": {"count": len(docs)}, "store": {"size_in_bytes": size}}}
+            return self.reply(200, {"indices": stats})
+        if operation == "_count":
+            return self.reply(200, {"count": sum(len(service.indices[t]["docs"]) for t in targets)})
+        if operation == "_search":
+            return self.search(service, targets, query, json.loads(body or b"{}"))
+        if operation == "_doc" and len(rest) == 2:
+            doc = service.indices[targets[0]]["docs"].get(rest[1])
+            if doc is None:
+                return self.reply(404, {"_id": rest[1], "found": False})
+            return self.reply(200, {"_index": targets[0], "_id": rest[1], "found": True, "_source": doc})
+        return self.reply(400, {"error": f"não suportado: {method} {self.path}"})
+
+    def update_aliases(self, service, actions):
+        for action in actions:
+            (kind, spec), = action.items()
+            if kind == "add":
+                service.indices[spec["index"]]["aliases"].add(spec["alias"])
+            elif kind == "remove":
+                for target in service.resolve(spec["index"]):
+                    service.indices[target]["aliases"].discard(spec["alias"])
+            elif kind == "remove_index":
+                service.indices.pop(spec["index"], None)
+        return self.reply(200, {"acknowledged": True})
+
+    def search(self, service, targets, query, request):
+        source = request.get("_source", True)
+        hits = []
+        for target in targets:
+            for doc_id, doc in service.indices[target]["docs"].items():
+                if isinstance(source, list):
+                    doc = {key: value for key, value in doc.items() if key in source}
+                elif source is False:
+                    doc = {}
+                hits.append({"_index": target, "_id": doc_id, "_source": doc})
+
+        size = int(query.get("size", [request.get("size", 10)])[0])
+        if "scroll" in query:
+            scroll_id = f"scroll-{next(service.counter)}"
+            service.scrolls[scroll_id] = hits
+            return self.scroll_page(service, scroll_id, size, total=len(hits))
+        return self.reply(200, {"took": 1, "hits": {"total": {"value": len(hits), "relation": "eq"},
+                                                     "hits": hits[:size]}, "aggregations": {}})
+
+    def scroll_page(self, service, scroll_id, size, total=None):
+        hits = service.scrolls.get(scroll_id, [])
+        page, service.scrolls[scroll_id] = hits[:size], hits[size:]
+        return self.reply(200, {"_scroll_id": scroll_id,
+                                "_shards": {"total": 1, "successful": 1, "skipped": 0, "failed": 0},
+                                "hits": {"total": {"value": len(page) if total is None else total}, "hits": page}})
+
+    def bulk(self, service, body, default_index):
+        service.bulk_requests += 1
+        service.bulk_bytes += len(body)
+        lines = [line for line in body.split(b"\n") if line.strip()]
+        items, errors, pos = [], False, 0
+
+        while pos < len(lines):
+            (kind, meta), = json.loads(lines[pos]).items()
+            pos += 1
+            source = None
+            if kind != "delete":
+                source = json.loads(lines[pos])
+                pos += 1
+
+            targets = service.resolve(meta.get("_index", default_index))
+            index = targets[0] if targets else meta.get("_index", default_index)
+            doc_id = meta.get("_id") or f"auto-{next(service.counter)}"
+            result = {"_index": index, "_id": doc_id}
+
+            if service.reject_every and next(service.counter) % service.reject_every == 0:
+                result.update(status=429, error={"type": "es_rejected_execution_exception", "reason": "fila cheia"})
+            elif kind == "delete":
+                removed = service.indices.get(index, {}).get("docs", {}).pop(doc_id, None)
+                result.update(status=200 if removed is not None else 404,
+                              result="deleted" if removed is not None else "not_found")
+            elif isinstance(source.get("data_do_envio"), str) and not _valid_date(source["data_do_envio"]):
+                result.update(status=400, error={"type": "document_parsing_exception",
+                                                 "reason": "failed to parse field [data_do_envio] of type [date]"})
+            else:
+                if index not in service.indices:
+                    service.create_index(index)
+                docs = service.indices[index]["docs"]
+                if kind == "update":
+                    docs.setdefault(doc_id, {}).update(source.get("doc", {}))
+                else:
+                    docs[doc_id] = source
+                result.update(status=201, result="created")
+
+            errors = errors or result["status"] >= 300
+            items.append({kind: result})
+
+        return self.reply(200, {"took": 1, "errors": errors, "items": items})
+
+    do_GET = do_HEAD = do_PUT = do_POST = do_DELETE = handle_any
+
+
+class FakeElasticsearch(_Server):
+    handler = _EsHandler
+
+    def __init__(self, port=0, reject_every=0):
+        super().__init__(port)
+        self.indices = {}
+        self.scrolls = {}
+        self.counter = itertools.count(1)
+        self.reject_every = reject_every   # rejeita (429) um a cada N itens do _bulk
+        self.bulk_requests = 0
+        self.bulk_bytes = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def resolve(self, name):
+        """Índices com esse nome, alias ou padrão (prefixo*)."""
+        if name is None:
+            return []
+        if "*" in name:
+            pattern = re.compile(re.escape(name).replace(r"\*", ".*"))
+            return sorted(index for index in self.indices if pattern.fullmatch(index))
+        if name in self.indices:
+            return [name]
+        return [index for index, data in self.indices.items() if name in data["aliases"]]
+
+    def create_index(self, name, settings=None, aliases=None):
+        self.indices[name] = {"docs": {}, "settings": dict(settings or {}), "aliases": set(aliases or {})}
+
+    def count(self, name):
+        return sum(len(self.indices[index]["docs"]) for index in self.resolve(name))
@@ -0,0 +1,194 @@
+"""
+Gerador de corpus sintético de Notas Técnicas / Pareceres em PDF.
+
+Os PDFs imitam a estrutura dos documentos do NATJUS: cabeçalho com número da
+nota, processo CNJ, assunto e CID-10, páginas de fundamentação, conclusão e o
+rodapé "Goiânia, d de mês de aaaa". A quantidade de páginas varia (inclusive
+documentos com mais de 20 páginas, que ativam a janela de páginas da
+extração) e alguns campos faltam de propósito, como no corpus real.
+
+O PDF é escrito à mão (fonte Helvetica padrão, WinAnsiEncoding, conteúdo
+comprimido com zlib), sem dependências além da biblioteca padrão.
+
+Uso:
+    python benchmarks/synthetic_corpus.py --docs 200 --output /tmp/corpus_natjus
+"""
+import argparse
+import os
+import random
+import zlib
+
+MESES = ["janeiro", "fevereiro", "março", "abril", "maio", "junho", "julho",
+         "agosto", "setembro", "outubro", "novembro", "dezembro"]
+
+# Distribuição de páginas: maioria curta, cauda longa acima do limite da janela (20)
+PAGE_COUNTS = [1, 2, 2, 3, 3, 4, 5, 6, 8, 12, 25, 40]
+
+MEDICAMENTOS = ["pembrolizumabe 200 mg", "rituximabe 500 mg", "insulina glargina", "dupilumabe 300 mg",
+                "canabidiol 200 mg/ml", "adalimumabe 40 mg", "trastuzumabe 440 mg", "bevacizumabe 400 mg"]
+PROCEDIMENTOS = ["cirurgia bariátrica", "implante coclear", "radioterapia de intensidade modulada",
+                 "home care", "tratamento em câmara hiperbárica", "artroplastia total de quadril"]
+CONCLUSOES = [
+    ("Favorável", "Diante do exposto, este núcleo manifesta-se favorável ao fornecimento pleiteado."),
+    ("Desfavorável", "Diante do exposto, este núcleo manifesta-se desfavorável ao pleito, por ausência de evidências."),
+    ("Parcialmente Favorável", "Conclui-se parcialmente pelo atendimento, condicionado à avaliação do especialista."),
+    ("Inconclusivo / Não Identificado Explicitamente", "Não há elementos suficientes para conclusão técnica sobre o pedido."),
+]
+FRASES = [
+    "A literatura científica disponível aponta benefício clínico moderado para a população descrita.",
+    "O medicamento possui registro na ANVISA e está incorporado ao SUS para indicações específicas.",
+    "Foram consultadas as bases Cochrane, PubMed e os protocolos clínicos do Ministério da Saúde.",
+    "O relatório médico anexado descreve evolução desfavorável com as alternativas terapêuticas prévias.",
+    "Não foram identificados ensaios clínicos randomizados que comparem diretamente as intervenções.",
+    "A Comissão Nacional de Incorporação de Tecnologias avaliou a tecnologia em relatório recente.",
+    "O custo anual estimado do tratamento supera o limiar de custo-efetividade usualmente adotado.",
+    "Há alternativa terapêutica disponível na rede pública com eficácia semelhante.",
+]
+
+LINES_PER_PAGE = 48
+
+
+# =========================
+# TEXTO DOS DOCUMENTOS
+# =========================
+
+def cnj_number(rng):
+    return (f"{rng.randint(0, 9999999):07d}-{rng.randint(0, 99):02d}.{rng.randint(2019, 2025)}"
+            f".8.09.{rng.randint(0, 9999):04d}")
+
+
+def cid_code(rng):
+    code = f"{rng.choice('ABCDEFGIJKLMNZ')}{rng.randint(0, 99):02d}"
+    return code + f".{rng.randint(0, 9)}" if rng.random() < 0.6 else code
+
+
+def document_pages(rng, index):
+    """(nome do arquivo, páginas como listas de linhas, campos esperados)."""
+    is_nt = rng.random() < 0.6
+    numero = rng.randint(1, 3000)
+    ano = rng.randint(2019, 2025)
+    name = f"{index:05d} N.T {numero}-{ano}.pdf" if is_nt else f"{index:05d} Parecer {numero}.pdf"
+
+    processo = cnj_number(rng)
+    cid = cid_code(rng)
+    objeto = rng.choice(MEDICAMENTOS + PROCEDIMENTOS)
+    desfecho, conclusao = rng.choice(CONCLUSOES)
+    dia, mes = rng.randint(1, 28), rng.choice(MESES)
+
+    header = [
+        "PODER JUDICIÁRIO",
+        "TRIBUNAL DE JUSTIÇA DO ESTADO DE GOIÁS",
+        "NÚCLEO DE APOIO TÉCNICO DO JUDICIÁRIO - NATJUS",
+        f"{'NOTA TÉCNICA' if is_nt else 'PARECER TÉCNICO'} Nº {numero}/{ano}",
+        "",
+    ]
+    if rng.random() < 0.95:
+        header.append(f"Processo: {processo}")
+    else:
+        processo = None
+    header += [
+        f"Assunto: Fornecimento de {objeto}",
+        "I - DA IDENTIFICAÇÃO",
+        f"Paciente: {rng.choice(['M.', 'J.', 'A.', 'R.'])} {rng.choice(['S.', 'O.', 'P.'])}, {rng.randint(2, 90)} anos",
+    ]
+    if rng.random() < 0.85:
+        header.append(f"CID-10: {cid}")
+    else:
+        header.append(f"Diagnóstico: quadro clínico compatível com {cid}")
+    header += [f"Solicitação: {objeto}", "II - DA CONSULTA", ""]
+
+    footer = ["", "IV) Conclusão", conclusao]
+    data_do_envio = f"{dia} de {mes} de {ano}" if rng.random() < 0.9 else None
+    if data_do_envio:
+        footer += ["", f"Goiânia, {data_do_envio}", "Núcleo de Apoio Técnico - NATJUS"]
+
+    page_count = rng.choice(PAGE_COUNTS)
+    body = [rng.choice(FRASES) for _ in range(page_count * LINES_PER_PAGE - len(header) - len(footer))]
+    lines = header + body + footer
+
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)]
+    expected = {"processo": processo, "cid": cid, "desfecho": desfecho,
+                "data_do_envio": data_do_envio}
+    return name, pages, expected
+
+
+# =========================
+# ESCRITOR DE PDF
+# =========================
+
+def _pdf_string(text):
+    encoded = text.encode("cp1252", errors="replace")
+    return b"(" + encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _page_stream(lines):
+    ops = [b"BT", b"/F1 10 Tf", b"13 TL", b"50 800 Td"]
+    for line in lines:
+        ops.append(_pdf_string(line) + b" Tj T*")
+    ops.append(b"ET")
+    return zlib.compress(b"\n".join(ops))
+
+
+def write_pdf(path, pages):
+    """Grava um PDF A4 com uma página de texto por item de `pages`."""
+    objects = {}
+    page_ids = []
+    next_id = 4   # 1: catálogo, 2: árvore de páginas, 3: fonte
+
+    for lines in pages:
+        content_id, page_id = next_id, next_id + 1
+        next_id += 2
+        stream = _page_stream(lines)
+        objects[content_id] = (b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream)
+                               + stream + b"\nendstream")
+        objects[page_id] = (b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        page_ids.append(page_id)
+
+    objects[1] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[2] = (b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % i for i in page_ids)
+                  + b"] /Count %d >>" % len(page_ids))
+    objects[3] = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = {}
+    for obj_id in sorted(objects):
+        offsets[obj_id] = len(out)
+        out += b"%d 0 obj\n" % obj_id + objects[obj_id] + b"\nendobj\n"
+
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (next_id)
+    for obj_id in range(1, next_id):
+        out += b"%010d 00000 n \n" % offsets[obj_id]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (next_id, xref)
+
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def generate_corpus(output_dir, docs, seed=42):
+    """Gera `docs` PDFs em `output_dir`; retorna a lista de {arquivo, páginas, campos esperados}."""
+    os.makedirs(output_dir, exist_ok=True)
+    rng = random.Random(seed)
+    manifest = []
+    for index in range(docs):
+        name, pages, expected = document_pages(rng, index)
+        write_pdf(os.path.join(output_dir, name), pages)
+        manifest.append({"source_filename": name, "pages": len(pages), **expected})
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", required=True, help="Pasta de destino dos PDFs")
+    args = parser.parse_args()
+
+    manifest = generate_corpus(args.output, args.docs, args.seed)
+    pages = sum(doc["pages"] for doc in manifest)
+    print(f"{len(manifest)} PDFs ({pages} páginas) gerados em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
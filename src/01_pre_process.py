@@ -1,8 +1,17 @@
-import json
+import argparse
+import hashlib
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
 from minio import Minio
 from minio.error import S3Error
 
+from dedup import ALIASES_FIELD, is_duplicate
+from minio_http import http_pool, with_retries
+from object_source import SOURCE_FIELD, parse_uri
+from record_io import JsonlSink, read_records, write_json_array
+
 # =========================
 # CONFIGURAÇÕES
 # =========================
@@ -10,10 +19,11 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
 
 # Caminhos de arquivos
-PROCESSED_DATA_DIR = os.path.join(PROJECT_ROOT, "data", "processed_data")
-RAW_DATA_DIR = os.path.join(PROJECT_ROOT, "data", "raw_data", "NT e PARECERES")
+PROCESSED_DATA_DIR = os.getenv("NATJUS_PROCESSED_DATA_DIR", os.path.join(PROJECT_ROOT, "data", "processed_data"))
+RAW_DATA_DIR = os.getenv("NATJUS_RAW_DATA_DIR", os.path.join(PROJECT_ROOT, "data", "raw_data", "NT e PARECERES"))
 FILE_JSON_ENTRADA = os.path.join(PROCESSED_DATA_DIR, "metadados_extraidos.json")
 FILE_JSON_SAIDA = os.path.join(PROCESSED_DATA_DIR, "metadados_com_url.json")
+FILE_JSONL_SAIDA = os.path.join(PROCESSED_DATA_DIR, "metadados_com_url.jsonl")
 
 # Configurações MinIO 
 MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT", "localhost:9000")
@@ -22,6 +32,9 @@ MINIO_SECRET_KEY = os.getenv("MINIO_SECRET_KEY", "minio@natjus")
 MINIO_BUCKET = os.getenv("MINIO_BUCKET_NAME", "natjus-legado")
 SECURE = False
 
+# Upload concorrente (retentativas de erros transitórios: minio_http.py)
+UPLOAD_WORKERS = 1
+
 # Lista de campos permitidos no JSON fina
 CAMPOS_FINAL_JSON = [
     "source_filename",      
@@ -38,19 +51,22 @@ CAMPOS_FINAL_JSON = [
     "data_do_envio",
     "medicamento_e_insumo",
     "inteiro_teor",
+    "inteiro_teor_ref",
+    "duplicatas",
     "is_legado",
     "url_pdf",
     "caminho_arquivo"
 ]
 
-def setup_minio():
+def setup_minio(workers=UPLOAD_WORKERS):
     """Conecta e cria o bucket se necessário"""
     try:
         client = Minio(
             MINIO_ENDPOINT,
             access_key=MINIO_ACCESS_KEY,
             secret_key=MINIO_SECRET_KEY,
-            secure=SECURE
+            secure=SECURE,
+            http_client=http_pool(workers)  # compartilhado pelas threads de upload
         )
         
         # Verifica se o bucket existe
@@ -65,20 +81,91 @@ def setup_minio():
         print(f"Erro ao conectar no MinIO: {e}")
         return None
 
-def upload_arquivo(client, filename):
-    """Envia o arquivo para o MinIO e retorna a URL"""
+def md5_arquivo(caminho):
+    h = hashlib.md5()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+def objeto_existe(client, filename, bucket=MINIO_BUCKET):
+    try:
+        with_retries(client.stat_object, bucket, filename)
+        return True
+    except S3Error as e:
+        if e.code in ("NoSuchKey", "NoSuchObject", "ResourceNotFound"):
+            return False
+        raise
+
+def objeto_atualizado(client, filename, caminho_local):
+    """
+    Verifica se o objeto no bucket já corresponde ao arquivo local.
+    Compara o tamanho e, para uploads simples (ETag = MD5), também o ETag.
+    ETags de upload multipart ("<hash>-<partes>") não são MD5 do arquivo,
+    então nesse caso só o tamanho é comparado.
+    """
+    try:
+        info = with_retries(client.stat_object, MINIO_BUCKET, filename)
+    except S3Error as e:
+        if e.code in ("NoSuchKey", "NoSuchObject", "ResourceNotFound"):
+            return False
+        raise
+
+    if info.size != os.path.getsize(caminho_local):
+        return False
+
+    etag = (info.etag or "").strip('"')
+    if not etag or "-" in etag:
+        return True
+    return etag == md5_arquivo(caminho_local)
+
+def url_objeto(filename, bucket=MINIO_BUCKET):
+    protocolo = "https" if SECURE else "http"
+    return f"{protocolo}://{MINIO_ENDPOINT}/{bucket}/{filename}"
+
+def upload_arquivo(client, filename, forcar=False, pasta=None, origem=None):
+    """
+    Envia o arquivo (de `pasta`, padrão RAW_DATA_DIR) para o MinIO e retorna
+    (url, status). status: "enviado", "existente" (já estava no bucket) ou "falha".
+    `origem` é a URI s3:// de um PDF extraído direto do bucket (campo
+    objeto_origem do registro): só confere o objeto e monta a URL dele.
+    """
     if not filename: 
-        return None
+        return None, "falha"
+
+    if origem:
+        # Extração direto do bucket (extract_metadata.py --source s3://): o
+        # PDF já está lá, em qualquer bucket/prefixo, e não existe cópia local
+        try:
+            bucket, chave = parse_uri(origem)
+            if objeto_existe(client, chave, bucket):
+                return url_objeto(chave, bucket), "existente"
+        except Exception as e:
+            print(f" [ERRO MINIO] Falha ao consultar {origem}: {e}")
+            return None, "falha"
+        print(f" [AVISO] Objeto de origem não encontrado: {origem}")
+        return None, "falha"
     
-    caminho_local = os.path.join(RAW_DATA_DIR, filename)
+    caminho_local = os.path.join(pasta or RAW_DATA_DIR, filename)
     
     if not os.path.exists(caminho_local):
+        # Registros sem objeto_origem: o PDF pode estar na raiz do bucket
+        try:
+            if objeto_existe(client, filename):
+                return url_objeto(filename), "existente"
+        except Exception as e:
+            print(f" [ERRO MINIO] Falha ao consultar {filename}: {e}")
+            return None, "falha"
         print(f" [AVISO] Arquivo local não encontrado: {filename}")
-        return None
+        return None, "falha"
 
     try:
+        if not forcar and objeto_atualizado(client, filename, caminho_local):
+            return url_objeto(filename), "existente"
+
         # Upload do arquivo
-        client.fput_object(
+        with_retries(
+            client.fput_object,
             MINIO_BUCKET, 
             filename, 
             caminho_local, 
@@ -86,75 +173,143 @@ def upload_arquivo(client, filename):
         )
         
         # Gera a URL
-        protocolo = "https" if SECURE else "http"
-        url = f"{protocolo}://{MINIO_ENDPOINT}/{MINIO_BUCKET}/{filename}"
-        return url
+        return url_objeto(filename), "enviado"
 
     except S3Error as e:
         print(f" [ERRO MINIO] Falha ao enviar {filename}: {e}")
-        return None
+        return None, "falha"
     except Exception as e:
         print(f" [ERRO GERAL] {e}")
-        return None
+        return None, "falha"
+
+def upload_em_paralelo(client, itens, workers=UPLOAD_WORKERS, forcar=False):
+    """
+    Gera (item, url, status) na ordem de `itens`, enviando o PDF de cada
+    item. Os itens são consumidos sob demanda e no máximo 2 * workers ficam
+    em memória/em andamento ao mesmo tempo.
+    """
+    if workers <= 1:
+        for item in itens:
+            yield (item, *upload_arquivo(client, item.get("source_filename"), forcar,
+                                         origem=item.get(SOURCE_FIELD)))
+        return
+
+    limite = workers * 2
+    em_andamento = deque()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for item in itens:
+            futuro = executor.submit(upload_arquivo, client, item.get("source_filename"), forcar,
+                                     origem=item.get(SOURCE_FIELD))
+            em_andamento.append((item, futuro))
+            if len(em_andamento) >= limite:
+                item_pronto, futuro = em_andamento.popleft()
+                yield (item_pronto, *futuro.result())
+
+        while em_andamento:
+            item_pronto, futuro = em_andamento.popleft()
+            yield (item_pronto, *futuro.result())
 
-def processar_arquivos():
-    if not os.path.exists(FILE_JSON_ENTRADA):
-        print(f"Arquivo de entrada não encontrado: {FILE_JSON_ENTRADA}")
+def montar_item(item, url):
+    """Monta o novo item apenas com os campos permitidos"""
+    novo_item = {}
+    for campo in CAMPOS_FINAL_JSON:
+        # Lógica para preencher os campos especiais
+        if campo == "url_pdf":
+            novo_item[campo] = url
+        elif campo == "caminho_arquivo":
+            novo_item[campo] = url  # Repete a URL aqui como pedido
+        elif campo == "is_legado":
+            novo_item[campo] = True
+        elif campo == "inteiro_teor":
+            if item.get("inteiro_teor_ref"):
+                continue  # texto no store inteiro_teor/ (full_text_store.py)
+            # Garante que não seja None
+            novo_item[campo] = item.get(campo) or ""
+        elif campo == "inteiro_teor_ref":
+            if item.get(campo):
+                novo_item[campo] = item[campo]
+        elif campo == ALIASES_FIELD:
+            # Outros nomes do mesmo documento (dedup.py); o PDF enviado é o deste item
+            novo_item[campo] = item.get(campo) or []
+        else:
+            # Copia do original
+            novo_item[campo] = item.get(campo)
+    return novo_item
+
+def processar_arquivos(workers=UPLOAD_WORKERS, forcar=False, entrada=FILE_JSON_ENTRADA, formato_saida="json"):
+    """
+    Envia os PDFs e grava o JSON com as URLs em streaming: os registros são
+    lidos, projetados em CAMPOS_FINAL_JSON e gravados um a um, então o uso de
+    memória não cresce com o tamanho do corpus.
+    """
+    if not os.path.exists(entrada):
+        print(f"Arquivo de entrada não encontrado: {entrada}")
         return
 
     print(f"\n--- Iniciando Upload para MinIO ({MINIO_ENDPOINT}) ---")
-    client = setup_minio()
+    client = setup_minio(workers)
     if not client:
         return
 
-    with open(FILE_JSON_ENTRADA, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    contagem = {"enviado": 0, "existente": 0, "falha": 0}
+    duplicatas = 0
 
-    novos_dados = []
-    sucesso = 0
-    total = len(data)
+    print(f"Processando documentos de {entrada} com {workers} thread(s)...")
 
-    print(f"Processando {total} documentos...")
+    def canonicos():
+        # Duplicatas reaproveitam o objeto do documento canônico
+        nonlocal duplicatas
+        for item in read_records(entrada):
+            if is_duplicate(item):
+                duplicatas += 1
+                continue
+            yield item
 
-    for idx, item in enumerate(data, 1):
-        nome_arquivo = item.get("source_filename")
-        
-        # Faz o Upload e pega a URL
-        url = upload_arquivo(client, nome_arquivo)
-        
-        if url:
-            sucesso += 1
-            print(f" [{idx}/{total}] Upload OK: {nome_arquivo}")
-        else:
-            print(f" [{idx}/{total}] Falha/Ignorado: {nome_arquivo}")
-
-        # Monta o novo item apenas com os campos permitidos
-        novo_item = {}
-        for campo in CAMPOS_FINAL_JSON:
-            # Lógica para preencher os campos especiais
-            if campo == "url_pdf":
-                novo_item[campo] = url
-            elif campo == "caminho_arquivo":
-                novo_item[campo] = url  # Repete a URL aqui como pedido
-            elif campo == "is_legado":
-                novo_item[campo] = True
-            elif campo == "inteiro_teor":
-                # Garante que não seja None
-                novo_item[campo] = item.get(campo) or ""
+    def novos_itens():
+        resultados = upload_em_paralelo(client, canonicos(), workers, forcar)
+        for idx, (item, url, status) in enumerate(resultados, 1):
+            nome_arquivo = item.get("source_filename")
+            contagem[status] += 1
+            if status == "enviado":
+                print(f" [{idx}] Upload OK: {nome_arquivo}")
+            elif status == "existente":
+                print(f" [{idx}] Já no bucket: {nome_arquivo}")
             else:
-                # Copia do original
-                novo_item[campo] = item.get(campo)
+                print(f" [{idx}] Falha/Ignorado: {nome_arquivo}")
 
-        novos_dados.append(novo_item)
+            yield montar_item(item, url)
 
     # Salva o resultado no novo arquivo
-    with open(FILE_JSON_SAIDA, "w", encoding="utf-8") as f:
-        json.dump(novos_dados, f, ensure_ascii=False, indent=4)
-    
+    if formato_saida == "jsonl":
+        saida = FILE_JSONL_SAIDA
+        with JsonlSink(saida + ".tmp") as sink:
+            for novo_item in novos_itens():
+                sink.write(novo_item)
+        os.replace(saida + ".tmp", saida)
+    else:
+        saida = FILE_JSON_SAIDA
+        write_json_array(novos_itens(), saida)
+
+    total = sum(contagem.values())
     print(f"\n--- Processo Concluído ---")
     print(f"Arquivos processados: {total}")
-    print(f"Uploads com sucesso: {sucesso}")
-    print(f"JSON gerado em: {FILE_JSON_SAIDA}")
+    print(f"Uploads com sucesso: {contagem['enviado']}")
+    print(f"Já existentes (ignorados): {contagem['existente']}")
+    print(f"Falhas: {contagem['falha']}")
+    print(f"Duplicatas (sem upload próprio): {duplicatas}")
+    print(f"{formato_saida.upper()} gerado em: {saida}")
 
 if __name__ == "__main__":
-    processar_arquivos()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=UPLOAD_WORKERS,
+                        help="Número de uploads simultâneos para o MinIO")
+    parser.add_argument("--forcar-upload", action="store_true",
+                        help="Reenvia todos os arquivos, mesmo os que já estão no bucket")
+    parser.add_argument("--entrada", default=FILE_JSON_ENTRADA,
+                        help="JSON ou JSONL com os metadados extraídos")
+    parser.add_argument("--formato-saida", choices=["json", "jsonl"], default="json",
+                        help="json: array em metadados_com_url.json; jsonl: um registro por linha")
+    args = parser.parse_args()
+
+    processar_arquivos(args.workers, args.forcar_upload, args.entrada, args.formato_saida)
@@ -1,27 +1,43 @@
-import json
+import argparse
+import copy
 import os
 import sys
+from datetime import datetime
+from functools import partial
 from elasticsearch import Elasticsearch, helpers
 
+from bulk_ingest import bulk_ingest, describe_totals
+from dedup import is_duplicate
+from full_text_store import FullTextStore, REF_FIELD, TEXT_FIELD, slim_record
+from normalization import normalize_date
+from record_io import JsonlSink, iter_latest_records, read_records, document_id, fingerprint
+from search import AggregateBuilder, build_aggregates, publish_generation
+
 # =========================
 # CONFIGURAÇÕES
 # =========================
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
 
-PROCESSED_DATA_DIR = os.path.join(PROJECT_ROOT, "data", "processed_data")
+PROCESSED_DATA_DIR = os.getenv("NATJUS_PROCESSED_DATA_DIR", os.path.join(PROJECT_ROOT, "data", "processed_data"))
 FILE_JSON_ENTRADA = os.path.join(PROCESSED_DATA_DIR, "metadados_com_url.json")
+FILE_FALHAS = os.path.join(PROCESSED_DATA_DIR, "falhas_indexacao.jsonl")   # dead-letter do bulk
+DIR_TEXTOS = os.path.join(PROCESSED_DATA_DIR, "inteiro_teor")   # inteiro_teor referenciado pelos registros
 
 # Conexão (Mantendo o ajuste do IP para Windows)
-ELASTIC_HOST = "http://127.0.0.1:9200"
-INDEX_NAME = "natjus_notas"
-
-# Dicionário para traduzir os meses
-MESES_PT = {
-    "janeiro": "01", "fevereiro": "02", "março": "03", "abril": "04",
-    "maio": "05", "junho": "06", "julho": "07", "agosto": "08",
-    "setembro": "09", "outubro": "10", "novembro": "11", "dezembro": "12"
-}
+ELASTIC_HOST = os.getenv("ELASTICSEARCH_URL", "http://127.0.0.1:9200")
+INDEX_NAME = "natjus_notas"   # alias usado nas buscas; aponta para natjus_notas-<timestamp>
+
+# Reconstrução sem indisponibilidade
+VERSOES_MANTIDAS = 2          # índices antigos guardados para rollback
+CONFIG_CARGA = {"refresh_interval": "-1", "number_of_replicas": 0}
+CONFIG_BUSCA = {"refresh_interval": "1s", "number_of_replicas": 0}
+
+# Envio em lotes (ver bulk_ingest.py)
+BULK_THREADS = 2
+BULK_MAX_DOCS = 500
+BULK_MAX_MB = 10
+BULK_MAX_TENTATIVAS = 5
 
 # =========================
 # MAPPING
@@ -40,9 +56,11 @@ mapping_body = {
             "desfecho": {"type": "keyword"},
             "tipo_arquivo": {"type": "keyword"},
             "classificacao": {"type": "keyword"},
+            # Outros nomes de arquivo do mesmo documento (duplicatas, ver dedup.py)
+            "duplicatas": {"type": "keyword"},
             "inteiro_teor": {"type": "text", "analyzer": "portuguese"},
             "n_nota_tecnica": {"type": "text", "analyzer": "portuguese"},
-            "assunto": {"type": "text", "analyzer": "portuguese"},
+            "Assunto": {"type": "text", "analyzer": "portuguese"},
             "objeto": {"type": "text", "analyzer": "portuguese"},
             "medicamento_e_insumo": {"type": "text", "analyzer": "portuguese"},
             "informacao_complementar": {"type": "text", "analyzer": "portuguese"},
@@ -55,37 +73,89 @@ mapping_body = {
             },
             
             "url_pdf": {"type": "keyword", "index": False},      
-            "caminho_arquivo": {"type": "keyword", "index": False} 
+            "caminho_arquivo": {"type": "keyword", "index": False},
+
+            # Hash do documento indexado, para a indexação incremental
+            "fingerprint": {"type": "keyword", "index": False}
         }
     }
 }
 
+# =========================
+# PERFIS DO ÍNDICE
+# =========================
+# Ajustes aplicados sobre mapping_body ao criar uma versão do índice. O perfil
+# vale para a versão inteira: trocar de perfil exige --recriar.
+#
+#   busca         -> padrão: posições e norms completos (frases, destaque e
+#                    relevância pelo tamanho do campo), refresh de 1 s
+#   ingestao      -> carga mais rápida: inteiro_teor sem posições nem norms,
+#                    translog assíncrono e refresh de 30 s
+#   armazenamento -> índice menor: best_compression, campos longos só com
+#                    frequências e inteiro_teor fora do _source (o texto
+#                    continua no store inteiro_teor/, sem destaque nas buscas)
+#
+# Todos os perfis guardam o nome em mappings._meta e têm o subcampo keyword
+# `<campo>.exato` nos campos de texto filtrados por valor exato.
+
+# Filtros exatos em campos de texto (ex.: n_nota_tecnica.exato = "618/2022").
+# Os nomes são as chaves dos registros (field_rules grava "Assunto"): um nome
+# que não existe no registro deixa o subcampo vazio sem erro nenhum.
+CAMPOS_EXATOS = ["n_nota_tecnica", "Assunto", "classificador_do_objeto"]
+SUBCAMPO_EXATO = {"exato": {"type": "keyword", "ignore_above": 256}}
+
+SEM_POSICOES = {"index_options": "freqs", "norms": False}
+
+PERFIS_INDICE = {
+    "busca": {
+        "settings": {},
+        "busca": {"refresh_interval": "1s"},
+        "campos": {},
+    },
+    "ingestao": {
+        "settings": {"translog": {"durability": "async", "sync_interval": "30s"}},
+        "busca": {"refresh_interval": "30s"},
+        "campos": {"inteiro_teor": SEM_POSICOES},
+    },
+    "armazenamento": {
+        "settings": {"codec": "best_compression"},
+        "busca": {"refresh_interval": "1s"},
+        "campos": {
+            "inteiro_teor": SEM_POSICOES,
+            "informacao_complementar": SEM_POSICOES,
+            "classificador_do_objeto": SEM_POSICOES,
+        },
+        "_source": {"excludes": ["inteiro_teor"]},
+    },
+}
+PERFIL_PADRAO = "busca"
+
+def montar_mapping(perfil=PERFIL_PADRAO):
+    """Corpo de criação do índice (settings + mappings) para o perfil."""
+    config = PERFIS_INDICE[perfil]
+    corpo = copy.deepcopy(mapping_body)
+    corpo["settings"].update(config["settings"])
+    propriedades = corpo["mappings"]["properties"]
+    for campo in CAMPOS_EXATOS:
+        propriedades[campo]["fields"] = copy.deepcopy(SUBCAMPO_EXATO)
+    for campo, ajustes in config["campos"].items():
+        propriedades[campo].update(ajustes)
+    if "_source" in config:
+        corpo["mappings"]["_source"] = config["_source"]
+    corpo["mappings"]["_meta"] = {"perfil": perfil}
+    return corpo
+
+def config_busca(perfil=PERFIL_PADRAO):
+    """Settings restaurados depois da carga, quando a versão passa a receber buscas."""
+    return dict(CONFIG_BUSCA, **PERFIS_INDICE[perfil]["busca"])
+
 def converter_data(data_str):
     """
-    Converte '2 de dezembro de 2024' para '2024-12-02'
+    Converte '2 de dezembro de 2024' (ou '02/12/2024') para '2024-12-02'.
+    Desde a EXTRACTOR_VERSION 2 a data já sai em ISO da extração e passa
+    direto; a conversão fica para JSONs gerados por versões anteriores.
     """
-    if not data_str or not isinstance(data_str, str):
-        return None
-    
-    try:
-        # Ex: "2 de dezembro de 2024" -> ["2", "de", "dezembro", "de", "2024"]
-        partes = data_str.lower().split()
-        
-        if len(partes) < 5:
-            return None # Formato inesperado
-            
-        dia = partes[0].zfill(2) # Garante "02" em vez de "2"
-        mes_nome = partes[2]
-        ano = partes[4]
-        
-        mes_num = MESES_PT.get(mes_nome)
-        
-        if mes_num:
-            return f"{ano}-{mes_num}-{dia}" # Retorna YYYY-MM-DD
-        return None
-        
-    except Exception:
-        return None
+    return normalize_date(data_str)
 
 def conectar_elastic():
     print(f"--- Tentando conectar ao Elastic em {ELASTIC_HOST} ---")
@@ -98,14 +168,144 @@ def conectar_elastic():
         print(f"❌ FALHA DE CONEXÃO: {e}")
         return None
 
-def recriar_indice(es):
-    if es.indices.exists(index=INDEX_NAME):
-        es.indices.delete(index=INDEX_NAME)
-    es.indices.create(index=INDEX_NAME, body=mapping_body)
-    print(f"Índice '{INDEX_NAME}' recriado.")
+# =========================
+# VERSÕES DO ÍNDICE / ALIAS
+# =========================
+
+def nome_versao():
+    """
+    natjus_notas-AAAAMMDDHHMMSSffffff. Os microssegundos evitam colisão entre
+    reconstruções no mesmo segundo e mantêm a ordem por nome igual à ordem
+    de criação (inclusive diante de versões antigas, só com segundos).
+    """
+    return f"{INDEX_NAME}-{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+
+def listar_versoes(es):
+    """Índices natjus_notas-<timestamp>, do mais antigo para o mais novo."""
+    return sorted(es.indices.get(index=f"{INDEX_NAME}-*").keys())
+
+def indices_do_alias(es):
+    if not es.indices.exists_alias(name=INDEX_NAME):
+        return []
+    return list(es.indices.get_alias(name=INDEX_NAME).keys())
+
+def criar_versao(es, config=None, perfil=PERFIL_PADRAO):
+    """Cria um índice versionado com o mapping do perfil (e ajustes de settings)."""
+    nome = nome_versao()
+    while es.indices.exists(index=nome):
+        nome = nome_versao()
+    corpo = montar_mapping(perfil)
+    corpo["settings"].update(config or {})
+    es.indices.create(index=nome, body=corpo)
+    return nome
+
+def apontar_alias(es, nome):
+    """
+    Move o alias para `nome` numa única operação atômica. Um índice antigo
+    com o nome do alias (anterior ao versionamento) é removido na mesma ação.
+    """
+    acoes = [{"remove": {"index": indice, "alias": INDEX_NAME}}
+             for indice in indices_do_alias(es) if indice != nome]
+    if es.indices.exists(index=INDEX_NAME) and not es.indices.exists_alias(name=INDEX_NAME):
+        acoes.append({"remove_index": {"index": INDEX_NAME}})
+    acoes.append({"add": {"index": nome, "alias": INDEX_NAME}})
+    es.indices.update_aliases(actions=acoes)
+    print(f"Alias '{INDEX_NAME}' -> '{nome}'.")
+
+def limpar_versoes(es, manter=VERSOES_MANTIDAS):
+    """Apaga versões antigas além das `manter` mais recentes fora do alias."""
+    ativos = set(indices_do_alias(es))
+    antigos = [nome for nome in listar_versoes(es) if nome not in ativos]
+    for nome in antigos[:max(0, len(antigos) - manter)]:
+        es.indices.delete(index=nome)
+        print(f"Versão antiga removida: {nome}")
+
+def rollback(es):
+    """Aponta o alias para a versão anterior à atual."""
+    ativos = set(indices_do_alias(es))
+    anteriores = [nome for nome in listar_versoes(es) if nome not in ativos and nome < min(ativos, default="~")]
+    if not anteriores:
+        print("Nenhuma versão anterior disponível.")
+        return
+    apontar_alias(es, anteriores[-1])
+    # Os agregados publicados descrevem a versão que saiu do alias
+    publicar_geracao(es, indice=anteriores[-1])
 
-def gerar_docs(dados):
+def agregados_do_indice(es, indice=INDEX_NAME):
+    """Agregados recalculados a partir dos documentos de `indice` (sem o texto)."""
+    consulta = {"query": {"match_all": {}}, "_source": {"excludes": [TEXT_FIELD]}}
+    return build_aggregates(hit.get("_source", {})
+                            for hit in helpers.scan(es, index=indice, query=consulta, size=1000))
+
+def publicar_geracao(es, entrada=None, agregados=None, indice=None):
+    """
+    Avisa o serviço de busca (search.py) que o índice mudou, o que invalida
+    os caches dele. Grava antes as tabelas de agregados (contagens por cid,
+    desfecho, mês...): as já montadas durante a indexação (`agregados`) ou,
+    na falta delas, recalculadas relendo `entrada` ou os documentos de `indice`.
+    """
+    try:
+        if agregados is None and entrada:
+            agregados = build_aggregates(read_records(entrada))
+        elif agregados is None and indice:
+            agregados = agregados_do_indice(es, indice)
+        geracao = publish_generation(es, agregados)
+        print(f"Geração do índice publicada: {geracao}" +
+              (f" ({agregados['total']} documentos nos agregados)" if agregados else ""))
+    except Exception as e:
+        print(f"Aviso: não foi possível publicar a geração do índice: {e}")
+
+def garantir_indice(es, perfil=PERFIL_PADRAO):
+    """Cria a primeira versão (já com o alias) se o índice ainda não existir."""
+    if not es.indices.exists(index=INDEX_NAME):
+        nome = criar_versao(es, config_busca(perfil), perfil)
+        apontar_alias(es, nome)
+        print(f"Índice '{nome}' criado.")
+
+def fingerprints_indexados(es):
+    """{_id: fingerprint} de todos os documentos já indexados (sem o texto)."""
+    consulta = {"query": {"match_all": {}}, "_source": ["fingerprint"]}
+    return {
+        hit["_id"]: hit.get("_source", {}).get("fingerprint")
+        for hit in helpers.scan(es, index=INDEX_NAME, query=consulta, size=1000)
+    }
+
+_textos = None
+
+def store_textos():
+    """Store do inteiro_teor, aberto só quando algum registro traz a referência."""
+    global _textos
+    if _textos is None:
+        _textos = FullTextStore(DIR_TEXTOS)
+    return _textos
+
+def carregar_texto(item):
+    """Troca a referência pelo texto, logo antes de o documento ir para o _bulk."""
+    ref = item.pop(REF_FIELD, None)
+    if ref and item.get(TEXT_FIELD) is None:
+        texto = store_textos().get_text(ref)
+        if texto is None:
+            print(f" Aviso: texto de {item.get('source_filename')} ausente em {DIR_TEXTOS}")
+        item[TEXT_FIELD] = texto or ""
+    return item
+
+def gerar_docs(dados, existentes=None, contagem=None, indice=INDEX_NAME):
+    """
+    Ações de indexação com _id estável. Com `existentes` ({_id: fingerprint}),
+    documentos cujo fingerprint não mudou são pulados e os ids vistos são
+    removidos de `existentes` (o que sobrar foi apagado da origem).
+
+    O fingerprint é calculado sobre o registro com a referência ao texto (e
+    não o texto), então registros com o texto embutido ou no store têm o
+    mesmo fingerprint e documentos inalterados nunca leem o texto.
+
+    Registros de duplicata (dedup.py) não viram documento: o canônico já
+    traz os nomes delas no campo `duplicatas`.
+    """
     for item in dados:
+        if is_duplicate(item):
+            continue  # indexada como alias do canônico
+
         # --- AQUI ESTÁ A MÁGICA ---
         # Converte a data antes de indexar
         data_original = item.get("data_do_envio")
@@ -115,33 +315,242 @@ def gerar_docs(dados):
         item["data_do_envio"] = data_formatada
         # --------------------------
 
+        doc_id = document_id(item)
+        item["fingerprint"] = fingerprint(slim_record(item))
+
+        if existentes is not None:
+            anterior = existentes.pop(doc_id, None)
+            if anterior == item["fingerprint"]:
+                if contagem is not None:
+                    contagem["inalterados"] += 1
+                continue
+
+        if contagem is not None:
+            contagem["enviados"] += 1
+
         yield {
-            "_index": INDEX_NAME,
-            "_source": item
+            "_index": indice,
+            "_id": doc_id,
+            "_source": carregar_texto(item)
         }
 
-def indexar_dados():
-    if not os.path.exists(FILE_JSON_ENTRADA):
-        print("Arquivo JSON não encontrado.")
-        return
+def gerar_remocoes(ids):
+    for doc_id in ids:
+        yield {"_op_type": "delete", "_index": INDEX_NAME, "_id": doc_id}
+
+def opcoes_bulk(threads=BULK_THREADS, max_docs=BULK_MAX_DOCS, max_mb=BULK_MAX_MB, tentativas=BULK_MAX_TENTATIVAS):
+    return {"threads": threads, "max_docs": max_docs, "max_bytes": int(max_mb * 1024 * 1024),
+            "max_retries": tentativas}
+
+# =========================
+# DEAD-LETTER
+# =========================
+
+def abrir_falhas(caminho=FILE_FALHAS):
+    """
+    Dead-letter em modo de acréscimo: falhas de execuções anteriores ainda
+    não reprocessadas continuam no arquivo até --reprocessar-falhas.
+    """
+    return JsonlSink(caminho)
+
+def fechar_falhas(falhas, total):
+    falhas.close()
+    if total:
+        print(f"{total} documento(s) com falha registrados em {falhas.path}")
+        print("Corrija a causa e use --reprocessar-falhas para reenviar só esses documentos.")
+    if os.path.getsize(falhas.path) == 0:
+        os.remove(falhas.path)
+
+def registrar_falha(falhas, acao, status, motivo):
+    print(f" Falha ({status}) em {acao.get('_source', {}).get('source_filename') or acao.get('_id')}: {motivo}")
+    if falhas is not None:
+        falhas.write({
+            "_id": acao.get("_id"),
+            "_op_type": acao.get("_op_type", "index"),
+            "status": status,
+            "motivo": motivo,
+            "registrado_em": datetime.now().isoformat(timespec="seconds"),
+            "documento": acao.get("_source"),
+        })
+
+def enviar(es, acoes, opcoes=None, falhas=None):
+    """Envia as ações em lotes paralelos; retorna (sucesso, falhas)."""
+    totais = bulk_ingest(es, acoes, on_error=partial(registrar_falha, falhas), **(opcoes or opcoes_bulk()))
+    print(f"Bulk: {describe_totals(totais)}")
+    return totais["success"], totais["failed"]
+
+def gerar_reenvios(caminho, corrigir_datas=False):
+    """
+    Ações a partir do dead-letter, sempre pelo alias (a versão original pode
+    não existir mais). Um documento que falhou em mais de uma execução é
+    reenviado uma vez, pelo registro mais recente.
+    """
+    for registro in iter_latest_records(caminho, key="_id"):
+        if registro.get("_op_type") == "delete":
+            yield {"_op_type": "delete", "_index": INDEX_NAME, "_id": registro["_id"]}
+            continue
+
+        doc = registro["documento"]
+        if corrigir_datas:
+            # O fingerprint continua o da entrada, então a próxima execução
+            # incremental não reenvia o documento corrigido.
+            doc["data_do_envio"] = normalize_date(doc.get("data_do_envio"))
+        yield {"_index": INDEX_NAME, "_id": registro["_id"], "_source": doc}
+
+def reprocessar_falhas(caminho=FILE_FALHAS, corrigir_datas=False, opcoes=None):
+    """
+    Reenvia só os documentos do dead-letter. O arquivo é movido para
+    `*.reprocessando.jsonl` e as falhas que persistirem voltam para `caminho`.
+    """
+    em_reprocesso = caminho.replace(".jsonl", ".reprocessando.jsonl")
+    if not os.path.exists(em_reprocesso):
+        if not os.path.exists(caminho):
+            print("Nenhuma falha registrada.")
+            return
+        os.replace(caminho, em_reprocesso)
 
     es = conectar_elastic()
     if not es: return
 
-    recriar_indice(es)
+    falhas = abrir_falhas(caminho)
+    sucesso, total_falhas = 0, 0
+    try:
+        sucesso, total_falhas = enviar(es, gerar_reenvios(em_reprocesso, corrigir_datas), opcoes, falhas)
+        es.indices.refresh(index=INDEX_NAME)
+        os.remove(em_reprocesso)
+        publicar_geracao(es)
+    except Exception as e:
+        print(f"Erro: {e}")
+        return
+    finally:
+        print(f"\n--- Reprocessamento concluído ---")
+        print(f"Documentos reenviados com sucesso: {sucesso}")
+        fechar_falhas(falhas, total_falhas)
+
+def ler_entrada(entrada, agregador=None):
+    """Registros da entrada; com `agregador` (AggregateBuilder), contados na mesma leitura."""
+    registros = read_records(entrada)
+    return agregador.observe(registros) if agregador is not None else registros
+
+def reconstruir_indice(es, entrada, manter=VERSOES_MANTIDAS, opcoes=None, falhas=None, perfil=PERFIL_PADRAO,
+                       agregador=None):
+    """
+    Reindexa tudo numa versão nova, sem derrubar a atual: carga com refresh
+    desligado e sem réplicas, force merge, settings de busca restaurados e só
+    então o alias é movido. As buscas continuam na versão antiga até a troca.
+    Retorna (total de falhas, se o alias foi movido).
+    """
+    nome = criar_versao(es, CONFIG_CARGA, perfil)
+    print(f"Carregando nova versão '{nome}' (perfil {perfil})...")
+
+    sucesso, total_falhas = enviar(es, gerar_docs(ler_entrada(entrada, agregador), indice=nome), opcoes, falhas)
+    if total_falhas and not sucesso:
+        print(f"Nenhum documento indexado; o alias continua na versão atual e '{nome}' foi descartado.")
+        es.indices.delete(index=nome)
+        return total_falhas, False
+
+    es.indices.put_settings(index=nome, settings={"index": config_busca(perfil)})
+    es.indices.forcemerge(index=nome, max_num_segments=1)
+    es.indices.refresh(index=nome)
+
+    apontar_alias(es, nome)
+    limpar_versoes(es, manter)
+
+    print(f"\n--- SUCESSO! ---")
+    print(f"Documentos indexados: {sucesso}")
+    print(f"Falhas: {total_falhas}")
+    return total_falhas, True
+
+def atualizar_indice(es, entrada, opcoes=None, falhas=None, perfil=PERFIL_PADRAO, agregador=None):
+    """Upsert só do que mudou e remoção do que saiu da entrada."""
+    garantir_indice(es, perfil)
+    existentes = fingerprints_indexados(es)
+    print(f"{len(existentes)} documentos já indexados.")
 
-    print("Carregando JSON e convertendo datas...")
-    with open(FILE_JSON_ENTRADA, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    contagem = {"enviados": 0, "inalterados": 0}
 
+    print("Lendo registros e convertendo datas...")
+    docs = gerar_docs(ler_entrada(entrada, agregador), existentes, contagem)
+    sucesso, total_falhas = enviar(es, docs, opcoes, falhas)
+
+    removidos = 0
+    if existentes:
+        removidos, falhas_remocao = enviar(es, gerar_remocoes(existentes), opcoes, falhas)
+        total_falhas += falhas_remocao
+
+    es.indices.refresh(index=INDEX_NAME)
+    print(f"\n--- SUCESSO! ---")
+    print(f"Documentos indexados: {sucesso}")
+    print(f"Inalterados (ignorados): {contagem['inalterados']}")
+    print(f"Removidos: {removidos}")
+    print(f"Falhas: {total_falhas}")
+    return total_falhas
+
+def indexar_dados(entrada=FILE_JSON_ENTRADA, recriar=False, manter=VERSOES_MANTIDAS, opcoes=None,
+                  perfil=PERFIL_PADRAO):
+    """
+    Indexação incremental (padrão): só envia documentos novos ou alterados e
+    apaga os que sumiram da entrada. Com `recriar`, carrega tudo numa versão
+    nova do índice e troca o alias no final. O `perfil` (PERFIS_INDICE) vale
+    para versões criadas nesta execução.
+    """
+    if not os.path.exists(entrada):
+        print("Arquivo JSON não encontrado.")
+        return
+
+    es = conectar_elastic()
+    if not es: return
+
+    falhas = abrir_falhas()
+    total_falhas = 0
+    # Os agregados são contados enquanto os registros são lidos para indexar
+    agregador = AggregateBuilder()
     try:
-        sucesso, falhas = helpers.bulk(es, gerar_docs(data), stats_only=True, chunk_size=500)
-        print(f"\n--- SUCESSO! ---")
-        print(f"Documentos indexados: {sucesso}")
-        print(f"Falhas: {falhas}")
-            
+        if recriar:
+            total_falhas, trocado = reconstruir_indice(es, entrada, manter, opcoes, falhas, perfil, agregador)
+        else:
+            total_falhas, trocado = atualizar_indice(es, entrada, opcoes, falhas, perfil, agregador), True
+        # Versão nova descartada: o alias e os agregados publicados continuam os da versão atual
+        if trocado:
+            publicar_geracao(es, agregados=agregador.result())
     except Exception as e:
         print(f"Erro: {e}")
+    finally:
+        fechar_falhas(falhas, total_falhas)
 
 if __name__ == "__main__":
-    indexar_dados()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entrada", default=FILE_JSON_ENTRADA,
+                        help="JSON ou JSONL gerado por 01_pre_process.py")
+    parser.add_argument("--recriar", action="store_true",
+                        help="Reindexa tudo numa nova versão do índice e troca o alias no final")
+    parser.add_argument("--perfil", choices=list(PERFIS_INDICE), default=PERFIL_PADRAO,
+                        help="Perfil da nova versão do índice (busca, ingestao ou armazenamento); "
+                             "para trocar o perfil do índice atual use com --recriar")
+    parser.add_argument("--manter-versoes", type=int, default=VERSOES_MANTIDAS,
+                        help="Quantas versões antigas do índice guardar para rollback")
+    parser.add_argument("--rollback", action="store_true",
+                        help="Aponta o alias para a versão anterior do índice e sai")
+    parser.add_argument("--threads", type=int, default=BULK_THREADS,
+                        help="Requisições _bulk simultâneas")
+    parser.add_argument("--lote-docs", type=int, default=BULK_MAX_DOCS,
+                        help="Máximo de documentos por lote")
+    parser.add_argument("--lote-mb", type=float, default=BULK_MAX_MB,
+                        help="Máximo de MB por lote")
+    parser.add_argument("--max-tentativas", type=int, default=BULK_MAX_TENTATIVAS,
+                        help="Retentativas (com backoff exponencial) para lotes rejeitados com 429")
+    parser.add_argument("--reprocessar-falhas", action="store_true",
+                        help=f"Reenvia só os documentos registrados em {os.path.basename(FILE_FALHAS)}")
+    parser.add_argument("--corrigir-datas", action="store_true",
+                        help="Com --reprocessar-falhas: normaliza data_do_envio (texto -> ISO, datas inválidas -> vazio)")
+    args = parser.parse_args()
+    opcoes = opcoes_bulk(args.threads, args.lote_docs, args.lote_mb, args.max_tentativas)
+
+    if args.rollback:
+        es = conectar_elastic()
+        if es:
+            rollback(es)
+    elif args.reprocessar_falhas:
+        reprocessar_falhas(FILE_FALHAS, args.corrigir_datas, opcoes)
+    else:
+        indexar_dados(args.entrada, args.recriar, args.manter_versoes, opcoes, args.perfil)
@@ -0,0 +1,214 @@
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from elasticsearch import ApiError, ConnectionError as EsConnectionError, ConnectionTimeout
+from elasticsearch.helpers import expand_action
+
+# =========================
+# BULK PARALELO
+# =========================
+#
+# Envio para o _bulk com lotes limitados por quantidade E por bytes (o
+# inteiro_teor varia de poucos KB a vários MB), várias requisições em paralelo
+# e retentativa com backoff exponencial para rejeições 429 (fila de escrita
+# cheia). Só os itens rejeitados são reenviados, não o lote inteiro.
+#
+# O helpers.parallel_bulk do cliente não repete rejeições e o streaming_bulk
+# repete, mas numa única thread; por isso o laço é feito aqui.
+
+THREADS = 2
+MAX_DOCS = 500
+MAX_BYTES = 10 * 1024 * 1024
+MAX_RETRIES = 5
+INITIAL_BACKOFF = 1.0   # segundos; dobra a cada tentativa
+MAX_BACKOFF = 60
+
+RETRY_STATUS = 429
+
+# Marcador que pode ser intercalado nas ações para enviar o lote parcial
+# imediatamente (ex.: a fila de entrada do pipeline ficou ociosa).
+FLUSH = object()
+
+
+def serialize_action(action):
+    """Linhas NDJSON (bytes) de uma ação no formato do helpers.bulk."""
+    meta, source = expand_action(action)
+    lines = [json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"]
+    if source is not None:
+        lines.append(json.dumps(source, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+    return lines
+
+
+def chunk_actions(actions, max_docs=MAX_DOCS, max_bytes=MAX_BYTES):
+    """
+    Agrupa as ações em lotes de até `max_docs` ações e `max_bytes` bytes.
+    Uma ação maior que `max_bytes` sozinha vira um lote próprio; FLUSH fecha
+    o lote atual antes de atingir os limites.
+    """
+    chunk, size = [], 0
+    for action in actions:
+        if action is FLUSH:
+            if chunk:
+                yield chunk
+                chunk, size = [], 0
+            continue
+        lines = serialize_action(action)
+        action_size = sum(len(line) for line in lines)
+        if chunk and (len(chunk) >= max_docs or size + action_size > max_bytes):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append((action, lines))
+        size += action_size
+    if chunk:
+        yield chunk
+
+
+def _backoff(attempt, initial, maximum):
+    return min(maximum, initial * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+
+def _error_reason(item):
+    error = item.get("error")
+    if isinstance(error, dict):
+        return f"{error.get('type')}: {error.get('reason')}"
+    return str(error or item.get("result"))
+
+
+def send_chunk(es, chunk, max_retries=MAX_RETRIES, initial_backoff=INITIAL_BACKOFF, max_backoff=MAX_BACKOFF):
+    """
+    Envia um lote, repetindo os itens rejeitados com 429 (e a requisição
+    inteira em erro de conexão ou 429 global).
+
+    Retorna {"success", "failed", "retries", "bytes", "seconds", "errors"},
+    onde errors é uma lista de (ação, status, motivo).
+    """
+    result = {"success": 0, "failed": 0, "retries": 0, "bytes": 0, "seconds": 0.0, "errors": []}
+    pending = chunk
+    start = time.perf_counter()
+
+    for attempt in range(max_retries + 1):
+        body = [line for _action, lines in pending for line in lines]
+        result["bytes"] += sum(len(line) for line in body)
+
+        try:
+            response = es.bulk(operations=body)
+        except (EsConnectionError, ConnectionTimeout) as e:
+            status, reason = None, str(e)
+        except ApiError as e:
+            if e.status_code != RETRY_STATUS:
+                raise
+            status, reason = RETRY_STATUS, str(e)
+        else:
+            status = RETRY_STATUS
+            retry = []
+            for (action, lines), item in zip(pending, response["items"]):
+                (op, info), = item.items()
+                if 200 <= info.get("status", 500) < 300:
+                    result["success"] += 1
+                elif op == "delete" and info.get("status") == 404:
+                    # Já não existia: o resultado é o que a remoção queria
+                    result["success"] += 1
+                elif info.get("status") == RETRY_STATUS:
+                    retry.append((action, lines))
+                else:
+                    result["failed"] += 1
+                    result["errors"].append((action, info.get("status"), _error_reason(info)))
+            pending = retry
+            reason = "rejeitado (429)"
+
+        if not pending:
+            break
+        if attempt < max_retries:
+            result["retries"] += 1
+            time.sleep(_backoff(attempt, initial_backoff, max_backoff))
+    else:
+        for action, _lines in pending:
+            result["failed"] += 1
+            result["errors"].append((action, status, reason))
+
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def bulk_ingest(es, actions, threads=THREADS, max_docs=MAX_DOCS, max_bytes=MAX_BYTES,
+                max_retries=MAX_RETRIES, initial_backoff=INITIAL_BACKOFF, max_backoff=MAX_BACKOFF,
+                on_error=None, on_batch=None, log=print):
+    """
+    Indexa `actions` com `threads` requisições _bulk simultâneas e no máximo
+    2 * threads lotes em memória. Loga vazão e latência de cada lote.
+
+    `on_error(ação, status, motivo)` é chamado para cada item que falhou em
+    definitivo e `on_batch(resultado)` ao fim de cada lote. Retorna os totais
+    (success, failed, retries, bytes, seconds).
+
+    Com threads > 1, cada lote é contabilizado (on_error, on_batch, log) pela
+    thread que o enviou, assim que termina, um lote por vez: um lote
+    concluído não espera a próxima ação chegar de `actions` (modo --watch
+    do pipeline, em que a entrada pode ficar parada por muito tempo).
+    """
+    totals = {"success": 0, "failed": 0, "retries": 0, "batches": 0, "bytes": 0, "seconds": 0.0}
+    start = time.perf_counter()
+
+    def collect(result):
+        totals["batches"] += 1
+        for key in ("success", "failed", "retries", "bytes"):
+            totals[key] += result[key]
+        if on_error is not None:
+            for error in result["errors"]:
+                on_error(*error)
+        if on_batch is not None:
+            on_batch(result)
+
+        if log is not None:
+            docs = result["success"] + result["failed"]
+            seconds = result["seconds"] or 1e-9
+            mb = result["bytes"] / 1e6
+            log(f" lote {totals['batches']}: {docs} docs, {mb:.2f} MB em {seconds * 1000:.0f} ms "
+                f"({docs / seconds:.0f} docs/s, {mb / seconds:.2f} MB/s"
+                f"{', ' + str(result['retries']) + ' retentativa(s)' if result['retries'] else ''}"
+                f"{', ' + str(result['failed']) + ' falha(s)' if result['failed'] else ''})")
+
+    retry_options = {"max_retries": max_retries, "initial_backoff": initial_backoff, "max_backoff": max_backoff}
+    chunks = chunk_actions(actions, max_docs, max_bytes)
+
+    if threads <= 1:
+        for chunk in chunks:
+            collect(send_chunk(es, chunk, **retry_options))
+    else:
+        lock = threading.Lock()
+        slots = threading.BoundedSemaphore(threads * 2)
+        errors = []
+
+        def finished(future):
+            try:
+                with lock:
+                    collect(future.result())
+            except Exception as e:
+                errors.append(e)
+            finally:
+                slots.release()
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            for chunk in chunks:
+                slots.acquire()
+                if errors:
+                    slots.release()
+                    break
+                executor.submit(send_chunk, es, chunk, **retry_options).add_done_callback(finished)
+        if errors:
+            raise errors[0]
+
+    totals["seconds"] = time.perf_counter() - start
+    return totals
+
+
+def describe_totals(totals):
+    """Resumo de vazão de uma execução de bulk_ingest."""
+    seconds = totals["seconds"] or 1e-9
+    docs = totals["success"] + totals["failed"]
+    return (f"{docs} docs em {totals['batches']} lotes, {seconds:.1f} s "
+            f"({docs / seconds:.0f} docs/s, {totals['bytes'] / 1e6 / seconds:.2f} MB/s, "
+            f"{totals['retries']} retentativas)")
@@ -0,0 +1,163 @@
+import hashlib
+import re
+import sqlite3
+from array import array
+
+# =========================
+# DUPLICATAS
+# =========================
+#
+# O acervo tem o mesmo parecer salvo mais de uma vez: cópias idênticas com
+# nomes diferentes e reexportações do mesmo texto (outro gerador de PDF,
+# carimbo ou rodapé diferente). Cada grupo é extraído, enviado e indexado
+# uma vez só, pelo documento canônico (o primeiro em ordem de nome):
+#
+#   - duplicata exata  -> mesmo SHA-256 do PDF; detectada antes de abrir o
+#                         arquivo, a partir do hash que o cache já calcula;
+#   - quase duplicata  -> inteiro_teor com similaridade de Jaccard estimada
+#                         >= NEAR_THRESHOLD sobre shingles de palavras.
+#
+# A similaridade é estimada por MinHash (variante de uma permutação: cada
+# shingle cai em um de SIGNATURE_SIZE compartimentos e o mínimo de cada um
+# forma a assinatura) e os candidatos vêm de LSH: a assinatura é dividida em
+# LSH_BANDS faixas e documentos que coincidem em alguma faixa inteira são
+# comparados. Assinaturas e faixas ficam no SQLite do cache de extração,
+# então a detecção vale entre execuções sem reler documentos antigos.
+#
+# A duplicata vira um registro mínimo (DUPLICATE_FIELD -> nome do canônico) e
+# o canônico ganha a lista ALIASES_FIELD; upload e indexação ignoram os
+# registros mínimos.
+
+DUPLICATE_FIELD = "duplicata_de"
+KIND_FIELD = "tipo_duplicata"
+SIMILARITY_FIELD = "similaridade"
+ALIASES_FIELD = "duplicatas"
+
+KIND_EXACT = "exata"
+KIND_NEAR = "quase"
+
+SHINGLE_SIZE = 5        # palavras por shingle
+MIN_SHINGLES = 50       # textos menores (PDFs escaneados, sem texto) não são comparados
+SIGNATURE_SIZE = 128
+LSH_BANDS = 16          # 16 faixas de 8 valores: pares com J >= 0,9 quase sempre viram candidatos
+NEAR_THRESHOLD = 0.9
+
+EMPTY = (1 << 64) - 1
+_WORD_RE = re.compile(r"\w+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS minhash_signatures (
+    source_filename TEXT PRIMARY KEY,
+    signature       BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lsh_buckets (
+    band            INTEGER NOT NULL,
+    bucket          INTEGER NOT NULL,
+    source_filename TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_lsh_buckets ON lsh_buckets (band, bucket);
+CREATE INDEX IF NOT EXISTS idx_lsh_buckets_filename ON lsh_buckets (source_filename);
+"""
+
+
+def is_duplicate(record):
+    return bool(record.get(DUPLICATE_FIELD))
+
+
+def duplicate_record(source_filename, canonical, kind, similarity):
+    """Registro mínimo gravado no lugar da duplicata."""
+    return {
+        "source_filename": source_filename,
+        DUPLICATE_FIELD: canonical,
+        KIND_FIELD: kind,
+        SIMILARITY_FIELD: round(similarity, 3),
+    }
+
+
+def _hash64(data):
+    return int.from_bytes(hashlib.blake2b(data.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    words = _WORD_RE.findall(text.casefold())
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash(text, size=SIGNATURE_SIZE):
+    """Assinatura MinHash do texto, ou None se ele tiver menos de MIN_SHINGLES shingles."""
+    values = shingles(text)
+    if len(values) < MIN_SHINGLES:
+        return None
+
+    signature = array("Q", [EMPTY]) * size
+    for shingle in values:
+        h = _hash64(shingle)
+        slot = h % size
+        h //= size
+        if h < signature[slot]:
+            signature[slot] = h
+    return signature
+
+
+def similarity(a, b):
+    """Jaccard estimado: fração dos compartimentos preenchidos com o mesmo mínimo."""
+    filled = equal = 0
+    for x, y in zip(a, b):
+        if x == EMPTY and y == EMPTY:
+            continue
+        filled += 1
+        equal += x == y
+    return equal / filled if filled else 0.0
+
+
+def band_keys(signature, bands=LSH_BANDS):
+    rows = len(signature) // bands
+    for band in range(bands):
+        chunk = signature[band * rows:(band + 1) * rows].tobytes()
+        yield band, int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), "big", signed=True)
+
+
+class NearDuplicateIndex:
+    """Assinaturas dos documentos canônicos e faixas LSH, no SQLite do cache de extração."""
+
+    def __init__(self, conn, threshold=NEAR_THRESHOLD):
+        self.conn = conn
+        self.threshold = threshold
+        self.conn.executescript(SCHEMA)
+
+    def _signature(self, source_filename):
+        row = self.conn.execute(
+            "SELECT signature FROM minhash_signatures WHERE source_filename = ?", (source_filename,)
+        ).fetchone()
+        return array("Q", row[0]) if row else None
+
+    def find(self, signature, exclude=None):
+        """(canônico, similaridade) mais parecido acima do limiar, ou None."""
+        candidates = set()
+        for band, bucket in band_keys(signature):
+            candidates.update(name for (name,) in self.conn.execute(
+                "SELECT source_filename FROM lsh_buckets WHERE band = ? AND bucket = ?", (band, bucket)
+            ))
+        candidates.discard(exclude)
+
+        best = None
+        for name in sorted(candidates):
+            score = similarity(signature, self._signature(name))
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (name, score)
+        return best
+
+    def add(self, source_filename, signature):
+        self.remove(source_filename)
+        self.conn.execute(
+            "INSERT INTO minhash_signatures (source_filename, signature) VALUES (?, ?)",
+            (source_filename, sqlite3.Binary(signature.tobytes())),
+        )
+        self.conn.executemany(
+            "INSERT INTO lsh_buckets (band, bucket, source_filename) VALUES (?, ?, ?)",
+            [(band, bucket, source_filename) for band, bucket in band_keys(signature)],
+        )
+
+    def remove(self, source_filename):
+        self.conn.execute("DELETE FROM minhash_signatures WHERE source_filename = ?", (source_filename,))
+        self.conn.execute("DELETE FROM lsh_buckets WHERE source_filename = ?", (source_filename,))
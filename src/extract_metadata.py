@@ -1,26 +1,75 @@
 import os
 import glob
-import json
-import re
-import csv
-import pdfplumber
 import logging
 from datetime import datetime
 import argparse
+import time
 import traceback
+from record_io import JsonlSink, iter_records, iter_latest_records, export_json, tombstone, write_csv
+from extraction_cache import ExtractionCache, STATUS_OK, STATUS_FAILED, STATUS_DUPLICATE, sha256_file
+from field_rules import extract_fields
+from normalization import normalize_record
+from pdf_backends import BACKENDS, PAGE_MODES, open_document, select_pages, join_pages
+from page_text_store import PageTextStore, CachedDocument
+from full_text_store import FullTextStore, REF_FIELD, TEXT_FIELD
+from dedup import (ALIASES_FIELD, DUPLICATE_FIELD, SIMILARITY_FIELD, KIND_EXACT, KIND_NEAR, NEAR_THRESHOLD,
+                   NearDuplicateIndex, duplicate_record, is_duplicate, minhash)
+from supervisor import SupervisedPool, WorkerLimitExceeded
+from work_queue import LEASE_SECONDS, Heartbeat, WorkQueue, default_worker_id, file_lock
+from object_source import (PREFETCH_DEPTH, SOURCE_FIELD, Prefetcher, RangedObject, content_key, is_object_uri,
+                           list_objects, object_uri)
 
 # =========================
 # CONFIGURAÇÕES
 # =========================
 
-RAW_DATA_DIR = r"C:\Users\mlzengo\Documents\TJGO\II SEMESTRE\natjus_extract\data\raw_data\NT e PARECERES"
-PROCESSED_DATA_DIR = r"C:\Users\mlzengo\Documents\TJGO\II SEMESTRE\natjus_extract\data\processed_data"
+RAW_DATA_DIR = os.getenv(
+    "NATJUS_RAW_DATA_DIR",
+    r"C:\Users\mlzengo\Documents\TJGO\II SEMESTRE\natjus_extract\data\raw_data\NT e PARECERES",
+)
+PROCESSED_DATA_DIR = os.getenv(
+    "NATJUS_PROCESSED_DATA_DIR",
+    r"C:\Users\mlzengo\Documents\TJGO\II SEMESTRE\natjus_extract\data\processed_data",
+)
+# s3://bucket/prefixo/: lê os PDFs direto do MinIO em vez de RAW_DATA_DIR (object_source.py)
+SOURCE_URI = os.getenv("NATJUS_SOURCE_URI")
 
 OUTPUT_JSON = os.path.join(PROCESSED_DATA_DIR, "metadados_extraidos.json")
+OUTPUT_JSONL = os.path.join(PROCESSED_DATA_DIR, "metadados_extraidos.jsonl")
 OUTPUT_CSV = os.path.join(PROCESSED_DATA_DIR, "metadados_extraidos.csv")
 REPORT_FILE = os.path.join(PROCESSED_DATA_DIR, "relatorio_extracao.md")
-CHECKPOINT_FILE = os.path.join(PROCESSED_DATA_DIR, "checkpoint.json")
+CHECKPOINT_FILE = os.path.join(PROCESSED_DATA_DIR, "checkpoint.json")  # legado, migrado para o cache
+CACHE_DB = os.path.join(PROCESSED_DATA_DIR, "extraction_cache.sqlite")
+TEXT_CACHE_DIR = os.path.join(PROCESSED_DATA_DIR, "page_text")
+FULL_TEXT_DIR = os.path.join(PROCESSED_DATA_DIR, "inteiro_teor")  # inteiro_teor fora do JSON (full_text_store.py)
 LOG_FILE = os.path.join(PROCESSED_DATA_DIR, "processamento.log")
+TIMINGS_FILE = os.path.join(PROCESSED_DATA_DIR, "tempos_extracao.jsonl")  # tempos por documento e etapa
+QUEUE_DB = os.path.join(PROCESSED_DATA_DIR, "fila_extracao.sqlite")  # extração distribuída (work_queue.py)
+PREFETCH_DIR = os.path.join(PROCESSED_DATA_DIR, "prefetch")  # blocos baixados à frente (origem s3://)
+
+# Incrementar sempre que as regras de extração mudarem: documentos extraídos
+# por versões anteriores são reprocessados na próxima execução.
+EXTRACTOR_VERSION = "2"
+# Versão atribuída ao que vem de um checkpoint.json antigo (extrator anterior
+# à normalização): difere de EXTRACTOR_VERSION, então é reextraído
+LEGACY_VERSION = "1"
+
+DEFAULT_BACKEND = "pdfplumber"
+DEFAULT_PAGE_MODE = "window"
+
+# Limites de cada worker de extração (supervisor.py)
+DOCUMENT_TIMEOUT = 300        # segundos por documento
+MAX_WORKER_RSS_MB = 3072      # memória residente máxima de um worker
+MAX_TASKS_PER_WORKER = 200    # documentos antes de reciclar o processo
+RETRY_BACKEND = "pypdf"       # backend mais barato para documentos interrompidos
+
+# Extração distribuída
+CLAIM_SIZE = 20               # arquivos reivindicados por vez
+QUEUE_POLL_SECONDS = 10       # espera quando só restam arquivos em lease de outros extratores
+
+# Chave temporária com os tempos do documento; process_files a remove antes
+# de gravar o registro (ela atravessa o pool de processos junto com ele).
+TIMINGS_KEY = "_tempos"
 
 os.makedirs(PROCESSED_DATA_DIR, exist_ok=True)
 
@@ -39,29 +88,22 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-# =========================
-# CHECKPOINT
-# =========================
-
-def load_checkpoint():
-    if os.path.exists(CHECKPOINT_FILE):
-        with open(CHECKPOINT_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {"processed": [], "failed": []}
-
-
-def save_checkpoint(checkpoint):
-    with open(CHECKPOINT_FILE, "w", encoding="utf-8") as f:
-        json.dump(checkpoint, f, ensure_ascii=False, indent=4)
-
-
 # =========================
 # EXTRAÇÃO
 # =========================
 
-def extract_metadata(pdf_path):
-    filename = os.path.basename(pdf_path)
+def extractor_version(backend=DEFAULT_BACKEND, page_mode=DEFAULT_PAGE_MODE):
+    """Versão registrada no cache; backend e modo de páginas alteram a saída."""
+    if backend == DEFAULT_BACKEND and page_mode == DEFAULT_PAGE_MODE:
+        return EXTRACTOR_VERSION
+    return f"{EXTRACTOR_VERSION}+{backend}+{page_mode}"
+
 
+def build_metadata(filename, full_text, timings=None):
+    """
+    Metadados do documento a partir do texto. Se `timings` for um dict,
+    registra nele o tempo de cada regra ("rule_seconds") e da normalização.
+    """
     metadata = {
         "source_filename": filename,
         "tipo_arquivo": "Nota Técnica" if "N.T" in filename or "NOTA" in filename.upper() else "Parecer",
@@ -71,7 +113,7 @@ def extract_metadata(pdf_path):
         "cid": None,
         "n_nota_tecnica": None,
         "desfecho": "Não identificado",
-        "inteiro_teor": "",
+        "inteiro_teor": full_text,
         "objeto": None,
         "classificador_do_objeto": None,
         "informacao_complementar": None,
@@ -79,212 +121,816 @@ def extract_metadata(pdf_path):
         "medicamento_e_insumo": None
     }
 
+    # Regras pré-compiladas em field_rules (processo, nota técnica, CID,
+    # assunto, objeto, desfecho e data do envio)
+    rule_seconds = {} if timings is not None else None
+    metadata.update(extract_fields(full_text, filename, rule_seconds))
+
+    # Data em ISO, CID e processo na forma canônica (normalization.py)
+    start = time.perf_counter()
+    normalize_record(metadata)
+
+    if timings is not None:
+        timings["rule_seconds"] = rule_seconds
+        timings["stages"]["rules"] = sum(rule_seconds.values())
+        timings["stages"]["normalize"] = time.perf_counter() - start
+    return metadata
+
+
+_text_store = None
+
+
+def get_text_store():
+    """PageTextStore do processo atual (cada worker grava no seu próprio pack)."""
+    global _text_store
+    if _text_store is None:
+        _text_store = PageTextStore(TEXT_CACHE_DIR)
+    return _text_store
+
+
+def extract_metadata(pdf_path, backend=DEFAULT_BACKEND, page_mode=DEFAULT_PAGE_MODE, text_cache=False,
+                     prefetch_dir=None, sha256=None):
+    """
+    Metadados de um PDF (caminho local ou s3://). O registro leva em
+    TIMINGS_KEY o tempo de cada etapa (abertura, texto de cada página, seleção
+    de páginas, regras, normalização).
+
+    `sha256` é o hash já calculado por pending_files; sem ele, o cache de
+    texto precisa ler o PDF inteiro mais uma vez para obter a chave.
+    """
+    filename = os.path.basename(pdf_path)
+    start = time.perf_counter()
+    source = None
+
     try:
-        full_text = ""
-
-        with pdfplumber.open(pdf_path) as pdf:
-            total_pages = len(pdf.pages)
-            
-            # Se tiver muitas páginas, lê apenas o início e o fim para otimizar
-            if total_pages > 20:
-                pages_to_read = pdf.pages[:10] + pdf.pages[-10:]
-            else:
-                pages_to_read = pdf.pages
-
-            for page in pages_to_read:
-                try:
-                    text = page.extract_text()
-                    if text:
-                        full_text += text + "\n"
-                except Exception:
-                    continue  # Ignora páginas com erro de leitura
-
-        metadata["inteiro_teor"] = full_text
-
-        # ---------------------------------------------------------
-        # ESTRATÉGIA DE EXTRAÇÃO ROBUSTA
-        # ---------------------------------------------------------
-        
-        # 1. Normalização do Texto
-        # Remove quebras de linha excessivas e espaços duplos para manter 'frases'
-        # Mas mantém uma versão completa para buscas que dependem de layout
-        lines = [line.strip() for line in full_text.split('\n') if line.strip()]
-        text_normalized = ' '.join(lines)
-
-        # 2. Processo - Regex expandido e fallback para nome do arquivo
-        # Padrão CNJ: NNNNNNN-DD.AAAA.J.TR.OORR
-        proc_regex = r"\d{7}-\d{2}\.\d{4}\.\d\.\d{2}\.\d{4}"
-        proc = re.search(proc_regex, full_text)
-        
-        if proc:
-            metadata["processo"] = proc.group(0)
-        else:
-            # Tenta encontrar no nome do arquivo
-            proc_filename = re.search(proc_regex, filename)
-            if proc_filename:
-                metadata["processo"] = proc_filename.group(0)
-
-        # 3. Nota Técnica / Parecer
-        nt_regex = r"(?:Nota\s+T[ée]cnica|Parecer|Parecer\s+T[ée]cnico)\s*(?:n[º°\.]?|número)?\s*(\d+(?:[./-]\d{4})?)"
-        nt = re.search(nt_regex, full_text[:2000], re.IGNORECASE)
-        
-        if nt:
-            metadata["n_nota_tecnica"] = nt.group(1)
+        if is_object_uri(pdf_path):
+            source = RangedObject(pdf_path, spool_dir=prefetch_dir)
+            size, key = source.size, content_key(source.etag)
         else:
-            nt_filename = re.match(r"^(\d+)\s", filename)
-            if nt_filename:
-                metadata["n_nota_tecnica"] = nt_filename.group(1)
-
-        # 4. CID (Classificação Internacional de Doenças)
-        # Tenta padrões comuns, incluindo espaços (E 04.8) e sem separador CID
-        cid_regexes = [
-            r"CID(?:-10)?\s*[:\-]?\s*([A-Z]\d{2}(?:\.?\d{1})?)", # Padrão
-            r"CID\s*[:\-]?\s*([A-Z]\s?\d{2}(?:\.?\d{1})?)",     # Com espaço extra
-            r"Diagnóstico.*([A-Z]\d{2}(?:\.\d{1})?)",            # Contexto Diagnóstico
-        ]
-        
-        for regex in cid_regexes:
-            cid_match = re.search(regex, full_text, re.IGNORECASE | re.DOTALL)
-            if cid_match:
-                # Remove espaços internos possíveis (ex: E 04.8 -> E04.8) para padronizar
-                cid_clean = cid_match.group(1).replace(" ", "")
-                metadata["cid"] = cid_clean
-                break
-
-        # 5. Assunto / Objeto / Medicamento
-        # Tenta extrair blocos de texto entre cabeçalhos comuns
-        
-        # Assunto: Geralmente logo no início, após cabeçalho "Assunto:"
-        # Captura até encontrar um padrão de próxima seção (ex: "I -", "1.", "DA CONSULTA")
-        assunto_regex = r"Assunto\s*[:\-]\s*(.*?)(?=(?:I\s*[\-\)]|1\.|DA IDENTIFICAÇÃO|DA CONSULTA|DADOS DO PROCESSO|$))"
-        assunto_match = re.search(assunto_regex, full_text, re.IGNORECASE | re.DOTALL)
-        if assunto_match:
-            assunto_limpo = assunto_match.group(1).strip().replace('\n', ' ')
-            metadata["Assunto"] = assunto_limpo[:500] if len(assunto_limpo) > 500 else assunto_limpo 
-
-        # Medicamento / Objeto
-        # Busca por termos chave que indiquem o que está sendo pedido
-        termos_objeto = ["Solicita", "Requer", "Prescrição", "Medicamento", "Fármaco", "Procedimento"]
-        for termo in termos_objeto:
-            # Busca algo como "Solicita: exame oncotype" ou "Medicamento: xxxx"
-            # Pega a linha ou frase inteira
-            obj_match = re.search(fr"{termo}(?:ção)?\s*[:\-]?\s*([^.;\n]*?[a-zA-Z]{{3,}}[^.;\n]*)", full_text, re.IGNORECASE)
-            if obj_match:
-                possivel_objeto = obj_match.group(1).strip()
-                # Evita capturar textos genéricos de cabeçalho
-                if len(possivel_objeto) > 3 and "..." not in possivel_objeto:
-                    if metadata["objeto"] is None:
-                        metadata["objeto"] = possivel_objeto
-                    elif possivel_objeto not in metadata["objeto"]:
-                        metadata["objeto"] += f" | {possivel_objeto}"
-
-        # 6. Desfecho / Conclusão
-        # Procura seção de conclusão
-        conclusao_regex = r"(?:V\)|IV\)|Conclusão|Considerações Finais)\s*[:\-]?\s*(.*?)(?:Goiânia|Este é o parecer|$)"
-        conclusao_match = re.search(conclusao_regex, full_text, re.IGNORECASE | re.DOTALL)
-        
-        if conclusao_match:
-            texto_conclusao = conclusao_match.group(1).lower()
-            if "favorável" in texto_conclusao and "desfavorável" not in texto_conclusao:
-                metadata["desfecho"] = "Favorável"
-            elif "desfavorável" in texto_conclusao:
-                metadata["desfecho"] = "Desfavorável"
-            elif "parcialmente" in texto_conclusao:
-                metadata["desfecho"] = "Parcialmente Favorável"
-            else:
-                metadata["desfecho"] = "Inconclusivo / Não Identificado Explicitamente"
-        else:
-            # Tenta encontrar palavras soltas perto do fim
-            if "favorável" in full_text[-2000:].lower():
-                 metadata["desfecho"] = "Favorável (Inferido)"
-
-        # 7. Data do Envio (geralmente ao final)
-        data_regex = r"Goiânia(?:-GO)?\s*,?\s*(\d{1,2})\s*de\s*([A-Za-zç]+)\s*de\s*(\d{4})"
-        
-        # Encontra todas as correspondências e pega a última
-        datas_encontradas = re.findall(data_regex, full_text, re.IGNORECASE)
-        
-        if datas_encontradas:
-            dia, mes, ano = datas_encontradas[-1]
-            metadata["data_do_envio"] = f"{dia} de {mes} de {ano}"
+            source = pdf_path
+            size = os.path.getsize(pdf_path)
+            key = (sha256 or sha256_file(pdf_path)) if text_cache else None
 
+        if text_cache:
+            store = get_text_store()
+            doc = CachedDocument(store, key, backend, source, filename)
+        else:
+            store = None
+            doc = open_document(source, backend)
+        opened = time.perf_counter()
+
+        with doc:
+            full_text = join_pages(doc, select_pages(doc, page_mode))
+        joined = time.perf_counter()
+
+        if store is not None:
+            store.flush()
+
+        extract_text = sum(doc.page_seconds.values())
+        timings = {
+            "source_filename": filename,
+            "backend": backend,
+            "page_mode": page_mode,
+            "bytes": size,
+            "pages": doc.page_count,
+            "pages_parsed": doc.pages_parsed,
+            "stages": {
+                "open": opened - start,
+                "extract_text": extract_text,
+                "select_pages": max(0.0, joined - opened - extract_text),
+            },
+            "page_seconds": [doc.page_seconds[index] for index in sorted(doc.page_seconds)],
+        }
+        if source is not pdf_path:
+            timings["bytes_fetched"] = source.bytes_fetched
+            timings["bytes_prefetched"] = source.bytes_spooled
+
+        metadata = build_metadata(filename, full_text, timings)
+        if source is not pdf_path:
+            metadata[SOURCE_FIELD] = pdf_path
+        timings["stages"]["total"] = time.perf_counter() - start
+        metadata[TIMINGS_KEY] = timings
         return metadata
 
     except Exception as e:
         logger.error(f"Erro ao processar {filename}: {e}")
         logger.debug(traceback.format_exc())
         raise
+    finally:
+        # Solta os blocos em memória do objeto; o spool é apagado pelo Prefetcher
+        if source is not None and source is not pdf_path:
+            source.close()
+
+
+def extract_from_text_cache(sha256, filename, backend=DEFAULT_BACKEND, page_mode=DEFAULT_PAGE_MODE):
+    """
+    Reaplica as regras sobre o texto guardado no cache de páginas. O PDF só é
+    aberto se a seleção de páginas pedir alguma que não foi guardada.
+    """
+    pdf_path = os.path.join(RAW_DATA_DIR, filename)
+    if not os.path.exists(pdf_path):
+        pdf_path = None
+
+    store = get_text_store()
+    with CachedDocument(store, sha256, backend, pdf_path, filename) as doc:
+        full_text = join_pages(doc, select_pages(doc, page_mode))
+    return build_metadata(filename, full_text)
 
 
 # =========================
 # SALVAMENTO
 # =========================
 
-def save_json(data):
-    with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
+def seed_jsonl_from_json():
+    """
+    Na primeira execução com o sink JSONL, importa o JSON de execuções
+    anteriores para que a exportação final não perca esses registros.
+    """
+    if os.path.exists(OUTPUT_JSONL) or not os.path.exists(OUTPUT_JSON):
+        return
+
+    logger.info(f"Importando registros existentes de {OUTPUT_JSON} para {OUTPUT_JSONL}")
+    with JsonlSink(OUTPUT_JSONL) as sink:
+        for record in iter_records(OUTPUT_JSON):
+            sink.write(record)
+
+
+def csv_records(path):
+    """Registros do CSV: as duplicatas aparecem só na coluna do documento canônico."""
+    for record in iter_latest_records(path):
+        if is_duplicate(record):
+            continue
+        record[ALIASES_FIELD] = "; ".join(record.get(ALIASES_FIELD) or [])
+        yield record
+
+
+def export_outputs():
+    """Gera o JSON e o CSV finais a partir do JSONL, uma única vez."""
+    if not os.path.exists(OUTPUT_JSONL):
+        return
+
+    total = export_json(OUTPUT_JSONL, OUTPUT_JSON)
+    write_csv(csv_records(OUTPUT_JSONL), OUTPUT_CSV, drop_fields=(TEXT_FIELD, REF_FIELD))
+    logger.info(f"Exportados {total} registros para {OUTPUT_JSON} e {OUTPUT_CSV}")
+
+
+# =========================
+# EXECUÇÃO (SERIAL / PARALELA)
+# =========================
+
+def extraction_limits(timeout=DOCUMENT_TIMEOUT, max_rss_mb=MAX_WORKER_RSS_MB, max_tasks=MAX_TASKS_PER_WORKER):
+    """Limites dos workers supervisionados; 0 desativa cada um."""
+    return {"timeout": timeout or None, "max_rss_mb": max_rss_mb or None, "max_tasks": max_tasks or None}
+
+
+def _extract_with_hash(item, **options):
+    pdf, sha256 = item
+    return extract_metadata(pdf, sha256=sha256, **options)
+
+
+def iter_extractions(pdf_files, workers=1, limits=None, prefetch=0, hashes=None, **options):
+    """
+    Gera (pdf, metadados, erro) na mesma ordem de `pdf_files`.
+
+    `options` são repassadas a extract_metadata (backend, page_mode). Com
+    `hashes` ({pdf: sha256} de pending_files) e o cache de texto ativo, cada
+    documento leva o próprio hash em vez de o worker reler o PDF para obtê-lo.
+
+    PDFs s3:// são lidos por faixas de bytes (object_source.py); com
+    `prefetch` > 0, o início e o fim dos próximos `prefetch` objetos são
+    baixados em segundo plano enquanto os atuais são extraídos.
+
+    Com workers > 1 ou algum limite ativo em `limits` (extraction_limits),
+    cada documento é extraído em workers supervisionados (supervisor.py): um
+    documento que passa do tempo ou da memória, ou que derruba o processo,
+    sai com erro sem afetar os demais, e os workers são reciclados
+    periodicamente. Com um worker e todos os limites em 0 a extração roda no
+    próprio processo. A ordem de saída
+    continua determinística e no máximo 2 * workers arquivos ficam em
+    processamento ou aguardando o consumidor.
+    """
+    if prefetch and any(is_object_uri(pdf) for pdf in pdf_files):
+        options["prefetch_dir"] = os.path.join(PREFETCH_DIR, str(os.getpid()))
+        prefetcher = Prefetcher(pdf_files, options["prefetch_dir"], prefetch, ahead=max(1, workers),
+                                log=logger.warning)
+        try:
+            for pdf, data, error in iter_extractions(pdf_files, workers, limits, hashes=hashes, **options):
+                prefetcher.done(pdf)
+                yield pdf, data, error
+        finally:
+            prefetcher.close()
+        return
+
+    known = hashes if hashes and options.get("text_cache") else {}
 
+    # extraction_limits sempre devolve as três chaves: o que conta é ter valor
+    if workers <= 1 and not any((limits or {}).values()):
+        for pdf in pdf_files:
+            try:
+                yield pdf, extract_metadata(pdf, sha256=known.get(pdf), **options), None
+            except Exception as e:
+                yield pdf, None, e
+        return
+
+    if known:
+        pool = SupervisedPool(_extract_with_hash, workers, log=logger.warning, **(limits or {}), **options)
+        for (pdf, _sha256), data, error in pool.imap([(pdf, known.get(pdf)) for pdf in pdf_files]):
+            yield pdf, data, error
+    else:
+        pool = SupervisedPool(extract_metadata, workers, log=logger.warning, **(limits or {}), **options)
+        yield from pool.imap(pdf_files)
+    if pool.killed or pool.recycled:
+        logger.info(f"Workers: {pool.killed} interrompido(s) por limite, {pool.recycled} reciclado(s)")
+
+
+# =========================
+# PENDENTES / PROCESSAMENTO
+# =========================
 
-def save_csv(data):
-    if not data:
+def pending_files(cache, version, paths=None, commit_every=500, present=None):
+    """
+    PDFs novos, substituídos, com falha ou de versão antiga do extrator, em
+    ordem de nome, entre `paths` (padrão: todos os PDFs de RAW_DATA_DIR).
+    Retorna (lista de caminhos, {caminho: sha256}). O nome de cada PDF
+    listado é acrescentado a `present`, se informado.
+    """
+    if paths is None:
+        paths = glob.glob(os.path.join(RAW_DATA_DIR, "*.pdf"))
+
+    hashes = {}
+    pdf_files = []
+    listed = {}
+    for i, path in enumerate(sorted(paths), 1):
+        if present is not None:
+            present.add(os.path.basename(path))
+        sha = cache.content_hash(path)
+        listed[os.path.basename(path)] = (path, sha)
+        if not cache.is_current(sha, os.path.basename(path), version):
+            hashes[path] = sha
+            pdf_files.append(path)
+        # Hashes novos gravados aos poucos: não segura o lock de escrita do
+        # SQLite durante a leitura de todos os PDFs
+        if i % commit_every == 0:
+            cache.commit()
+    cache.commit()
+    add_orphaned_duplicates(cache, listed, pdf_files, hashes)
+    return pdf_files, hashes
+
+
+def pending_objects(cache, version, source, present=None):
+    """
+    Como pending_files, para PDFs no MinIO/S3 (`source` = s3://bucket/prefixo/):
+    a listagem traz tamanho e ETag, então nada é baixado para decidir o que
+    está pendente. Retorna (lista de URIs, {uri: content_key(etag)}).
+    """
+    hashes = {}
+    pdf_files = []
+    listed = {}
+    for uri, _size, etag in list_objects(source):
+        if present is not None:
+            present.add(os.path.basename(uri))
+        key = content_key(etag)
+        listed[os.path.basename(uri)] = (uri, key)
+        if not cache.is_current(key, os.path.basename(uri), version):
+            hashes[uri] = key
+            pdf_files.append(uri)
+    add_orphaned_duplicates(cache, listed, pdf_files, hashes)
+    return pdf_files, hashes
+
+
+def add_orphaned_duplicates(cache, listed, pdf_files, hashes):
+    """
+    Acrescenta aos pendentes as duplicatas de canônicos substituídos por outro
+    conteúdo: o registro delas ainda aponta para o conteúdo anterior, então
+    voltam a ser extraídas nesta mesma execução. `listed` é {nome: (caminho,
+    hash)} de tudo que foi listado na origem.
+    """
+    for path in list(pdf_files):
+        name = os.path.basename(path)
+        previous = cache.current_sha256(name)
+        if previous is None or previous == hashes[path]:
+            continue
+        for duplicate in cache.duplicates_of(name, previous):
+            if duplicate in listed and listed[duplicate][0] not in hashes:
+                duplicate_path, sha = listed[duplicate]
+                hashes[duplicate_path] = sha
+                pdf_files.append(duplicate_path)
+
+
+def source_files(cache, version, source=None, present=None):
+    """Pendentes de RAW_DATA_DIR ou, com `source`, do bucket."""
+    if source:
+        return pending_objects(cache, version, source, present=present)
+    return pending_files(cache, version, present=present)
+
+
+def source_path(name, source=None):
+    return object_uri(source, name) if source else os.path.join(RAW_DATA_DIR, name)
+
+
+def split_exact_duplicates(cache, pdf_files, hashes):
+    """
+    Separa os PDFs cujo conteúdo já foi extraído com outro nome (ou aparece
+    antes na lista). Retorna (PDFs a extrair, [(pdf duplicado, canônico)]).
+    """
+    unique = []
+    duplicates = []
+    first = {}
+    # Um canônico do cache que está pendente com outro conteúdo (PDF
+    # substituído) não vale mais como canônico deste hash
+    pending = {os.path.basename(pdf): hashes[pdf] for pdf in pdf_files}
+    for pdf in pdf_files:
+        name = os.path.basename(pdf)
+        canonical = first.get(hashes[pdf])
+        if canonical is None:
+            canonical = cache.canonical_for(hashes[pdf], exclude=name)
+            if canonical is not None and pending.get(canonical, hashes[pdf]) != hashes[pdf]:
+                canonical = None
+        if canonical:
+            duplicates.append((pdf, canonical))
+        else:
+            first[hashes[pdf]] = name
+            unique.append(pdf)
+    return unique, duplicates
+
+
+def check_near_duplicate(cache, dedup, name, data, sha256=None):
+    """
+    Registro mínimo se o texto for quase igual ao de um canônico já
+    extraído; senão o próprio registro, cuja assinatura entra no índice LSH.
+    Documentos que já são canônicos de outros continuam canônicos.
+    """
+    signature = minhash(data.get(TEXT_FIELD) or "") if dedup.threshold else None
+    if signature is None:
+        dedup.remove(name)
+        return data
+
+    match = dedup.find(signature, exclude=name)
+    if match is None or cache.duplicates_of(name, sha256):
+        dedup.add(name, signature)
+        return data
+
+    canonical, score = match
+    dedup.remove(name)
+    logger.info(f"{name}: quase duplicata de {canonical} (similaridade {score:.2f})")
+    return duplicate_record(name, canonical, KIND_NEAR, score)
+
+
+def refresh_aliases(cache, sink, canonicals, written):
+    """
+    Regrava os documentos canônicos cuja lista de duplicatas mudou depois da
+    última gravação. Gera (pdf, registro, None) como process_files.
+    """
+    stale = {name for name in canonicals if cache.duplicates_of(name) != written.get(name)}
+    if not stale:
         return
 
-    # Remove inteiro_teor para CSV
-    csv_data = []
-    for row in data:
-        r = row.copy()
-        r.pop("inteiro_teor", None)
-        csv_data.append(r)
+    sink.flush()
+    # Lidos antes de gravar: o sink anexa ao mesmo arquivo
+    updated = [record for record in iter_latest_records(sink.path)
+               if record.get("source_filename") in stale and not is_duplicate(record)]
+    for record in updated:
+        record[ALIASES_FIELD] = cache.duplicates_of(record["source_filename"])
+        sink.write(record)
+        yield os.path.join(RAW_DATA_DIR, record["source_filename"]), record, None
+    logger.info(f"Lista de duplicatas atualizada em {len(updated)} documento(s) canônico(s)")
+
+
+def propagate_removals(cache, present, shared=False):
+    """
+    Arquivos do cache que saíram da origem (não estão em `present`): cada um
+    ganha um tombstone no JSONL, que o tira do JSON/CSV, do upload e da
+    indexação (02_index_legacy apaga os documentos que sumiram da entrada), e
+    é esquecido pelo cache. Canônicos que perderam duplicatas são regravados.
+    Retorna (nomes removidos, registros canônicos regravados).
+    """
+    removed = cache.missing(present)
+    if not removed:
+        return [], []
+    if not present:
+        # Pasta vazia ou volume não montado: não apaga o corpus inteiro
+        logger.warning(f"Origem sem nenhum PDF; {len(removed)} documento(s) do cache mantido(s)")
+        return [], []
+
+    dedup = NearDuplicateIndex(cache.conn)
+    canonicals = set()
+    with JsonlSink(OUTPUT_JSONL, batch_size=len(removed), shared=shared) as sink:
+        for name in removed:
+            sink.write(tombstone(name))
+            canonical = cache.forget(name)
+            dedup.remove(name)
+            if canonical is not None:
+                canonicals.add(canonical)
+        canonicals -= set(removed)
+        refreshed = [record for _pdf, record, _error in refresh_aliases(cache, sink, canonicals, {})]
+    cache.commit()
+    logger.info(f"{len(removed)} arquivo(s) removido(s) da origem: tombstones gravados no JSONL")
+    return removed, refreshed
+
+
+def scan_sources(cache, version, source=None, shared=False):
+    """
+    source_files com a listagem completa da origem, propagando antes as
+    remoções. Se algo saiu, a lista é refeita: duplicatas de um canônico
+    removido voltam a ser pendentes. Retorna (pendentes, hashes, removidos,
+    canônicos regravados).
+    """
+    present = set()
+    pdf_files, hashes = source_files(cache, version, source, present)
+    removed, refreshed = propagate_removals(cache, present, shared)
+    if removed:
+        pdf_files, hashes = source_files(cache, version, source)
+    return pdf_files, hashes, removed, refreshed
+
+
+def process_files(cache, pdf_files, hashes, version, sink, batch_size=50, workers=1, timings_sink=None,
+                  full_texts=None, limits=None, retry_backend=None, dedup=None, **options):
+    """
+    Extrai `pdf_files`, grava cada registro no sink e o resultado no cache.
+    Gera (pdf, metadados, erro) à medida que cada arquivo termina, para que
+    outras etapas (pipeline.py) possam consumir os registros na sequência.
+
+    Os tempos de cada documento (incluindo a escrita no sink) vão para
+    `timings_sink`, se informado; generate_report.py os agrega. Com
+    `full_texts` (FullTextStore), o sink recebe o registro sem o inteiro_teor,
+    só com a referência; o registro gerado continua com o texto.
+
+    Documentos interrompidos por tempo ou memória ficam como `failed` no
+    cache, com o motivo, e com `retry_backend` são tentados de novo no fim,
+    com esse backend (mais barato).
+
+    Com `dedup` (NearDuplicateIndex), duplicatas exatas não são abertas e
+    quase duplicatas não têm o texto gravado: ambas saem como registro mínimo
+    (dedup.duplicate_record) e os canônicos afetados são regravados no fim
+    com a lista de duplicatas.
+    """
+    retry = []
+    backend = options.get("backend", DEFAULT_BACKEND)
+    canonicals = set()   # canônicos que ganharam duplicatas nesta execução
+    written = {}         # canônico -> lista de duplicatas gravada no registro
+
+    if dedup is not None:
+        pdf_files, exact = split_exact_duplicates(cache, pdf_files, hashes)
+        if exact:
+            logger.info(f"{len(exact)} duplicata(s) exata(s) ignorada(s) antes da extração")
+        for pdf, canonical in exact:
+            name = os.path.basename(pdf)
+            record = duplicate_record(name, canonical, KIND_EXACT, 1.0)
+            sink.write(record)
+            cache.mark_duplicate(hashes[pdf], name, version, canonical, KIND_EXACT)
+            dedup.remove(name)
+            canonicals.add(canonical)
+            yield pdf, record, None
+        sink.flush()
+        cache.commit()
+
+    def attempts():
+        yield from iter_extractions(pdf_files, workers, limits, hashes=hashes, **options)
+        if retry:
+            logger.info(f"Repetindo {len(retry)} documento(s) interrompido(s) com o backend {retry_backend}")
+            yield from iter_extractions(retry, workers, limits, hashes=hashes,
+                                        **dict(options, backend=retry_backend))
+
+    for i, (pdf, data, error) in enumerate(attempts(), 1):
+        name = os.path.basename(pdf)
+        total = len(pdf_files) + len(retry)
+        timings = data.pop(TIMINGS_KEY, None) if data is not None else None
+        if timings is not None:
+            logger.info(f"[{i}/{total}] Processando {name} ({timings['stages']['total'] * 1000:.0f} ms)")
+        else:
+            logger.info(f"[{i}/{total}] Processando {name}")
+
+        if (isinstance(error, WorkerLimitExceeded) and retry_backend and retry_backend != backend
+                and pdf not in retry):
+            retry.append(pdf)
+
+        start = time.perf_counter()
+        if error is None and dedup is not None:
+            data = check_near_duplicate(cache, dedup, name, data, hashes[pdf])
+            if is_duplicate(data):
+                cache.mark_duplicate(hashes[pdf], name, version, data[DUPLICATE_FIELD], KIND_NEAR,
+                                     data[SIMILARITY_FIELD], cache.current_sha256(data[DUPLICATE_FIELD]))
+                canonicals.add(data[DUPLICATE_FIELD])
+                sink.write(data)
+            else:
+                # Só as duplicatas deste conteúdo: as de um PDF anterior com o mesmo nome caem no registro
+                aliases = cache.duplicates_of(name, hashes[pdf])
+                data[ALIASES_FIELD] = aliases
+                if aliases:
+                    written[name] = aliases
+
+        if error is None and not is_duplicate(data):
+            sink.write(full_texts.detach(data) if full_texts is not None else data)
+            cache.mark_processed(hashes[pdf], name, version)
+        elif error is not None:
+            cache.mark_failed(hashes[pdf], name, version, error)
+        written_seconds = time.perf_counter() - start
+
+        # fsync dos textos e do JSONL antes do commit: o cache nunca fica à
+        # frente da saída, nem a saída à frente dos textos que ela referencia
+        if i % batch_size == 0:
+            start = time.perf_counter()
+            if full_texts is not None:
+                full_texts.flush()
+            sink.flush()
+            cache.commit()
+            written_seconds += time.perf_counter() - start
+
+        if timings is not None and timings_sink is not None:
+            timings["stages"]["sink_write"] = written_seconds
+            timings["stages"]["total"] += written_seconds
+            timings_sink.write(timings)
+
+        yield pdf, data, error
+
+    # Os canônicos regravados saem só com a referência ao texto: o texto
+    # precisa estar no store antes que outra etapa (pipeline.py) os leia
+    if full_texts is not None:
+        full_texts.flush()
+    sink.flush()
+    cache.commit()
+
+    if canonicals:
+        yield from refresh_aliases(cache, sink, canonicals, written)
+        sink.flush()
+        cache.commit()
+
 
-    fields = csv_data[0].keys()
+# =========================
+# EXTRAÇÃO DISTRIBUÍDA
+# =========================
+
+def export_outputs_once():
+    """
+    export_outputs entre extratores distribuídos: um por vez, e só se o JSONL
+    mudou depois da última exportação.
+    """
+    with file_lock(QUEUE_DB + ".export.lock"):
+        if (not os.path.exists(OUTPUT_CSV) or not os.path.exists(OUTPUT_JSONL)
+                or os.path.getmtime(OUTPUT_CSV) < os.path.getmtime(OUTPUT_JSONL)):
+            export_outputs()
+
+
+def run_distributed(cache, args, version):
+    """
+    Um de N extratores (containers ou processos com a mesma pasta de dados)
+    que dividem os PDFs pela fila de work_queue.py: cada um reivindica
+    `claim_size` arquivos, extrai, conclui e volta à fila até ela esvaziar.
+    Arquivos de um extrator que caiu voltam à fila quando o lease vence.
+
+    Todos gravam no mesmo JSONL (com flock) e no mesmo cache, então a saída
+    é um conjunto só, como numa execução única. O cache recebe commit a cada
+    documento para que o lock de escrita do SQLite nunca fique preso durante
+    uma extração; o último extrator a terminar gera o JSON/CSV finais.
+    """
+    queue = WorkQueue(QUEUE_DB, args.lease_seconds)
+    worker_id = args.worker_id or default_worker_id()
+
+    # Um extrator por vez lista o diretório e calcula hashes; os seguintes
+    # reaproveitam os hashes memorizados no cache e a fila já preenchida
+    with file_lock(QUEUE_DB + ".scan.lock"):
+        pdf_files, hashes, _removed, _refreshed = scan_sources(cache, version, args.source, shared=True)
+        added = queue.enqueue([(os.path.basename(pdf), hashes[pdf]) for pdf in pdf_files], version)
+    logger.info(f"[{worker_id}] Pendentes no diretório: {len(pdf_files)} | novos na fila: {added}")
+
+    full_texts = None if args.inline_text else FullTextStore(FULL_TEXT_DIR)
+    dedup = dedup_from_args(cache, args)
+    claimed_total = 0
+    try:
+        with Heartbeat(queue, worker_id, log=logger.warning), \
+                JsonlSink(OUTPUT_JSONL, batch_size=1, shared=True) as sink, \
+                JsonlSink(TIMINGS_FILE, batch_size=1, shared=True) as timings_sink:
+            while not args.limit or claimed_total < args.limit:
+                size = min(args.claim_size, args.limit - claimed_total) if args.limit else args.claim_size
+                claimed = queue.claim(worker_id, size)
+                if not claimed:
+                    outstanding = queue.outstanding()
+                    if not outstanding:
+                        break
+                    logger.info(f"[{worker_id}] Aguardando {outstanding} arquivo(s) em lease de outros extratores")
+                    time.sleep(QUEUE_POLL_SECONDS)
+                    continue
+
+                claimed_total += len(claimed)
+                claimed_hashes = {source_path(name, args.source): sha for name, sha in claimed}
+                for pdf, _data, error in process_files(
+                        cache, list(claimed_hashes), claimed_hashes, version, sink, 1, args.workers,
+                        timings_sink, full_texts, limits_from_args(args), retry_backend_from_args(args), dedup,
+                        prefetch=args.prefetch, backend=args.backend, page_mode=args.page_mode,
+                        text_cache=args.text_cache):
+                    # Canônicos regravados por refresh_aliases não são deste lote
+                    if pdf in claimed_hashes:
+                        queue.complete(worker_id, os.path.basename(pdf), error)
+    finally:
+        released = queue.release(worker_id)
+        if released:
+            logger.warning(f"[{worker_id}] {released} arquivo(s) devolvido(s) à fila")
+        if full_texts is not None:
+            full_texts.close()
+
+    if not queue.outstanding():
+        export_outputs_once()
+
+    counts = queue.counts()
+    queue.close()
+    cache.close()
+
+    logger.info(f"[{worker_id}] Extrator finalizado: {claimed_total} arquivo(s) reivindicado(s)")
+    logger.info(f"Fila: {counts.get('done', 0)} concluído(s) | {counts.get('failed', 0)} com falha | "
+                f"{counts.get('pending', 0) + counts.get('leased', 0)} restante(s)")
+
+
+def print_queue_status():
+    queue = WorkQueue(QUEUE_DB)
+    counts = queue.counts()
+    print("Fila de extração:", ", ".join(f"{state}: {n}" for state, n in sorted(counts.items())) or "vazia")
+    for worker_id, started_at, heartbeat_at, completed in queue.workers():
+        print(f"  {worker_id:<30} início {started_at} | heartbeat {heartbeat_at} | concluídos {completed}")
+    for name, error in queue.failed():
+        print(f"  falha: {name}: {error}")
+    queue.close()
+
+
+# =========================
+# REEXECUÇÃO A PARTIR DO CACHE DE TEXTO
+# =========================
+
+def rerun_from_text_cache(cache, args, version):
+    store = get_text_store()
 
-    with open(OUTPUT_CSV, "w", encoding="utf-8-sig", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fields)
-        writer.writeheader()
-        writer.writerows(csv_data)
+    documents = [(sha, name) for sha, name in cache.documents()
+                 if store.get_meta(sha, args.backend) is not None]
+    if args.limit:
+        documents = documents[:args.limit]
+
+    logger.info(f"Reaplicando regras sobre {len(documents)} documentos do cache de texto ({args.backend})")
+
+    full_texts = None if args.inline_text else FullTextStore(FULL_TEXT_DIR)
+
+    failed = 0
+    with JsonlSink(OUTPUT_JSONL, batch_size=args.batch_size) as sink:
+        for i, (sha, name) in enumerate(documents, 1):
+            try:
+                data = extract_from_text_cache(sha, name, args.backend, args.page_mode)
+                if args.source:
+                    data[SOURCE_FIELD] = object_uri(args.source, name)
+                data[ALIASES_FIELD] = cache.duplicates_of(name, sha)
+                sink.write(full_texts.detach(data) if full_texts is not None else data)
+                cache.mark_processed(sha, name, version)
+            except Exception as e:
+                logger.error(f"Erro ao reprocessar {name}: {e}")
+                cache.mark_failed(sha, name, version, e)
+                failed += 1
+
+            if i % args.batch_size == 0:
+                if full_texts is not None:
+                    full_texts.flush()
+                sink.flush()
+                cache.commit()
+
+    if full_texts is not None:
+        full_texts.close()
+    store.close()
+    cache.commit()
+    export_outputs()
+    cache.close()
+
+    logger.info(f"Reprocessados: {len(documents) - failed} | falhas: {failed}")
 
 
 # =========================
 # MAIN
 # =========================
 
+def add_limit_arguments(parser):
+    """Opções dos workers supervisionados (também usadas pelo pipeline.py)."""
+    parser.add_argument("--timeout", type=float, default=DOCUMENT_TIMEOUT,
+                        help="Segundos máximos por documento antes de matar o worker (0 desativa)")
+    parser.add_argument("--max-rss-mb", type=float, default=MAX_WORKER_RSS_MB,
+                        help="Memória residente máxima de um worker, em MB (0 desativa)")
+    parser.add_argument("--max-tasks-per-worker", type=int, default=MAX_TASKS_PER_WORKER,
+                        help="Documentos por worker antes de reciclá-lo (0 desativa)")
+    parser.add_argument("--retry-backend", choices=list(BACKENDS) + ["none"], default=RETRY_BACKEND,
+                        help="Backend da nova tentativa para documentos interrompidos por tempo/memória")
+
+
+def add_dedup_arguments(parser):
+    """Opções de detecção de duplicatas (também usadas pelo pipeline.py)."""
+    parser.add_argument("--keep-duplicates", action="store_true",
+                        help="Extrai, envia e indexa duplicatas como documentos independentes")
+    parser.add_argument("--near-threshold", type=float, default=NEAR_THRESHOLD,
+                        help="Similaridade mínima do inteiro_teor para quase duplicatas (0 desativa)")
+
+
+def dedup_from_args(cache, args):
+    return None if args.keep_duplicates else NearDuplicateIndex(cache.conn, args.near_threshold)
+
+
+def limits_from_args(args):
+    return extraction_limits(args.timeout, args.max_rss_mb, args.max_tasks_per_worker)
+
+
+def retry_backend_from_args(args):
+    return None if args.retry_backend == "none" else args.retry_backend
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--limit", type=int)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Número de processos para extração paralela (padrão: 1, serial)")
+    parser.add_argument("--batch-size", type=int, default=50,
+                        help="Documentos entre cada fsync do JSONL e commit do cache de extração")
+    parser.add_argument("--export-only", action="store_true",
+                        help="Apenas regenera o JSON/CSV finais a partir do JSONL")
+    parser.add_argument("--backend", choices=list(BACKENDS), default=DEFAULT_BACKEND,
+                        help="Biblioteca usada para extrair o texto dos PDFs")
+    parser.add_argument("--page-mode", choices=PAGE_MODES, default=DEFAULT_PAGE_MODE,
+                        help="window: 10 primeiras + 10 últimas páginas; fields: só as páginas "
+                             "necessárias para os campos de cabeçalho e rodapé")
+    parser.add_argument("--text-cache", action="store_true",
+                        help="Guarda o texto de cada página em page_text/ durante a extração")
+    parser.add_argument("--from-text-cache", action="store_true",
+                        help="Reaplica só as regras de campos sobre o texto já guardado, sem reabrir os PDFs")
+    parser.add_argument("--inline-text", action="store_true",
+                        help="Mantém o inteiro_teor dentro do JSON/JSONL em vez do store inteiro_teor/")
+    parser.add_argument("--source", default=SOURCE_URI,
+                        help="s3://bucket/prefixo/: extrai os PDFs direto do MinIO, sem cópia local "
+                             "(padrão: NATJUS_SOURCE_URI ou RAW_DATA_DIR)")
+    parser.add_argument("--prefetch", type=int, default=PREFETCH_DEPTH,
+                        help="Objetos baixados à frente da extração com --source s3:// (0 desativa)")
+    parser.add_argument("--distributed", action="store_true",
+                        help="Divide os PDFs com outros extratores pela fila compartilhada (fila_extracao.sqlite)")
+    parser.add_argument("--worker-id", help="Identificador deste extrator na fila (padrão: hostname-pid)")
+    parser.add_argument("--lease-seconds", type=float, default=LEASE_SECONDS,
+                        help="Validade do lease sem heartbeat; depois disso outro extrator assume os arquivos")
+    parser.add_argument("--claim-size", type=int, default=CLAIM_SIZE,
+                        help="Arquivos reivindicados por vez na extração distribuída")
+    parser.add_argument("--queue-status", action="store_true",
+                        help="Mostra o estado da fila de extração distribuída e sai")
+    add_limit_arguments(parser)
+    add_dedup_arguments(parser)
     args = parser.parse_args()
 
-    checkpoint = load_checkpoint()
+    version = extractor_version(args.backend, args.page_mode)
 
-    pdf_files = sorted(glob.glob(os.path.join(RAW_DATA_DIR, "*.pdf")))
-    pdf_files = [p for p in pdf_files if os.path.basename(p) not in checkpoint["processed"]]
+    if args.export_only:
+        export_outputs()
+        return
 
-    if args.limit:
-        pdf_files = pdf_files[:args.limit]
+    if args.queue_status:
+        print_queue_status()
+        return
 
-    logger.info(f"Arquivos pendentes para processamento: {len(pdf_files)}")
+    seed_jsonl_from_json()
 
-    extracted_data = []
+    cache = ExtractionCache(CACHE_DB)
 
-    for i, pdf in enumerate(pdf_files, 1):
-        name = os.path.basename(pdf)
-        logger.info(f"[{i}/{len(pdf_files)}] Processando {name}")
+    migrated = cache.import_checkpoint(CHECKPOINT_FILE, RAW_DATA_DIR, LEGACY_VERSION)
+    if migrated:
+        logger.info(f"checkpoint.json migrado para o cache ({migrated} arquivos)")
 
-        try:
-            data = extract_metadata(pdf)
-            extracted_data.append(data)
-            checkpoint["processed"].append(name)
+    if args.from_text_cache:
+        rerun_from_text_cache(cache, args, version)
+        return
 
-        except Exception:
-            checkpoint["failed"].append(name)
+    if args.distributed:
+        run_distributed(cache, args, version)
+        return
 
-        finally:
-            save_checkpoint(checkpoint)
-            save_json(extracted_data)
-            save_csv(extracted_data)
+    pdf_files, hashes, _removed, _refreshed = scan_sources(cache, version, args.source)
+
+    if args.limit:
+        pdf_files = pdf_files[:args.limit]
+
+    logger.info(f"Arquivos pendentes para processamento: {len(pdf_files)}")
+    if args.source:
+        logger.info(f"Origem: {args.source} (leitura por faixas, prefetch de {args.prefetch})")
+    if args.workers > 1:
+        logger.info(f"Extração paralela com {args.workers} processos")
+    if version != EXTRACTOR_VERSION:
+        logger.info(f"Backend: {args.backend} | páginas: {args.page_mode}")
+
+    full_texts = None if args.inline_text else FullTextStore(FULL_TEXT_DIR)
+    with JsonlSink(OUTPUT_JSONL, batch_size=args.batch_size) as sink, \
+            JsonlSink(TIMINGS_FILE, batch_size=args.batch_size) as timings_sink:
+        for _ in process_files(cache, pdf_files, hashes, version, sink, args.batch_size, args.workers,
+                               timings_sink, full_texts, limits_from_args(args), retry_backend_from_args(args),
+                               dedup_from_args(cache, args), prefetch=args.prefetch, backend=args.backend,
+                               page_mode=args.page_mode, text_cache=args.text_cache):
+            pass
+    if full_texts is not None:
+        full_texts.close()
+
+    export_outputs()
+
+    counts = cache.counts()
+    cache.close()
 
     logger.info("Processamento finalizado com sucesso.")
-    logger.info(f"Total processados: {len(checkpoint['processed'])}")
-    logger.info(f"Total falhas: {len(checkpoint['failed'])}")
+    logger.info(f"Total processados: {counts.get(STATUS_OK, 0)}")
+    logger.info(f"Total falhas: {counts.get(STATUS_FAILED, 0)}")
+    logger.info(f"Total duplicatas: {counts.get(STATUS_DUPLICATE, 0)}")
 
 
 if __name__ == "__main__":
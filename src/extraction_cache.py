@@ -0,0 +1,261 @@
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+# =========================
+# CACHE DE EXTRAÇÃO
+# =========================
+#
+# Substitui o antigo checkpoint.json. Cada documento é identificado pelo hash
+# SHA-256 do conteúdo do PDF e pela versão do extrator que o processou:
+#
+#   - PDF inalterado e versão atual  -> ignorado (consulta indexada, O(1))
+#   - PDF substituído com o mesmo nome -> hash novo, reextraído
+#   - EXTRACTOR_VERSION incrementada   -> só entradas de versões antigas expiram
+#
+# O hash de cada caminho é memorizado por (tamanho, mtime) para não reler
+# todos os PDFs a cada execução.
+#
+# Duplicatas (dedup.py) ficam com status `duplicate` e o nome e o hash do
+# documento canônico na tabela duplicates; continuam valendo enquanto o
+# canônico estiver extraído com aquele mesmo conteúdo. Se o PDF canônico é
+# substituído, as duplicatas dele deixam de valer e voltam a ser pendentes.
+#
+# Arquivos que saem da origem são esquecidos (forget) depois que o
+# JSONL recebe o tombstone deles; duplicatas de um canônico removido voltam a
+# ser pendentes.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    sha256            TEXT NOT NULL,
+    source_filename   TEXT NOT NULL,
+    extractor_version TEXT NOT NULL,
+    status            TEXT NOT NULL,
+    error             TEXT,
+    updated_at        TEXT NOT NULL,
+    PRIMARY KEY (sha256, source_filename)
+);
+CREATE INDEX IF NOT EXISTS idx_documents_filename ON documents (source_filename);
+CREATE INDEX IF NOT EXISTS idx_documents_status ON documents (status);
+
+CREATE TABLE IF NOT EXISTS file_hashes (
+    path     TEXT PRIMARY KEY,
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256   TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS duplicates (
+    source_filename TEXT PRIMARY KEY,
+    canonical       TEXT NOT NULL,
+    kind            TEXT NOT NULL,
+    similarity      REAL NOT NULL,
+    canonical_sha256 TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_duplicates_canonical ON duplicates (canonical);
+"""
+
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+STATUS_DUPLICATE = "duplicate"
+
+
+def sha256_file(path, block_size=1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(block_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ExtractionCache:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+        self.conn.commit()
+
+    def _migrate(self):
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(duplicates)")}
+        if "canonical_sha256" not in columns:
+            # Caches anteriores: o hash do canônico é o que está registrado agora
+            self.conn.execute("ALTER TABLE duplicates ADD COLUMN canonical_sha256 TEXT")
+            self.conn.execute(
+                "UPDATE duplicates SET canonical_sha256 = (SELECT c.sha256 FROM documents c "
+                "WHERE c.source_filename = duplicates.canonical AND c.status = ?)", (STATUS_OK,)
+            )
+
+    # ---------- hash de conteúdo ----------
+
+    def content_hash(self, path):
+        st = os.stat(path)
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, sha256 FROM file_hashes WHERE path = ?", (path,)
+        ).fetchone()
+
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+
+        digest = sha256_file(path)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO file_hashes (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+            (path, st.st_size, st.st_mtime_ns, digest),
+        )
+        return digest
+
+    # ---------- consulta ----------
+
+    def is_current(self, sha256, source_filename, version):
+        row = self.conn.execute(
+            "SELECT 1 FROM documents doc WHERE sha256 = ? AND source_filename = ? "
+            "AND extractor_version = ? AND (status = ? OR (status = ? AND EXISTS ("
+            "  SELECT 1 FROM duplicates d JOIN documents c "
+            "    ON c.source_filename = d.canonical AND c.sha256 = d.canonical_sha256 "
+            "  WHERE d.source_filename = doc.source_filename AND c.status = ?)))",
+            (sha256, source_filename, version, STATUS_OK, STATUS_DUPLICATE, STATUS_OK),
+        ).fetchone()
+        return row is not None
+
+    def canonical_for(self, sha256, exclude=None):
+        """Documento extraído (não duplicata) com esse conteúdo, se houver."""
+        row = self.conn.execute(
+            "SELECT source_filename FROM documents WHERE sha256 = ? AND status = ? AND source_filename <> ? "
+            "ORDER BY source_filename LIMIT 1",
+            (sha256, STATUS_OK, exclude or ""),
+        ).fetchone()
+        return row[0] if row else None
+
+    def duplicates_of(self, canonical, sha256=None):
+        """Nomes das duplicatas de `canonical` (do conteúdo `sha256`, se informado), em ordem."""
+        if sha256 is None:
+            rows = self.conn.execute(
+                "SELECT source_filename FROM duplicates WHERE canonical = ? ORDER BY source_filename", (canonical,)
+            )
+        else:
+            rows = self.conn.execute(
+                "SELECT source_filename FROM duplicates WHERE canonical = ? AND canonical_sha256 = ? "
+                "ORDER BY source_filename", (canonical, sha256)
+            )
+        return [name for (name,) in rows]
+
+    def current_sha256(self, source_filename):
+        """Hash do conteúdo extraído (status ok) de `source_filename`, se houver."""
+        row = self.conn.execute(
+            "SELECT sha256 FROM documents WHERE source_filename = ? AND status = ?", (source_filename, STATUS_OK)
+        ).fetchone()
+        return row[0] if row else None
+
+    def counts(self):
+        rows = self.conn.execute("SELECT status, COUNT(*) FROM documents GROUP BY status").fetchall()
+        return dict(rows)
+
+    def documents(self):
+        """(sha256, source_filename) de todos os documentos conhecidos, exceto duplicatas."""
+        return self.conn.execute(
+            "SELECT sha256, source_filename FROM documents WHERE status <> ? ORDER BY source_filename",
+            (STATUS_DUPLICATE,),
+        ).fetchall()
+
+    def missing(self, present):
+        """Arquivos registrados que não estão em `present` (nomes da listagem atual da origem)."""
+        return [name for (name,) in self.conn.execute(
+            "SELECT DISTINCT source_filename FROM documents ORDER BY source_filename"
+        ) if name not in present]
+
+    def failed(self):
+        return self.conn.execute(
+            "SELECT source_filename, error FROM documents WHERE status = ? ORDER BY source_filename",
+            (STATUS_FAILED,),
+        ).fetchall()
+
+    # ---------- registro ----------
+
+    def _record(self, sha256, source_filename, version, status, error=None):
+        # Versões anteriores do mesmo arquivo (PDF substituído) deixam de valer
+        self.conn.execute(
+            "DELETE FROM documents WHERE source_filename = ? AND sha256 <> ?",
+            (source_filename, sha256),
+        )
+        self.conn.execute(
+            "INSERT OR REPLACE INTO documents "
+            "(sha256, source_filename, extractor_version, status, error, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (sha256, source_filename, version, status, error, datetime.now().isoformat(timespec="seconds")),
+        )
+        if status != STATUS_DUPLICATE:
+            self.conn.execute("DELETE FROM duplicates WHERE source_filename = ?", (source_filename,))
+            # Canônico com outro conteúdo: as duplicatas do conteúdo anterior deixam de valer
+            self.conn.execute(
+                "DELETE FROM duplicates WHERE canonical = ? AND canonical_sha256 IS NOT ?",
+                (source_filename, sha256),
+            )
+
+    def mark_processed(self, sha256, source_filename, version):
+        self._record(sha256, source_filename, version, STATUS_OK)
+
+    def mark_failed(self, sha256, source_filename, version, error):
+        self._record(sha256, source_filename, version, STATUS_FAILED, str(error))
+
+    def mark_duplicate(self, sha256, source_filename, version, canonical, kind, similarity=1.0,
+                       canonical_sha256=None):
+        """`canonical_sha256` é o conteúdo do canônico; o padrão (duplicata exata) é o próprio `sha256`."""
+        self._record(sha256, source_filename, version, STATUS_DUPLICATE)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO duplicates (source_filename, canonical, kind, similarity, canonical_sha256) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (source_filename, canonical, kind, similarity, canonical_sha256 or sha256),
+        )
+
+    def forget(self, source_filename):
+        """Remove um arquivo que saiu da origem; retorna o canônico dele, se era duplicata."""
+        row = self.conn.execute(
+            "SELECT canonical FROM duplicates WHERE source_filename = ?", (source_filename,)
+        ).fetchone()
+        self.conn.execute("DELETE FROM documents WHERE source_filename = ?", (source_filename,))
+        self.conn.execute("DELETE FROM duplicates WHERE source_filename = ?", (source_filename,))
+        return row[0] if row else None
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    # ---------- migração ----------
+
+    def import_checkpoint(self, checkpoint_file, raw_data_dir, version):
+        """
+        Importa um checkpoint.json legado (listas de nomes) e o renomeia.
+
+        Os arquivos listados em "processed" são registrados com `version`, a
+        versão do extrator que gerou o checkpoint; se ela for diferente da
+        atual, eles são reextraídos na próxima execução.
+        """
+        if not os.path.exists(checkpoint_file):
+            return 0
+
+        with open(checkpoint_file, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+
+        imported = 0
+        # "failed" primeiro: um arquivo que falhou e depois foi processado
+        # aparece nas duas listas e deve ficar como ok.
+        for status, names in ((STATUS_FAILED, checkpoint.get("failed", [])),
+                              (STATUS_OK, checkpoint.get("processed", []))):
+            for name in names:
+                path = os.path.join(raw_data_dir, name)
+                if not os.path.exists(path):
+                    continue
+                error = None if status == STATUS_OK else "importado do checkpoint.json"
+                self._record(self.content_hash(path), name, version, status, error)
+                imported += 1
+
+        self.commit()
+        os.replace(checkpoint_file, checkpoint_file + ".migrado")
+        return imported
@@ -0,0 +1,257 @@
+import re
+import time
+
+# =========================
+# REGRAS DE EXTRAÇÃO DE CAMPOS
+# =========================
+#
+# Todas as expressões são compiladas uma única vez, na importação do módulo.
+# Cada regra declara a região do documento onde o campo costuma estar:
+#
+#   header -> primeiras páginas (processo, nota técnica, assunto)
+#   tail   -> últimas páginas (desfecho, data do envio)
+#   full   -> qualquer lugar (cid, objeto)
+#
+# A região orienta a leitura seletiva de páginas (ver missing_fields); as
+# regras em si continuam sendo aplicadas ao texto que receberem.
+#
+# A saída é idêntica à da implementação original (regex montadas a cada
+# chamada e aplicadas sempre ao texto inteiro); as regiões apenas evitam
+# varrer o documento quando a resposta já está no começo ou no fim.
+#
+# Padrões IGNORECASE que começam com uma palavra fixa ("CID", "Solicita",
+# "Conclusão"...) são lentos no `re` porque não há busca rápida pelo prefixo.
+# Essas regras localizam os candidatos com str.find sobre o texto em minúsculas
+# (calculado uma vez por documento) e confirmam cada um com pattern.match().
+
+HEADER_CHARS = 2000
+TAIL_CHARS = 2000
+
+# 2. Processo (padrão CNJ: NNNNNNN-DD.AAAA.J.TR.OORR)
+PROCESSO_RE = re.compile(r"\d{7}-\d{2}\.\d{4}\.\d\.\d{2}\.\d{4}")
+PROCESSO_LEN = 25  # o padrão tem tamanho fixo
+
+# 3. Nota Técnica / Parecer
+NT_RE = re.compile(
+    r"(?:Nota\s+T[ée]cnica|Parecer|Parecer\s+T[ée]cnico)\s*(?:n[º°\.]?|número)?\s*(\d+(?:[./-]\d{4})?)",
+    re.IGNORECASE,
+)
+NT_FILENAME_RE = re.compile(r"^(\d+)\s")
+
+# 4. CID, em ordem de prioridade
+CID_RES = [
+    re.compile(r"CID(?:-10)?\s*[:\-]?\s*([A-Z]\d{2}(?:\.?\d{1})?)", re.IGNORECASE | re.DOTALL),  # Padrão
+    re.compile(r"CID\s*[:\-]?\s*([A-Z]\s?\d{2}(?:\.?\d{1})?)", re.IGNORECASE | re.DOTALL),     # Com espaço extra
+]
+# Contexto "Diagnóstico". O padrão original `Diagnóstico.*([A-Z]\d{2}(?:\.\d{1})?)`
+# com DOTALL faz backtracking a partir do fim do texto; o equivalente é achar
+# o primeiro "Diagnóstico" e o último código depois dele. O último código é
+# localizado buscando `\d\d[A-Z]` no texto invertido.
+DIAGNOSTICO_RE = re.compile(r"Diagnóstico", re.IGNORECASE | re.DOTALL)
+CID_CODIGO_RE = re.compile(r"[A-Z]\d{2}(?:\.\d{1})?", re.IGNORECASE | re.DOTALL)
+CID_CODIGO_INVERTIDO_RE = re.compile(r"\d\d[A-Z]", re.IGNORECASE)
+
+# 5. Assunto / Objeto
+ASSUNTO_RE = re.compile(
+    r"Assunto\s*[:\-]\s*(.*?)(?=(?:I\s*[\-\)]|1\.|DA IDENTIFICAÇÃO|DA CONSULTA|DADOS DO PROCESSO|$))",
+    re.IGNORECASE | re.DOTALL,
+)
+
+TERMOS_OBJETO = ["Solicita", "Requer", "Prescrição", "Medicamento", "Fármaco", "Procedimento"]
+OBJETO_RES = [
+    (termo.lower(), re.compile(fr"{termo}(?:ção)?\s*[:\-]?\s*([^.;\n]*?[a-zA-Z]{{3,}}[^.;\n]*)", re.IGNORECASE))
+    for termo in TERMOS_OBJETO
+]
+
+# 6. Desfecho / Conclusão
+CONCLUSAO_RE = re.compile(
+    r"(?:V\)|IV\)|Conclusão|Considerações Finais)\s*[:\-]?\s*(.*?)(?:Goiânia|Este é o parecer|$)",
+    re.IGNORECASE | re.DOTALL,
+)
+# Depois do cabeçalho o padrão sempre casa (o grupo pode ir até o fim do
+# texto), então o início da correspondência é a primeira ocorrência de um deles.
+CONCLUSAO_CABECALHOS = ["v)", "iv)", "conclusão", "considerações finais"]
+
+# 7. Data do Envio. Toda ocorrência começa com "Goiânia" e não pode conter
+# outra, então as ocorrências nunca se sobrepõem.
+DATA_RE = re.compile(r"Goiânia(?:-GO)?\s*,?\s*(\d{1,2})\s*de\s*([A-Za-zç]+)\s*de\s*(\d{4})", re.IGNORECASE)
+
+
+# =========================
+# BUSCA POR PREFIXO
+# =========================
+
+# Caracteres em que str.lower() e o IGNORECASE do `re` discordam ("ı" e "ſ"
+# casam com "i" e "s") ou que mudam de tamanho em minúsculas ("İ"). Textos
+# com eles usam a busca por regex pura.
+_UNSAFE_LOWER = ("İ", "ı", "ſ")
+
+
+def lower_for_search(text):
+    """Versão em minúsculas alinhada caractere a caractere com `text`, ou None."""
+    if any(c in text for c in _UNSAFE_LOWER):
+        return None
+    return text.lower()
+
+
+def search_from_literal(pattern, literal, text, lowered, start=0):
+    """
+    Equivalente a `pattern.search(text, start)` para padrões IGNORECASE que
+    começam com a palavra `literal` (em minúsculas).
+    """
+    if lowered is None:
+        return pattern.search(text, start)
+
+    pos = lowered.find(literal, start)
+    while pos != -1:
+        match = pattern.match(text, pos)
+        if match:
+            return match
+        pos = lowered.find(literal, pos + 1)
+    return None
+
+
+# =========================
+# REGRAS
+# =========================
+
+def rule_processo(text, lowered, filename):
+    # Como o padrão tem tamanho fixo, uma ocorrência no cabeçalho é a primeira
+    # do texto; se não houver, a busca continua de onde parou.
+    match = PROCESSO_RE.search(text, 0, HEADER_CHARS)
+    if not match:
+        match = PROCESSO_RE.search(text, max(0, HEADER_CHARS - PROCESSO_LEN + 1))
+    if not match:
+        # Tenta encontrar no nome do arquivo
+        match = PROCESSO_RE.search(filename)
+    return {"processo": match.group(0)} if match else {}
+
+
+def rule_nota_tecnica(text, lowered, filename):
+    nt = NT_RE.search(text, 0, HEADER_CHARS)
+    if nt:
+        return {"n_nota_tecnica": nt.group(1)}
+
+    nt_filename = NT_FILENAME_RE.match(filename)
+    if nt_filename:
+        return {"n_nota_tecnica": nt_filename.group(1)}
+    return {}
+
+
+def rule_cid(text, lowered, filename):
+    for regex in CID_RES:
+        cid_match = search_from_literal(regex, "cid", text, lowered)
+        if cid_match:
+            # Remove espaços internos possíveis (ex: E 04.8 -> E04.8) para padronizar
+            return {"cid": cid_match.group(1).replace(" ", "")}
+
+    diagnostico = search_from_literal(DIAGNOSTICO_RE, "diagnóstico", text, lowered)
+    if diagnostico:
+        reverse = CID_CODIGO_INVERTIDO_RE.search(text[::-1], 0, len(text) - diagnostico.end())
+        if reverse:
+            # Posição da letra no texto original
+            start = len(text) - reverse.start() - 3
+            return {"cid": CID_CODIGO_RE.match(text, start).group(0).replace(" ", "")}
+    return {}
+
+
+def rule_assunto(text, lowered, filename):
+    assunto_match = ASSUNTO_RE.search(text)
+    if not assunto_match:
+        return {}
+    assunto_limpo = assunto_match.group(1).strip().replace('\n', ' ')
+    return {"Assunto": assunto_limpo[:500]}
+
+
+def rule_objeto(text, lowered, filename):
+    objeto = None
+    for literal, regex in OBJETO_RES:
+        obj_match = search_from_literal(regex, literal, text, lowered)
+        if obj_match:
+            possivel_objeto = obj_match.group(1).strip()
+            # Evita capturar textos genéricos de cabeçalho
+            if len(possivel_objeto) > 3 and "..." not in possivel_objeto:
+                if objeto is None:
+                    objeto = possivel_objeto
+                elif possivel_objeto not in objeto:
+                    objeto += f" | {possivel_objeto}"
+    return {"objeto": objeto} if objeto is not None else {}
+
+
+def rule_desfecho(text, lowered, filename):
+    if lowered is None:
+        conclusao_match = CONCLUSAO_RE.search(text)
+    else:
+        positions = [p for p in (lowered.find(c) for c in CONCLUSAO_CABECALHOS) if p != -1]
+        conclusao_match = CONCLUSAO_RE.match(text, min(positions)) if positions else None
+
+    if conclusao_match:
+        texto_conclusao = conclusao_match.group(1).lower()
+        if "favorável" in texto_conclusao and "desfavorável" not in texto_conclusao:
+            return {"desfecho": "Favorável"}
+        elif "desfavorável" in texto_conclusao:
+            return {"desfecho": "Desfavorável"}
+        elif "parcialmente" in texto_conclusao:
+            return {"desfecho": "Parcialmente Favorável"}
+        return {"desfecho": "Inconclusivo / Não Identificado Explicitamente"}
+
+    # Tenta encontrar palavras soltas perto do fim
+    if "favorável" in text[-TAIL_CHARS:].lower():
+        return {"desfecho": "Favorável (Inferido)"}
+    return {}
+
+
+def rule_data_do_envio(text, lowered, filename):
+    # A última data do texto está quase sempre no rodapé; só varre o texto
+    # inteiro se não houver nenhuma no fim.
+    last = None
+    for last in DATA_RE.finditer(text, max(0, len(text) - TAIL_CHARS)):
+        pass
+    if last is None:
+        for last in DATA_RE.finditer(text):
+            pass
+    if last is None:
+        return {}
+    dia, mes, ano = last.groups()
+    return {"data_do_envio": f"{dia} de {mes} de {ano}"}
+
+
+# (campo, função, região)
+FIELD_RULES = [
+    ("processo", rule_processo, "header"),
+    ("n_nota_tecnica", rule_nota_tecnica, "header"),
+    ("cid", rule_cid, "full"),
+    ("Assunto", rule_assunto, "header"),
+    ("objeto", rule_objeto, "full"),
+    ("desfecho", rule_desfecho, "tail"),
+    ("data_do_envio", rule_data_do_envio, "tail"),
+]
+
+
+def extract_fields(text, filename, timings=None):
+    """
+    Aplica todas as regras ao texto e retorna os campos encontrados.
+
+    Se `timings` for um dict, acumula nele o tempo (em segundos) de cada regra.
+    """
+    start = time.perf_counter()
+    lowered = lower_for_search(text)
+    if timings is not None:
+        timings["_lower"] = timings.get("_lower", 0.0) + time.perf_counter() - start
+
+    fields = {}
+    for name, rule, _region in FIELD_RULES:
+        if timings is None:
+            fields.update(rule(text, lowered, filename))
+        else:
+            start = time.perf_counter()
+            fields.update(rule(text, lowered, filename))
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+    return fields
+
+
+def missing_fields(text, region):
+    """Campos da `region` que as regras ainda não encontram em `text` (sem usar o nome do arquivo)."""
+    lowered = lower_for_search(text)
+    return [name for name, rule, rule_region in FIELD_RULES
+            if rule_region == region and not rule(text, lowered, "")]
@@ -0,0 +1,64 @@
+import hashlib
+
+from pack_store import PackStore, best_codec
+from record_io import document_id
+
+# =========================
+# STORE DO INTEIRO TEOR
+# =========================
+#
+# O inteiro_teor é a maior parte de cada registro (dezenas de KB contra
+# algumas centenas de bytes dos metadados). Ele fica comprimido num
+# PackStore à parte e os arquivos de metadados guardam só a referência:
+#
+#   inteiro_teor_ref -> "<id do documento>/<hash do texto>"
+#
+# O hash do texto faz parte da chave para que uma reextração com texto
+# diferente gere outra referência (e outro fingerprint na indexação
+# incremental). Quem não usa o texto (upload, relatório) lê arquivos uma
+# ordem de grandeza menores; o indexador busca cada texto só ao montar a
+# ação do _bulk correspondente.
+#
+# Registros antigos, com o texto embutido, continuam válidos em todas as etapas.
+
+TEXT_FIELD = "inteiro_teor"
+REF_FIELD = "inteiro_teor_ref"
+
+
+def text_ref(record, text):
+    return f"{document_id(record)}/{hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]}"
+
+
+def slim_record(record):
+    """
+    Cópia do registro com o texto trocado pela referência, na mesma posição.
+    Registros que já não têm o texto embutido são devolvidos como estão.
+    """
+    text = record.get(TEXT_FIELD)
+    if text is None:
+        return record
+
+    slim = {}
+    for key, value in record.items():
+        if key == TEXT_FIELD:
+            slim[REF_FIELD] = text_ref(record, text)
+        elif key != REF_FIELD:
+            slim[key] = value
+    return slim
+
+
+class FullTextStore(PackStore):
+    def __init__(self, root, codec=None, commit_every=200):
+        super().__init__(root, codec or best_codec(), commit_every)
+
+    def detach(self, record):
+        """Grava o texto do registro (se ainda não gravado) e retorna a versão sem ele."""
+        slim = slim_record(record)
+        if slim is not record and not self.has(slim[REF_FIELD]):
+            self.put(slim[REF_FIELD], record[TEXT_FIELD].encode("utf-8"))
+        return slim
+
+    def get_text(self, ref):
+        """Texto de uma referência, ou None se ela não existir no store."""
+        data = self.get(ref, default=None)
+        return None if data is None else data.decode("utf-8")
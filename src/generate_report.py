@@ -1,11 +1,30 @@
+import argparse
+import cProfile
+import importlib
+import io
 import json
 import os
-import ijson
+import pstats
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from dedup import is_duplicate
+from normalization import normalize_date
+from record_io import IJSON_BACKEND, read_records
+from sketches import DateHistogram, HyperLogLog, SpaceSaving
 
 # Configuration
 INPUT_FILE = r"data/processed_data/metadados_extraidos.json"
 OUTPUT_FILE = r"data/processed_data/relatorio_extracao.md"
+TIMINGS_FILE = r"data/processed_data/tempos_extracao.jsonl"
+PROFILE_DIR = r"data/processed_data/perfis"
+
+# Per-stage timing section
+STAGES = ["open", "extract_text", "select_pages", "rules", "normalize", "sink_write", "total"]
+PERCENTILES = [50, 90, 99]
+HISTOGRAM_BOUNDS_MS = [10, 50, 100, 250, 500, 1000, 2000, 5000]
+TOP_SLOWEST = 10
+PROFILE_LINES = 15
 
 # Fields to include in the analysis (excluding 'source_filename' and 'inteiro_teor' as they are base data)
 FIELDS_TO_ANALYZE = [
@@ -23,6 +42,14 @@ FIELDS_TO_ANALYZE = [
     "medicamento_e_insumo",
 ]
 
+# Value distributions (bounded-memory sketches)
+DISTINCT_FIELDS = ["processo", "cid"]
+TOP_K_FIELDS = ["cid", "desfecho", "tipo_arquivo"]
+TOP_K_CAPACITY = 200   # values tracked per field; more capacity, smaller error
+TOP_N_VALUES = 10
+DATE_FIELD = "data_do_envio"
+HISTOGRAM_WIDTH = 30
+
 def is_valid(value):
     """Check if the value counts as a successful extraction."""
     if value is None:
@@ -35,32 +62,139 @@ def is_valid(value):
         return True
     return False
 
-def generate_report_streaming(filepath):
-    print(f"Reading data from {filepath} (streaming mode)...")
-    
-    total_pdfs = 0
+def new_shard_stats():
+    return {
+        "total": 0,
+        "duplicates": 0,
+        "extracted": defaultdict(int),
+        "distinct": {field: HyperLogLog() for field in DISTINCT_FIELDS},
+        "top": {field: SpaceSaving(TOP_K_CAPACITY) for field in TOP_K_FIELDS},
+        "dates": DateHistogram(),
+    }
+
+def scan_shard(filepath):
+    """
+    Stats of one input file (JSON array or JSONL), in constant memory:
+    counters plus fixed-size sketches. Runs in a worker process when several
+    shards are read in parallel.
+
+    JSONL is read latest-per-key (the extraction JSONL is append-only), so a
+    re-extracted document is counted once.
+    """
+    stats = new_shard_stats()
+    for item in read_records(filepath):
+        # Duplicates (dedup.py) carry no fields of their own
+        if is_duplicate(item):
+            stats["duplicates"] += 1
+            continue
+        stats["total"] += 1
+        for field in FIELDS_TO_ANALYZE:
+            if is_valid(item.get(field)):
+                stats["extracted"][field] += 1
+
+        for field, sketch in stats["distinct"].items():
+            value = item.get(field)
+            if is_valid(value):
+                sketch.add(value)
+        for field, sketch in stats["top"].items():
+            value = item.get(field)
+            if is_valid(value):
+                sketch.add(value)
+
+        raw_date = item.get(DATE_FIELD)
+        iso_date = normalize_date(raw_date)
+        if iso_date:
+            stats["dates"].add(iso_date)
+        elif is_valid(raw_date):
+            stats["dates"].invalid += 1
+        else:
+            stats["dates"].missing += 1
+
+        if stats["total"] % 1000 == 0:
+            print(f"{os.path.basename(filepath)}: {stats['total']} items...", end='\r')
+    return stats
+
+def merge_stats(stats, other):
+    stats["total"] += other["total"]
+    stats["duplicates"] += other["duplicates"]
+    for field, count in other["extracted"].items():
+        stats["extracted"][field] += count
+    for field, sketch in other["distinct"].items():
+        stats["distinct"][field].merge(sketch)
+    for field, sketch in other["top"].items():
+        stats["top"][field].merge(sketch)
+    stats["dates"].merge(other["dates"])
+    return stats
+
+def scan_shards(filepaths, workers=1):
+    """Scans each file (in parallel processes if workers > 1) and merges the sketches."""
+    stats = new_shard_stats()
+    if workers <= 1 or len(filepaths) == 1:
+        for filepath in filepaths:
+            merge_stats(stats, scan_shard(filepath))
+        return stats
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(filepaths))) as executor:
+        for shard in executor.map(scan_shard, filepaths):
+            merge_stats(stats, shard)
+    return stats
+
+def generate_distribution_section(stats, top_n=TOP_N_VALUES):
+    total_pdfs = stats["total"]
+    lines = ["", "## DISTRIBUIÇÃO DOS VALORES", ""]
+    lines.append("Estimativas em memória limitada: distintos por HyperLogLog (erro típico ~0,8%), "
+                 "mais frequentes por Space-Saving (contagem com erro máximo indicado).")
+    lines.append("")
+    lines.append("| Campo | Valores distintos (estimativa) |")
+    lines.append("| :--- | :---: |")
+    for field, sketch in stats["distinct"].items():
+        lines.append(f"| {field} | {sketch.count()} |")
+
+    for field, sketch in stats["top"].items():
+        lines += ["", f"### {field}: {top_n} valores mais frequentes", ""]
+        lines.append("| Valor | Docs | % | Erro máx. |")
+        lines.append("| :--- | :---: | :---: | :---: |")
+        for value, count, error in sketch.top(top_n):
+            share = count / total_pdfs * 100 if total_pdfs else 0
+            cell = str(value).replace("|", "\\|")
+            lines.append(f"| {cell} | {count} | {share:.1f}% | {error} |")
+
+    dates = stats["dates"]
+    lines += ["", f"### {DATE_FIELD} por ano", ""]
+    lines.append(f"Período: {dates.first or '-'} a {dates.last or '-'} | "
+                 f"sem data: {dates.missing} | data inválida: {dates.invalid}")
+    lines.append("")
+    lines.append("| Ano | Docs | |")
+    lines.append("| :--- | :---: | :--- |")
+    years = dates.years()
+    largest = max((count for _year, count in years), default=0)
+    for year, count in years:
+        bar = "█" * max(1, round(count / largest * HISTOGRAM_WIDTH))
+        lines.append(f"| {year} | {count} | {bar} |")
+
+    lines += ["", f"### {DATE_FIELD} por mês", ""]
+    lines.append("| Mês | Docs |")
+    lines.append("| :--- | :---: |")
+    for month, count in sorted(dates.months.items()):
+        lines.append(f"| {month} | {count} |")
+    return lines
+
+def generate_report_streaming(filepaths, workers=1):
+    if isinstance(filepaths, str):
+        filepaths = [filepaths]
+    print(f"Reading data from {', '.join(filepaths)} (streaming mode, ijson backend: {IJSON_BACKEND}, "
+          f"{min(workers, len(filepaths))} worker(s))...")
+
     num_fields = len(FIELDS_TO_ANALYZE)
-    
-    # Use simple counters
-    extracted_counts = defaultdict(int)
-    
-    try:
-        with open(filepath, 'rb') as f:
-            # Iterate over items in the main array
-            for item in ijson.items(f, 'item'):
-                total_pdfs += 1
-                for field in FIELDS_TO_ANALYZE:
-                    val = item.get(field)
-                    if is_valid(val):
-                        extracted_counts[field] += 1
-                        
-                if total_pdfs % 100 == 0:
-                    print(f"Processed stats for {total_pdfs} items...", end='\r')
 
+    try:
+        stats = scan_shards(filepaths, workers)
     except Exception as e:
         print(f"\nError reading JSON stream: {e}")
         return None
 
+    total_pdfs = stats["total"]
+    extracted_counts = stats["extracted"]
     print(f"\nFinished processing {total_pdfs} items.")
 
     field_stats = {}
@@ -92,6 +226,8 @@ def generate_report_streaming(filepath):
     lines.append(f"Total de extrações possíveis:     {total_possible}")
     lines.append(f"Total de extrações bem-sucedidas: {total_successful}")
     lines.append(f"Taxa de sucesso geral:            {general_success_rate:.2f}%")
+    if stats["duplicates"]:
+        lines.append(f"Duplicatas (fora das contagens):  {stats['duplicates']}")
     lines.append("")
     
     lines.append(f"Campos com 100% de extração:   {', '.join(fields_100) if fields_100 else 'Nenhum'}")
@@ -108,15 +244,154 @@ def generate_report_streaming(filepath):
         s = field_stats[field]
         lines.append(f"| {field} | {s['extracted']} | {s['missing']} | {s['rate']:.2f}% |")
 
+    lines += generate_distribution_section(stats)
+
     return "\n".join(lines)
 
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+def histogram(values_ms, bounds=HISTOGRAM_BOUNDS_MS):
+    """Counts per bucket: (label, count) for < b0, b0-b1, ..., >= bN."""
+    counts = [0] * (len(bounds) + 1)
+    for value in values_ms:
+        bucket = 0
+        while bucket < len(bounds) and value >= bounds[bucket]:
+            bucket += 1
+        counts[bucket] += 1
+
+    labels = [f"< {bounds[0]} ms"]
+    labels += [f"{low}-{high} ms" for low, high in zip(bounds, bounds[1:])]
+    labels.append(f">= {bounds[-1]} ms")
+    return list(zip(labels, counts))
+
+def load_timings(filepath):
+    """Latest timing record of each document (the log is append-only)."""
+    stages = defaultdict(list)
+    pages = []
+    rules = defaultdict(list)
+    documents = []
+
+    for record in read_records(filepath):
+        for stage, seconds in record["stages"].items():
+            stages[stage].append(seconds * 1000)
+        pages.extend(seconds * 1000 for seconds in record.get("page_seconds", []))
+        for rule, seconds in (record.get("rule_seconds") or {}).items():
+            rules[rule].append(seconds * 1000)
+        documents.append(record)
+
+    return documents, stages, pages, rules
+
+def timing_table(title, series, names):
+    lines = [f"| {title} | Docs | Média (ms) | " + " | ".join(f"p{p} (ms)" for p in PERCENTILES) + " | Máx (ms) |"]
+    lines.append("| :--- | :---: | :---: | " + " | ".join(":---:" for _ in PERCENTILES) + " | :---: |")
+    for name in names:
+        values = sorted(series.get(name, []))
+        if not values:
+            continue
+        mean = sum(values) / len(values)
+        cells = " | ".join(f"{percentile(values, p):.1f}" for p in PERCENTILES)
+        lines.append(f"| {name} | {len(values)} | {mean:.1f} | {cells} | {values[-1]:.1f} |")
+    return lines
+
+def generate_timing_section(filepath, top_n=TOP_SLOWEST):
+    documents, stages, pages, rules = load_timings(filepath)
+    if not documents:
+        return [], []
+
+    slowest = sorted(documents, key=lambda record: record["stages"]["total"], reverse=True)[:top_n]
+
+    lines = ["", "## TEMPOS POR ETAPA", ""]
+    lines.append(f"Documentos com tempos registrados: {len(documents)}")
+    lines.append(f"Páginas extraídas:                 {len(pages)}")
+    lines.append("")
+    lines += timing_table("Etapa", stages, STAGES)
+    lines.append("")
+    lines += timing_table("Página (extract_text)", {"página": pages}, ["página"])
+    lines.append("")
+    lines += timing_table("Regra de campo", rules, sorted(rules))
+
+    lines += ["", "### Histograma do tempo total por documento", ""]
+    lines.append("| Faixa | Docs | % |")
+    lines.append("| :--- | :---: | :---: |")
+    for label, count in histogram(stages["total"]):
+        lines.append(f"| {label} | {count} | {count / len(documents) * 100:.1f}% |")
+
+    lines += ["", f"### {len(slowest)} PDFs mais lentos", ""]
+    lines.append("| Arquivo | Páginas (lidas) | Total (ms) | Abertura | Texto | Regras | Escrita | Página mais lenta (ms) |")
+    lines.append("| :--- | :---: | :---: | :---: | :---: | :---: | :---: | :---: |")
+    for record in slowest:
+        ms = {stage: record["stages"].get(stage, 0.0) * 1000 for stage in STAGES}
+        page_max = max(record.get("page_seconds") or [0.0]) * 1000
+        lines.append(f"| {record['source_filename']} | {record['pages']} ({record['pages_parsed']}) | "
+                     f"{ms['total']:.0f} | {ms['open']:.0f} | {ms['extract_text']:.0f} | {ms['rules']:.1f} | "
+                     f"{ms['sink_write']:.1f} | {page_max:.0f} |")
+
+    return lines, slowest
+
+def profile_documents(records, output_dir=PROFILE_DIR, lines_per_doc=PROFILE_LINES):
+    """
+    Re-runs the extraction of each record under cProfile, saving a .prof per
+    document (open with pstats or snakeviz) and returning the markdown lines
+    with the most expensive functions.
+    """
+    # Imported only here: extract_metadata configures logging and paths on import
+    extraction = importlib.import_module("extract_metadata")
+    os.makedirs(output_dir, exist_ok=True)
+
+    lines = ["", "### Perfis (cProfile) dos PDFs mais lentos", ""]
+    for record in records:
+        name = record["source_filename"]
+        pdf_path = os.path.join(extraction.RAW_DATA_DIR, name)
+        if not os.path.exists(pdf_path):
+            print(f"Skipping profile of {name}: not found in {extraction.RAW_DATA_DIR}")
+            continue
+
+        profiler = cProfile.Profile()
+        profiler.runcall(extraction.extract_metadata, pdf_path,
+                         record.get("backend", extraction.DEFAULT_BACKEND),
+                         record.get("page_mode", extraction.DEFAULT_PAGE_MODE))
+        prof_path = os.path.join(output_dir, os.path.splitext(name)[0] + ".prof")
+        profiler.dump_stats(prof_path)
+
+        buffer = io.StringIO()
+        pstats.Stats(profiler, stream=buffer).strip_dirs().sort_stats("cumulative").print_stats(lines_per_doc)
+        lines += [f"#### {name}", "", f"Perfil completo: `{prof_path}`", "", "```"]
+        lines += [line for line in buffer.getvalue().splitlines() if line.strip()]
+        lines += ["```", ""]
+        print(f"Profile saved: {prof_path}")
+
+    return lines
+
 def main():
-    if not os.path.exists(INPUT_FILE):
-        print(f"Error: Input file not found: {INPUT_FILE}")
+    parser = argparse.ArgumentParser(description="Relatório de extração de metadados")
+    parser.add_argument("--input", nargs="+", default=[INPUT_FILE],
+                        help="Arquivos JSON ou JSONL (shards) a analisar")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processos lendo shards em paralelo")
+    parser.add_argument("--top", type=int, default=TOP_SLOWEST,
+                        help="Quantidade de PDFs mais lentos listados no relatório")
+    parser.add_argument("--profile", action="store_true",
+                        help="Reexecuta a extração dos PDFs mais lentos com cProfile e inclui os perfis")
+    args = parser.parse_args()
+
+    missing = [path for path in args.input if not os.path.exists(path)]
+    if missing:
+        print(f"Error: Input file not found: {', '.join(missing)}")
         return
 
     # Use streaming function
-    report = generate_report_streaming(INPUT_FILE)
+    report = generate_report_streaming(args.input, args.workers)
+
+    if report and os.path.exists(TIMINGS_FILE):
+        timing_lines, slowest = generate_timing_section(TIMINGS_FILE, args.top)
+        if args.profile and slowest:
+            timing_lines += profile_documents(slowest)
+        report += "\n".join(timing_lines)
     
     if report:
         with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
@@ -0,0 +1,59 @@
+import random
+import time
+
+import urllib3
+from minio.error import InvalidResponseError, S3Error, ServerError
+
+# =========================
+# CONEXÕES E RETENTATIVAS DO MINIO
+# =========================
+#
+# Usado pelo upload (01_pre_process.py) e pela leitura direta do bucket
+# (object_source.py). Há uma única camada de retentativa: o pool HTTP não
+# repete nada (retries=False) e with_retries decide, pelo erro já convertido
+# pelo cliente MinIO, se vale tentar de novo. Assim MAX_ATTEMPTS é o número
+# real de requisições por operação.
+
+MAX_ATTEMPTS = 5
+INITIAL_BACKOFF = 0.5   # segundos; dobra a cada tentativa
+MAX_BACKOFF = 30
+
+# Erros do S3 que valem nova tentativa (sobrecarga/instabilidade do servidor)
+TRANSIENT_CODES = {
+    "InternalError", "ServiceUnavailable", "SlowDown", "RequestTimeout",
+    "RequestTimeTooSkewed", "OperationAborted", "XMinioServerNotInitialized",
+}
+# Respostas 5xx sem corpo XML (proxy na frente do MinIO, HEAD sem corpo)
+TRANSIENT_STATUS = {500, 502, 503, 504}
+
+
+def http_pool(maxsize, read_timeout=300):
+    """Pool de conexões para o cliente MinIO, sem retentativas próprias."""
+    return urllib3.PoolManager(
+        maxsize=max(1, maxsize),
+        block=True,
+        timeout=urllib3.Timeout(connect=10, read=read_timeout),
+        retries=False,
+    )
+
+
+def is_transient(error):
+    if isinstance(error, S3Error):
+        return error.code in TRANSIENT_CODES
+    if isinstance(error, ServerError):
+        return error.status_code in TRANSIENT_STATUS
+    if isinstance(error, InvalidResponseError):
+        return getattr(error, "_code", None) in TRANSIENT_STATUS
+    return isinstance(error, (urllib3.exceptions.HTTPError, ConnectionError, TimeoutError))
+
+
+def with_retries(function, *args, attempts=MAX_ATTEMPTS, **kwargs):
+    """Executa `function` repetindo em erros transitórios, com backoff exponencial e jitter."""
+    for attempt in range(1, attempts + 1):
+        try:
+            return function(*args, **kwargs)
+        except Exception as e:
+            if attempt == attempts or not is_transient(e):
+                raise
+            wait = min(MAX_BACKOFF, INITIAL_BACKOFF * 2 ** (attempt - 1))
+            time.sleep(wait * random.uniform(0.5, 1.5))
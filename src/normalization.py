@@ -0,0 +1,125 @@
+import re
+import unicodedata
+from datetime import date
+from functools import lru_cache
+
+# =========================
+# NORMALIZAÇÃO DE CAMPOS
+# =========================
+#
+# Forma canônica dos campos estruturados, aplicada uma única vez na extração
+# (build_metadata) e gravada na saída:
+#
+#   data_do_envio -> "AAAA-MM-DD" (o formato do campo `date` do índice)
+#   cid           -> "F32" / "F32.1" (maiúsculas, sem espaços, com ponto)
+#   processo      -> "NNNNNNN-DD.AAAA.J.TR.OOOO" (numeração única do CNJ)
+#
+# Os valores se repetem muito no corpus (mesmas datas, mesmos CIDs), então
+# cada conversão fica em cache (lru_cache). Valores já canônicos passam
+# direto, e por isso o indexador pode chamar as mesmas funções sem custo.
+
+CACHE_SIZE = 8192
+
+MESES = {
+    "janeiro": 1, "fevereiro": 2, "marco": 3, "abril": 4, "maio": 5, "junho": 6,
+    "julho": 7, "agosto": 8, "setembro": 9, "outubro": 10, "novembro": 11, "dezembro": 12,
+}
+# Abreviações de três letras ("jan", "mar", "set"...)
+MESES_ABREVIADOS = {nome[:3]: numero for nome, numero in MESES.items()}
+
+DATA_ISO_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+DATA_EXTENSO_RE = re.compile(r"(\d{1,2})\s*[º°o]?\s*de\s+([a-z]+)\.?\s+de\s+(\d{4})")
+DATA_NUMERICA_RE = re.compile(r"(?<!\d)(\d{1,2})[/.-](\d{1,2})[/.-](\d{4}|\d{2})(?!\d)")
+
+CID_RE = re.compile(r"([A-Z])\s*(\d{2})\s*\.?\s*(\d)?")
+
+CNJ_DIGITOS = 20
+
+
+def _sem_acentos(texto):
+    return "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+
+
+def _data_iso(ano, mes, dia):
+    try:
+        return date(ano, mes, dia).isoformat()
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_date(value):
+    """
+    Data em ISO (AAAA-MM-DD) ou None. Aceita ISO, "2 de março de 2024" em
+    qualquer caixa e com prefixo ("Goiânia, 2 de Março de 2024"), mês
+    abreviado e "02/03/2024" (dia/mês/ano). Datas impossíveis viram None.
+    """
+    if not isinstance(value, str) or not value.strip():
+        return None
+
+    iso = DATA_ISO_RE.fullmatch(value.strip())
+    if iso:
+        return _data_iso(int(iso.group(1)), int(iso.group(2)), int(iso.group(3)))
+
+    texto = _sem_acentos(value).lower()
+
+    extenso = DATA_EXTENSO_RE.search(texto)
+    if extenso:
+        dia, nome_mes, ano = extenso.groups()
+        mes = MESES.get(nome_mes) or MESES_ABREVIADOS.get(nome_mes[:3])
+        return _data_iso(int(ano), mes, int(dia)) if mes else None
+
+    numerica = DATA_NUMERICA_RE.search(texto)
+    if numerica:
+        dia, mes, ano = numerica.groups()
+        ano = int(ano) + 2000 if len(ano) == 2 else int(ano)
+        return _data_iso(ano, int(mes), int(dia))
+
+    return None
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_cid(value):
+    """CID-10 canônico ("f 321" -> "F32.1"); o valor original (sem espaços) se não reconhecido."""
+    if not isinstance(value, str) or not value.strip():
+        return None
+    texto = value.strip().upper()
+    match = CID_RE.fullmatch(texto)
+    if not match:
+        return texto.replace(" ", "")
+    letra, categoria, subcategoria = match.groups()
+    return f"{letra}{categoria}.{subcategoria}" if subcategoria else f"{letra}{categoria}"
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_processo(value):
+    """
+    Número CNJ no formato NNNNNNN-DD.AAAA.J.TR.OOOO, a partir de qualquer
+    pontuação (ou nenhuma); o valor original se não tiver 20 dígitos.
+    """
+    if not isinstance(value, str) or not value.strip():
+        return None
+    digitos = "".join(c for c in value if c.isdigit())
+    if len(digitos) != CNJ_DIGITOS:
+        return value.strip()
+    return f"{digitos[:7]}-{digitos[7:9]}.{digitos[9:13]}.{digitos[13]}.{digitos[14:16]}.{digitos[16:]}"
+
+
+NORMALIZERS = {
+    "data_do_envio": normalize_date,
+    "cid": normalize_cid,
+    "processo": normalize_processo,
+}
+
+
+def normalize_record(record):
+    """Normaliza (no próprio dict) os campos de NORMALIZERS e retorna o registro."""
+    for field, normalizer in NORMALIZERS.items():
+        if field in record:
+            record[field] = normalizer(record[field])
+    return record
+
+
+def cache_stats():
+    """Acertos/erros do cache de cada normalizador."""
+    return {field: normalizer.cache_info()._asdict() for field, normalizer in NORMALIZERS.items()}
@@ -0,0 +1,360 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from minio import Minio
+
+from minio_http import http_pool, with_retries
+
+# =========================
+# PDFs DIRETO DO MINIO/S3
+# =========================
+#
+# Permite extrair sem cópia local quando os PDFs só existem no bucket
+# (`--source s3://bucket/prefixo/`). Cada PDF é aberto como um arquivo
+# binário somente leitura (RangedObject) sobre GETs com Range: o parser lê o
+# trailer e a tabela xref no fim do arquivo e depois só os objetos das
+# páginas que a seleção de páginas pede, então um PDF de 300 páginas em modo
+# window baixa uma fração do tamanho. Os blocos lidos ficam num LRU em
+# memória, e leituras que cruzam vários blocos ausentes viram uma requisição
+# só.
+#
+# Enquanto um documento é extraído, o Prefetcher baixa em threads o bloco
+# inicial e o final dos próximos (onde ficam cabeçalho, xref e trailer) para
+# um spool local por execução; os workers (processos do supervisor) leem
+# esses blocos do disco em vez da rede, e o spool de cada documento é
+# apagado quando ele termina.
+#
+# Cada requisição (stat e GET com Range) é repetida em erros transitórios
+# por minio_http.with_retries, a mesma política do upload.
+#
+# A identidade do conteúdo no cache de extração é o ETag do objeto (não há
+# como calcular o SHA-256 sem baixar o PDF inteiro): content_key(etag).
+#
+# O registro extraído leva a URI do objeto em SOURCE_FIELD; o
+# 01_pre_process.py monta a URL do PDF a partir dela (bucket e chave reais),
+# sem reenviar nada.
+
+SCHEME = "s3://"
+SOURCE_FIELD = "objeto_origem"
+BLOCK_SIZE = 256 * 1024
+MAX_BLOCKS = 64          # blocos em memória por documento (16 MB)
+POOL_SIZE = 8            # conexões HTTP por processo
+PREFETCH_DEPTH = 2       # documentos baixados à frente do que está sendo extraído
+
+MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT", "localhost:9000")
+MINIO_ACCESS_KEY = os.getenv("MINIO_ACCESS_KEY", "minioadmin")
+MINIO_SECRET_KEY = os.getenv("MINIO_SECRET_KEY", "minio@natjus")
+MINIO_SECURE = os.getenv("MINIO_SECURE", "false").lower() == "true"
+
+
+def is_object_uri(path):
+    return isinstance(path, str) and path.startswith(SCHEME)
+
+
+def parse_uri(uri):
+    """s3://bucket/chave -> (bucket, chave)."""
+    bucket, _, key = uri[len(SCHEME):].partition("/")
+    if not bucket:
+        raise ValueError(f"URI de objeto inválida: {uri} (esperado s3://bucket/prefixo/)")
+    return bucket, key
+
+
+def object_uri(source, name):
+    """URI do PDF `name` dentro da origem `source` (s3://bucket/prefixo/)."""
+    return source.rstrip("/") + "/" + name
+
+
+def content_key(etag):
+    """Chave de conteúdo gravada no cache no lugar do SHA-256."""
+    return "etag:" + etag.strip('"')
+
+
+_client = None
+_client_pid = None
+
+
+def get_client():
+    """
+    Cliente MinIO do processo atual, com pool de conexões reaproveitadas.
+    Recriado após fork: workers do supervisor não herdam sockets do pai.
+    """
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        _client = Minio(
+            MINIO_ENDPOINT,
+            access_key=MINIO_ACCESS_KEY,
+            secret_key=MINIO_SECRET_KEY,
+            secure=MINIO_SECURE,
+            http_client=http_pool(POOL_SIZE, read_timeout=120),
+        )
+        _client_pid = os.getpid()
+    return _client
+
+
+def list_objects(source, client=None):
+    """
+    (uri, tamanho, etag) dos PDFs diretamente sob o prefixo de `source`, em
+    ordem de chave (como o glob de RAW_DATA_DIR: subpastas não entram).
+    """
+    client = client or get_client()
+    bucket, prefix = parse_uri(source)
+    if prefix and not prefix.endswith("/"):
+        prefix += "/"
+    for obj in client.list_objects(bucket, prefix=prefix or None, recursive=True):
+        name = obj.object_name[len(prefix):]
+        if "/" in name or not name.lower().endswith(".pdf"):
+            continue
+        yield f"{SCHEME}{bucket}/{obj.object_name}", obj.size, obj.etag.strip('"')
+
+
+def _read_range(client, bucket, key, offset, length):
+    response = client.get_object(bucket, key, offset=offset, length=length)
+    try:
+        return response.read()
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def fetch_range(client, bucket, key, offset, length):
+    """Bytes [offset, offset + length) do objeto, repetindo em erros transitórios."""
+    return with_retries(_read_range, client, bucket, key, offset, length)
+
+
+def stat_object(client, bucket, key):
+    return with_retries(client.stat_object, bucket, key)
+
+
+def _spool_name(uri):
+    return hashlib.sha1(uri.encode("utf-8")).hexdigest()
+
+
+class RangedObject(io.RawIOBase):
+    """Arquivo binário somente leitura sobre um objeto do bucket, lido em blocos."""
+
+    def __init__(self, uri, client=None, spool_dir=None, block_size=BLOCK_SIZE, max_blocks=MAX_BLOCKS):
+        super().__init__()
+        self.uri = uri
+        self.bucket, self.key = parse_uri(uri)
+        self.client = client or get_client()
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        self.spool = os.path.join(spool_dir, _spool_name(uri)) if spool_dir else None
+        self._blocks = OrderedDict()
+        self._pos = 0
+        self.requests = 0
+        self.bytes_fetched = 0     # baixados pela rede por este objeto
+        self.bytes_spooled = 0     # lidos do spool do Prefetcher
+
+        meta = self._spooled_meta()
+        if meta is None:
+            stat = stat_object(self.client, self.bucket, self.key)
+            meta = {"size": stat.size, "etag": stat.etag.strip('"')}
+            self.requests += 1
+        self.size = meta["size"]
+        self.etag = meta["etag"]
+
+    # ---------- spool ----------
+
+    def _spooled_meta(self):
+        if self.spool is None:
+            return None
+        try:
+            with open(self.spool + ".json", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _spooled_block(self, index):
+        if self.spool is None:
+            return None
+        try:
+            with open(f"{self.spool}.{index}", "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        self.bytes_spooled += len(data)
+        return data
+
+    # ---------- blocos ----------
+
+    def _remember(self, index, data):
+        self._blocks[index] = data
+        self._blocks.move_to_end(index)
+        while len(self._blocks) > self.max_blocks:
+            self._blocks.popitem(last=False)
+
+    def _fetch(self, first, count):
+        offset = first * self.block_size
+        length = min(count * self.block_size, self.size - offset)
+        data = fetch_range(self.client, self.bucket, self.key, offset, length)
+        self.requests += 1
+        self.bytes_fetched += len(data)
+        for i in range(count):
+            self._remember(first + i, data[i * self.block_size:(i + 1) * self.block_size])
+
+    def _load(self, first, last):
+        """Garante os blocos first..last em memória, agrupando os ausentes em faixas contíguas."""
+        missing = []
+        for index in range(first, last + 1):
+            if index in self._blocks:
+                self._blocks.move_to_end(index)
+                continue
+            data = self._spooled_block(index)
+            if data is not None:
+                self._remember(index, data)
+            else:
+                missing.append(index)
+
+        start = None
+        for n, index in enumerate(missing):
+            if start is None:
+                start = index
+            if n + 1 == len(missing) or missing[n + 1] != index + 1:
+                self._fetch(start, index - start + 1)
+                start = None
+
+    # ---------- interface de arquivo ----------
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = self.size + offset
+        else:
+            raise ValueError(f"whence inválido: {whence}")
+        self._pos = max(0, self._pos)
+        return self._pos
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.size - self._pos
+        end = min(self._pos + size, self.size)
+        if end <= self._pos:
+            return b""
+
+        first, last = self._pos // self.block_size, (end - 1) // self.block_size
+        if last - first + 1 > self.max_blocks:
+            # Leitura maior que o LRU inteiro (parser lendo o arquivo todo): vai direto, sem cache
+            data = fetch_range(self.client, self.bucket, self.key, self._pos, end - self._pos)
+            self.requests += 1
+            self.bytes_fetched += len(data)
+            self._pos = end
+            return data
+        self._load(first, last)
+        if first == last:
+            block = self._blocks[first]
+            start = self._pos - first * self.block_size
+            data = block[start:start + end - self._pos]
+        else:
+            parts = []
+            for index in range(first, last + 1):
+                block_start = index * self.block_size
+                block = self._blocks[index]
+                parts.append(block[max(0, self._pos - block_start):end - block_start])
+            data = b"".join(parts)
+        self._pos = end
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def readall(self):
+        return self.read()
+
+    def close(self):
+        self._blocks.clear()
+        super().close()
+
+
+class Prefetcher:
+    """
+    Baixa, em `depth` threads, metadados e blocos inicial e final dos
+    próximos objetos de `uris` para `spool_dir`. done(uri) apaga o spool do
+    documento concluído e libera mais um da fila; close() apaga o spool.
+    """
+
+    def __init__(self, uris, spool_dir, depth=PREFETCH_DEPTH, ahead=1, block_size=BLOCK_SIZE, log=None):
+        self.uris = [uri for uri in uris if is_object_uri(uri)]
+        self.spool_dir = spool_dir
+        self.block_size = block_size
+        self.log = log
+        self.lock = threading.Lock()
+        self._next = 0
+        os.makedirs(spool_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, depth), thread_name_prefix="prefetch")
+        # Os que entram em extração logo de início (`ahead`) mais `depth` à frente
+        for _ in range(ahead + depth):
+            self._submit_next()
+
+    def _submit_next(self):
+        with self.lock:
+            if self._next >= len(self.uris):
+                return
+            uri = self.uris[self._next]
+            self._next += 1
+        self._executor.submit(self._prefetch, uri)
+
+    def _write(self, path, data):
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _prefetch(self, uri):
+        try:
+            client = get_client()
+            bucket, key = parse_uri(uri)
+            stat = stat_object(client, bucket, key)
+            base = os.path.join(self.spool_dir, _spool_name(uri))
+            last = max(0, (stat.size - 1) // self.block_size)
+            # Objetos pequenos vêm inteiros numa requisição só
+            if last <= 1:
+                data = fetch_range(client, bucket, key, 0, stat.size)
+                blocks = {i: data[i * self.block_size:(i + 1) * self.block_size] for i in range(last + 1)}
+            else:
+                blocks = {0: fetch_range(client, bucket, key, 0, self.block_size),
+                          last: fetch_range(client, bucket, key, last * self.block_size,
+                                            stat.size - last * self.block_size)}
+            for index, data in blocks.items():
+                self._write(f"{base}.{index}", data)
+            self._write(base + ".json", json.dumps({"size": stat.size, "etag": stat.etag.strip('"')}).encode())
+        except Exception as e:
+            # O worker lê direto do bucket; prefetch é só otimização
+            if self.log is not None:
+                self.log(f"Prefetch de {uri} falhou: {e}")
+
+    def done(self, uri):
+        base = os.path.join(self.spool_dir, _spool_name(uri))
+        for name in os.listdir(self.spool_dir):
+            if name.startswith(os.path.basename(base) + "."):
+                try:
+                    os.remove(os.path.join(self.spool_dir, name))
+                except OSError:
+                    pass
+        self._submit_next()
+
+    def close(self):
+        with self.lock:
+            self._next = len(self.uris)
+        self._executor.shutdown(wait=True)
+        shutil.rmtree(self.spool_dir, ignore_errors=True)
@@ -0,0 +1,193 @@
+import gzip
+import mmap
+import os
+import sqlite3
+import uuid
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - dependência opcional
+    zstandard = None
+
+# =========================
+# PACK STORE
+# =========================
+#
+# Armazenamento chave -> bytes comprimidos, para volumes grandes de texto.
+#
+#   <root>/index.sqlite      -> chave, arquivo, offset, tamanho e codec
+#   <root>/pack-<pid>-*.bin  -> blobs comprimidos, só acrescentados no fim
+#
+# Cada instância escreve no seu próprio arquivo de pack, então vários
+# processos (workers da extração) podem gravar ao mesmo tempo; o índice
+# SQLite em modo WAL serializa apenas as inserções. A leitura é feita por
+# mmap, sem copiar o pack para a memória. O índice só recebe commit depois
+# que os bytes do pack foram descarregados, então nunca aponta para dados
+# que não existem.
+#
+# As entradas do índice ficam num buffer em memória até flush(), que as grava
+# numa transação curta: o lock de escrita do SQLite não fica preso enquanto
+# um worker extrai um PDF longo, e os demais workers não esperam por ele.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key        TEXT PRIMARY KEY,
+    pack       TEXT NOT NULL,
+    offset     INTEGER NOT NULL,
+    length     INTEGER NOT NULL,
+    codec      TEXT NOT NULL,
+    raw_length INTEGER NOT NULL
+);
+"""
+
+NULL_CODEC = "null"  # valor None: só a entrada no índice, sem bytes no pack
+
+
+def _zstd_compress(data):
+    return zstandard.ZstdCompressor(level=10).compress(data)
+
+
+def _zstd_decompress(data):
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+CODECS = {
+    "zlib": (lambda data: zlib.compress(data, 6), zlib.decompress),
+    "gzip": (lambda data: gzip.compress(data, 6), gzip.decompress),
+}
+if zstandard is not None:
+    CODECS["zstd"] = (_zstd_compress, _zstd_decompress)
+
+
+def best_codec():
+    """zstd se o pacote zstandard estiver instalado, senão zlib."""
+    return "zstd" if "zstd" in CODECS else "zlib"
+
+
+class PackStore:
+    def __init__(self, root, codec="zlib", commit_every=200):
+        if codec not in CODECS:
+            raise ValueError(f"Codec indisponível: {codec} (opções: {', '.join(CODECS)})")
+
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.codec = codec
+        self.commit_every = commit_every
+
+        self.conn = sqlite3.connect(os.path.join(root, "index.sqlite"), timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+        self._writer = None
+        self._writer_name = None
+        self._pending = {}   # chave -> linha do índice ainda não gravada
+        self._maps = {}
+
+    # ---------- escrita ----------
+
+    def _open_writer(self):
+        self._writer_name = f"pack-{os.getpid()}-{uuid.uuid4().hex[:8]}.bin"
+        self._writer = open(os.path.join(self.root, self._writer_name), "ab")
+
+    def put(self, key, data):
+        """Grava `data` (bytes ou None) sob `key`, substituindo valor anterior."""
+        if data is None:
+            row = (key, "", 0, 0, NULL_CODEC, 0)
+        else:
+            if self._writer is None:
+                self._open_writer()
+            blob = CODECS[self.codec][0](data)
+            offset = self._writer.tell()
+            self._writer.write(blob)
+            row = (key, self._writer_name, offset, len(blob), self.codec, len(data))
+
+        self._pending[key] = row
+        if len(self._pending) >= self.commit_every:
+            self.flush()
+
+    def flush(self):
+        if self._writer is not None:
+            self._writer.flush()
+            os.fsync(self._writer.fileno())
+        if self._pending:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO entries (key, pack, offset, length, codec, raw_length) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", list(self._pending.values())
+                )
+            self._pending.clear()
+
+    # ---------- leitura ----------
+
+    def _map(self, pack, needed):
+        mapped = self._maps.get(pack)
+        if mapped is None or len(mapped) < needed:
+            if mapped is not None:
+                mapped.close()
+            with open(os.path.join(self.root, pack), "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[pack] = mapped
+        return mapped
+
+    def _lookup(self, key):
+        pending = self._pending.get(key)
+        if pending is not None:
+            return pending[1:5]
+        return self.conn.execute(
+            "SELECT pack, offset, length, codec FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+
+    def has(self, key):
+        return self._lookup(key) is not None
+
+    def get(self, key, default=KeyError):
+        """Bytes gravados sob `key` (None se foi gravado None)."""
+        row = self._lookup(key)
+        if row is None:
+            if default is KeyError:
+                raise KeyError(key)
+            return default
+
+        pack, offset, length, codec = row
+        if codec == NULL_CODEC:
+            return None
+
+        if pack == self._writer_name:
+            self._writer.flush()
+        mapped = self._map(pack, offset + length)
+        return CODECS[codec][1](mapped[offset:offset + length])
+
+    def keys(self, prefix=""):
+        self.flush()
+        rows = self.conn.execute(
+            "SELECT key FROM entries WHERE key >= ? AND key < ? ORDER BY key",
+            (prefix, prefix + "￿"),
+        )
+        return [row[0] for row in rows]
+
+    def stats(self):
+        self.flush()
+        count, stored, raw = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length), 0), COALESCE(SUM(raw_length), 0) FROM entries"
+        ).fetchone()
+        return {"entries": count, "stored_bytes": stored, "raw_bytes": raw}
+
+    # ---------- ciclo de vida ----------
+
+    def close(self):
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        for mapped in self._maps.values():
+            mapped.close()
+        self._maps.clear()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,104 @@
+import json
+
+from pack_store import PackStore
+from pdf_backends import LazyDocument, open_document
+
+# =========================
+# CACHE DE TEXTO POR PÁGINA
+# =========================
+#
+# Guarda o texto extraído de cada página, chaveado por hash do PDF, backend e
+# número da página:
+#
+#   <sha256>/<backend>/meta        -> {"page_count": ..., "source_filename": ...}
+#   <sha256>/<backend>/p<00000>    -> texto da página (None se ilegível)
+#
+# A extração de texto é a parte cara do pipeline; com as páginas guardadas,
+# mudanças nas regras de field_rules podem ser reaplicadas sem abrir nenhum
+# PDF (extract_metadata.py --from-text-cache).
+
+
+def _doc_prefix(sha256, backend):
+    return f"{sha256}/{backend}/"
+
+
+class PageTextStore(PackStore):
+    def get_meta(self, sha256, backend):
+        data = self.get(_doc_prefix(sha256, backend) + "meta", default=None)
+        return json.loads(data) if data else None
+
+    def put_meta(self, sha256, backend, page_count, source_filename):
+        meta = {"page_count": page_count, "source_filename": source_filename}
+        self.put(_doc_prefix(sha256, backend) + "meta", json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+
+    def page_key(self, sha256, backend, index):
+        return _doc_prefix(sha256, backend) + f"p{index:05d}"
+
+    def get_page(self, sha256, backend, index):
+        """(encontrado, texto)"""
+        missing = object()
+        data = self.get(self.page_key(sha256, backend, index), default=missing)
+        if data is missing:
+            return False, None
+        return True, None if data is None else data.decode("utf-8")
+
+    def put_page(self, sha256, backend, index, text):
+        self.put(self.page_key(sha256, backend, index), None if text is None else text.encode("utf-8"))
+
+
+class CachedDocument(LazyDocument):
+    """
+    Documento que lê as páginas do PageTextStore e só abre o PDF (com o
+    backend indicado) para as páginas que ainda não estão guardadas. Páginas
+    extraídas do PDF são gravadas no store.
+
+    Com `pdf_path=None` o PDF não está disponível: páginas ausentes geram erro.
+    """
+
+    def __init__(self, store, sha256, backend, pdf_path=None, source_filename=None):
+        super().__init__()
+        self.store = store
+        self.sha256 = sha256
+        self.backend = backend
+        self.pdf_path = pdf_path
+        self.source_filename = source_filename
+        self.pages_from_cache = 0
+        self._inner = None
+
+        meta = store.get_meta(sha256, backend)
+        if meta is not None:
+            self._page_count = meta["page_count"]
+        else:
+            self._page_count = self._open_inner().page_count
+            store.put_meta(sha256, backend, self._page_count, source_filename)
+
+    def _open_inner(self):
+        if self._inner is None:
+            if self.pdf_path is None:
+                raise FileNotFoundError(f"Páginas de {self.source_filename or self.sha256} ausentes do cache de texto")
+            self._inner = open_document(self.pdf_path, self.backend)
+        return self._inner
+
+    @property
+    def page_count(self):
+        return self._page_count
+
+    def page_text(self, index):
+        if index not in self._texts:
+            found, text = self.store.get_page(self.sha256, self.backend, index)
+            if found:
+                self._texts[index] = text
+                self.pages_from_cache += 1
+                return text
+
+            inner = self._open_inner()
+            text = inner.page_text(index)
+            self.page_seconds[index] = inner.page_seconds.get(index, 0.0)
+            self.store.put_page(self.sha256, self.backend, index, text)
+            self._texts[index] = text
+            self.pages_parsed += 1
+        return self._texts[index]
+
+    def close(self):
+        if self._inner is not None:
+            self._inner.close()
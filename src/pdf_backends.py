@@ -0,0 +1,208 @@
+import time
+
+import pdfplumber
+
+from field_rules import missing_fields
+
+try:
+    import pypdf
+except ImportError:  # pragma: no cover - depende do ambiente
+    try:
+        import PyPDF2 as pypdf
+    except ImportError:
+        pypdf = None
+
+# =========================
+# BACKENDS DE TEXTO DE PDF
+# =========================
+#
+# Todos os backends expõem o mesmo documento "preguiçoso": o número de
+# páginas é conhecido na abertura, mas o texto de cada página só é extraído
+# (e memorizado) quando page_text(i) é chamado. Assim quem lê decide quais
+# páginas precisa e o resto do PDF nunca é interpretado.
+#
+#   pdfplumber -> mais fiel ao layout, mais lento (padrão)
+#   pypdf      -> bem mais rápido, às vezes perde texto em PDFs complexos
+#   auto       -> pypdf primeiro; páginas vazias ou com erro são refeitas no pdfplumber
+
+
+class LazyDocument:
+    def __init__(self):
+        self._texts = {}
+        self.pages_parsed = 0
+        self.page_errors = 0
+        self.page_seconds = {}   # índice -> segundos gastos extraindo o texto da página
+
+    @property
+    def page_count(self):
+        raise NotImplementedError
+
+    def _extract(self, index):
+        raise NotImplementedError
+
+    def page_text(self, index):
+        """Texto da página `index`, ou None se a página não puder ser lida."""
+        if index not in self._texts:
+            start = time.perf_counter()
+            try:
+                self._texts[index] = self._extract(index)
+            except Exception:
+                self._texts[index] = None  # Ignora páginas com erro de leitura
+                self.page_errors += 1
+            self.page_seconds[index] = time.perf_counter() - start
+            self.pages_parsed += 1
+        return self._texts[index]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class PdfPlumberDocument(LazyDocument):
+    def __init__(self, source):
+        super().__init__()
+        self._pdf = pdfplumber.open(source)
+
+    @property
+    def page_count(self):
+        return len(self._pdf.pages)
+
+    def _extract(self, index):
+        page = self._pdf.pages[index]
+        try:
+            return page.extract_text()
+        finally:
+            # Libera os objetos de layout da página; em PDFs grandes eles
+            # dominam o uso de memória.
+            page.close()
+
+    def close(self):
+        self._pdf.close()
+
+
+class PyPdfDocument(LazyDocument):
+    def __init__(self, source):
+        super().__init__()
+        if pypdf is None:
+            raise RuntimeError("Backend 'pypdf' indisponível: instale pypdf ou PyPDF2")
+        self._reader = pypdf.PdfReader(source)
+
+    @property
+    def page_count(self):
+        return len(self._reader.pages)
+
+    def _extract(self, index):
+        return self._reader.pages[index].extract_text()
+
+
+class FallbackDocument(LazyDocument):
+    """pypdf primeiro; o pdfplumber só é aberto se alguma página precisar."""
+
+    def __init__(self, source):
+        super().__init__()
+        self._source = source
+        self._fast = PyPdfDocument(source)
+        self._slow = None
+        self.fallback_pages = 0
+
+    @property
+    def page_count(self):
+        return self._fast.page_count
+
+    def _extract(self, index):
+        text = self._fast.page_text(index)
+        if text and text.strip():
+            return text
+
+        if self._slow is None:
+            if hasattr(self._source, "seek"):
+                self._source.seek(0)
+            self._slow = PdfPlumberDocument(self._source)
+        self.fallback_pages += 1
+        return self._slow.page_text(index)
+
+    def close(self):
+        self._fast.close()
+        if self._slow is not None:
+            self._slow.close()
+
+
+BACKENDS = {
+    "pdfplumber": PdfPlumberDocument,
+    "pypdf": PyPdfDocument,
+    "auto": FallbackDocument,
+}
+
+
+def open_document(source, backend="pdfplumber"):
+    """Abre `source` (caminho ou arquivo binário) com o backend escolhido."""
+    try:
+        document_class = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Backend desconhecido: {backend} (opções: {', '.join(BACKENDS)})")
+    return document_class(source)
+
+
+# =========================
+# SELEÇÃO DE PÁGINAS
+# =========================
+#
+#   window -> se o PDF tiver mais de 20 páginas, lê as 10 primeiras e as 10 últimas
+#   fields -> lê do início só até achar os campos de cabeçalho e do fim só até
+#             achar os de rodapé (no máximo 3 de cada lado); o inteiro_teor
+#             passa a conter apenas as páginas lidas
+
+PAGE_MODES = ["window", "fields"]
+WINDOW_THRESHOLD = 20
+WINDOW_PAGES = 10
+MAX_HEADER_PAGES = 3
+MAX_TAIL_PAGES = 3
+
+
+def join_pages(doc, pages):
+    full_text = ""
+    for index in pages:
+        text = doc.page_text(index)
+        if text:
+            full_text += text + "\n"
+    return full_text
+
+
+def select_window_pages(doc):
+    total_pages = doc.page_count
+
+    # Se tiver muitas páginas, lê apenas o início e o fim para otimizar
+    if total_pages > WINDOW_THRESHOLD:
+        return list(range(WINDOW_PAGES)) + list(range(total_pages - WINDOW_PAGES, total_pages))
+    return list(range(total_pages))
+
+
+def select_field_pages(doc):
+    """Páginas necessárias para os campos de cabeçalho e de rodapé."""
+    total_pages = doc.page_count
+
+    head = []
+    for index in range(min(total_pages, MAX_HEADER_PAGES)):
+        head.append(index)
+        if not missing_fields(join_pages(doc, head), "header"):
+            break
+
+    tail = []
+    first_tail = max(len(head), total_pages - MAX_TAIL_PAGES)
+    for index in range(total_pages - 1, first_tail - 1, -1):
+        tail.insert(0, index)
+        if not missing_fields(join_pages(doc, tail), "tail"):
+            break
+
+    return head + tail
+
+
+def select_pages(doc, page_mode="window"):
+    if page_mode == "fields":
+        return select_field_pages(doc)
+    return select_window_pages(doc)
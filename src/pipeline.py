@@ -0,0 +1,330 @@
+import argparse
+import importlib
+import logging
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import extract_metadata as extraction
+from bulk_ingest import FLUSH, bulk_ingest, describe_totals
+from dedup import is_duplicate
+from extraction_cache import ExtractionCache, STATUS_OK, STATUS_FAILED, STATUS_DUPLICATE
+from full_text_store import FullTextStore
+from object_source import SOURCE_FIELD
+from pdf_backends import BACKENDS, PAGE_MODES
+from record_io import JsonlSink, document_id, is_tombstone, tombstone
+
+uploader = importlib.import_module("01_pre_process")
+indexer = importlib.import_module("02_index_legacy")
+
+logger = extraction.logger
+# O cliente do Elasticsearch loga cada requisição em INFO
+logging.getLogger("elastic_transport").setLevel(logging.WARNING)
+
+# =========================
+# PIPELINE EXTRAÇÃO -> UPLOAD -> INDEXAÇÃO
+# =========================
+#
+# As três etapas rodam ao mesmo tempo, ligadas por filas limitadas:
+#
+#   processos de extração -> [fila] -> threads de upload (MinIO) -> [fila] -> bulk (Elasticsearch)
+#
+# Cada PDF segue adiante assim que fica pronto: o primeiro documento fica
+# pesquisável segundos depois do início, e a CPU da extração se sobrepõe à
+# espera de rede do upload e da indexação. Quando uma etapa fica para trás, a
+# fila dela enche e a anterior bloqueia, então a memória fica limitada pelo
+# tamanho das filas, não pelo corpus.
+#
+# A extração continua gravando o JSONL/cache de extract_metadata.py (e o JSON
+# e CSV finais ao terminar), então as etapas avulsas seguem funcionando.
+#
+# Com --watch o pipeline não termina: depois dos pendentes, as etapas ficam
+# abertas e a pasta de PDFs é verificada a cada --intervalo segundos. Cada
+# PDF novo ou alterado passa pelas mesmas filas e fica pesquisável segundos
+# depois de copiado, sem reler a pasta inteira nem recriar o índice.
+
+QUEUE_SIZE = 32
+UPLOAD_WORKERS = 4
+INDEX_IDLE_FLUSH = 1.0   # segundos sem novos documentos antes de enviar o lote parcial
+WATCH_INTERVAL = 2.0     # segundos entre verificações da pasta no modo --watch
+AGGREGATES_INTERVAL = 300  # segundos mínimos entre recálculos dos agregados no modo --watch
+
+DONE = object()
+
+
+def iter_queue(fila):
+    while True:
+        item = fila.get()
+        if item is DONE:
+            return
+        yield item
+
+
+def upload_stage(client, entrada, saida, workers, forcar, stats):
+    """Envia o PDF de cada registro e repassa o item com a URL para a indexação."""
+    vagas = threading.BoundedSemaphore(workers * 2)
+    lock = threading.Lock()
+
+    def enviar(registro):
+        try:
+            url, status = uploader.upload_arquivo(client, registro.get("source_filename"), forcar,
+                                                  extraction.RAW_DATA_DIR, registro.get(SOURCE_FIELD))
+            with lock:
+                stats[status] += 1
+            saida.put(uploader.montar_item(registro, url))
+        except Exception as e:
+            logger.error(f"Erro no upload de {registro.get('source_filename')}: {e}")
+            with lock:
+                stats["falha"] += 1
+        finally:
+            vagas.release()
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for registro in iter_queue(entrada):
+                vagas.acquire()
+                executor.submit(enviar, registro)
+    finally:
+        saida.put(DONE)
+
+
+def index_actions(entrada, ocioso=INDEX_IDLE_FLUSH):
+    """Ações de indexação a partir da fila; envia o lote parcial quando a fila fica ociosa."""
+    while True:
+        try:
+            item = entrada.get(timeout=ocioso)
+        except queue.Empty:
+            yield FLUSH
+            continue
+        if item is DONE:
+            return
+        if is_tombstone(item):
+            # PDF removido da pasta (extraction.propagate_removals)
+            yield from indexer.gerar_remocoes([document_id(item)])
+            continue
+        yield from indexer.gerar_docs([item])
+
+
+def index_stage(es, entrada, opcoes, stats, inicio, publicar=False):
+    """
+    Indexa o que chega da fila. Com `publicar` (modo --watch), cada lote
+    concluído já fica visível (refresh) e publica uma geração nova para o
+    serviço de busca; os agregados são recalculados no máximo a cada
+    AGGREGATES_INTERVAL segundos.
+    """
+    falhas = indexer.abrir_falhas()
+    agregados_em = [time.monotonic()]
+
+    def lote_concluido(resultado):
+        if resultado["success"] and stats["primeiro_pesquisavel"] is None:
+            stats["primeiro_pesquisavel"] = time.perf_counter() - inicio
+            logger.info(f"Primeiro documento indexado após {stats['primeiro_pesquisavel']:.1f} s")
+        if publicar and resultado["success"]:
+            es.indices.refresh(index=indexer.INDEX_NAME)
+            recalcular = time.monotonic() - agregados_em[0] >= AGGREGATES_INTERVAL
+            if recalcular:
+                agregados_em[0] = time.monotonic()
+            indexer.publicar_geracao(es, extraction.OUTPUT_JSONL if recalcular else None)
+
+    try:
+        totais = bulk_ingest(es, index_actions(entrada), on_error=partial(indexer.registrar_falha, falhas),
+                             on_batch=lote_concluido, **opcoes)
+        stats["totais"] = totais
+        es.indices.refresh(index=indexer.INDEX_NAME)
+    except Exception as e:
+        logger.error(f"Erro na indexação: {e}")
+        # Esvazia a fila para não travar as etapas anteriores
+        for _ in iter_queue(entrada):
+            pass
+    finally:
+        indexer.fechar_falhas(falhas, stats["totais"]["failed"] if stats.get("totais") else 0)
+
+
+# =========================
+# MODO WATCH
+# =========================
+
+def snapshot_pasta(pasta):
+    """{nome: (tamanho, mtime_ns)} dos PDFs da pasta."""
+    with os.scandir(pasta) as entradas:
+        return {
+            entrada.name: (st.st_size, st.st_mtime_ns)
+            for entrada in entradas
+            if entrada.name.lower().endswith(".pdf") and entrada.is_file()
+            for st in (entrada.stat(),)
+        }
+
+
+def watch_changes(pasta, intervalo=WATCH_INTERVAL, inicial=None):
+    """
+    Gera, a cada verificação, os caminhos dos PDFs novos ou alterados desde a
+    anterior. Por polling, e não inotify, porque inotify não recebe eventos em
+    volumes montados do Windows/macOS no Docker. Um arquivo só sai depois de
+    ficar uma verificação inteira sem mudar de tamanho nem de mtime, então um
+    PDF ainda sendo copiado não é lido pela metade. Remoções são ignoradas.
+
+    `inicial` é o snapshot tirado antes da varredura dos pendentes: o que
+    mudou depois dele (inclusive durante a primeira extração) é entregue.
+    """
+    anterior = snapshot_pasta(pasta)
+    # Os que já existiam no início saíram com os pendentes da varredura inicial
+    entregues = dict(inicial if inicial is not None else anterior)
+    while True:
+        time.sleep(intervalo)
+        atual = snapshot_pasta(pasta)
+        prontos = sorted(nome for nome, assinatura in atual.items()
+                         if assinatura == anterior.get(nome) and entregues.get(nome) != assinatura)
+        anterior = atual
+        for nome in prontos:
+            entregues[nome] = atual[nome]
+        if prontos:
+            yield [os.path.join(pasta, nome) for nome in prontos]
+
+
+def _encerrar(signum, frame):
+    # docker stop envia SIGTERM: encerra como Ctrl+C, passando pelos finally
+    raise KeyboardInterrupt
+
+
+def run_pipeline(args):
+    inicio = time.perf_counter()
+    version = extraction.extractor_version(args.backend, args.page_mode)
+
+    client = uploader.setup_minio(args.upload_workers)
+    es = indexer.conectar_elastic()
+    if not client or not es:
+        return
+
+    indexer.garantir_indice(es)
+
+    extraction.seed_jsonl_from_json()
+    cache = ExtractionCache(extraction.CACHE_DB)
+    # Antes da varredura: PDFs copiados durante a primeira extração não se perdem
+    inicial = snapshot_pasta(extraction.RAW_DATA_DIR) if args.watch else None
+    pdf_files, hashes, removidos, regravados = extraction.scan_sources(cache, version)
+    if args.limit:
+        pdf_files = pdf_files[:args.limit]
+    logger.info(f"Pipeline: {len(pdf_files)} PDFs pendentes | extração {args.workers} processo(s), "
+                f"upload {args.upload_workers} thread(s), filas de {args.queue_size}")
+
+    extraidos = queue.Queue(maxsize=args.queue_size)
+    enviados = queue.Queue(maxsize=args.queue_size)
+    upload_stats = {"enviado": 0, "existente": 0, "falha": 0}
+    index_stats = {"primeiro_pesquisavel": None, "totais": None}
+
+    opcoes = indexer.opcoes_bulk(args.index_threads, args.bulk_docs, args.bulk_mb)
+    etapas = [
+        threading.Thread(target=upload_stage, name="upload",
+                         args=(client, extraidos, enviados, args.upload_workers, args.force_upload, upload_stats)),
+        threading.Thread(target=index_stage, name="indexacao",
+                         args=(es, enviados, opcoes, index_stats, inicio, args.watch)),
+    ]
+    for etapa in etapas:
+        etapa.start()
+
+    # Removidos da pasta saem do índice; canônicos que perderam duplicatas
+    # são reindexados com a lista nova
+    for nome in removidos:
+        enviados.put(tombstone(nome))
+    for registro in regravados:
+        extraidos.put(registro)
+
+    # A extração roda na thread principal (pool de processos + cache SQLite).
+    # O JSONL recebe só a referência ao texto; as filas levam o registro com
+    # o texto, então a indexação não precisa ler o store.
+    textos = FullTextStore(extraction.FULL_TEXT_DIR)
+    dedup = extraction.dedup_from_args(cache, args)
+    try:
+        with JsonlSink(extraction.OUTPUT_JSONL, batch_size=args.batch_size) as sink, \
+                JsonlSink(extraction.TIMINGS_FILE, batch_size=args.batch_size) as tempos:
+
+            def extrair(pdf_files, hashes):
+                resultados = extraction.process_files(cache, pdf_files, hashes, version, sink, args.batch_size,
+                                                      args.workers, tempos, textos,
+                                                      extraction.limits_from_args(args),
+                                                      extraction.retry_backend_from_args(args), dedup,
+                                                      backend=args.backend, page_mode=args.page_mode,
+                                                      text_cache=args.text_cache)
+                for _pdf, data, error in resultados:
+                    # Duplicatas não são enviadas nem indexadas; o canônico é
+                    # regravado no fim com a lista delas e passa de novo pelas filas
+                    if error is None and not is_duplicate(data):
+                        extraidos.put(data)
+
+            if args.watch:
+                signal.signal(signal.SIGTERM, _encerrar)
+            extrair(pdf_files, hashes)
+
+            if args.watch:
+                logger.info(f"Monitorando {extraction.RAW_DATA_DIR} a cada {args.intervalo:g} s (Ctrl+C encerra)")
+                for alterados in watch_changes(extraction.RAW_DATA_DIR, args.intervalo, inicial):
+                    # O cache descarta os que só tiveram o mtime alterado
+                    pdf_files, hashes = extraction.pending_files(cache, version, alterados)
+                    if pdf_files:
+                        logger.info(f"{len(pdf_files)} PDF(s) novo(s) ou alterado(s)")
+                        extrair(pdf_files, hashes)
+    except KeyboardInterrupt:
+        logger.info("Encerrando o modo watch...")
+    finally:
+        extraidos.put(DONE)
+        for etapa in etapas:
+            etapa.join()
+        textos.close()
+
+    extraction.export_outputs()
+    counts = cache.counts()
+    cache.close()
+    if index_stats["totais"]:
+        # Agregados do corpus inteiro, não só dos documentos desta execução
+        indexer.publicar_geracao(es, extraction.OUTPUT_JSONL)
+
+    totais = index_stats["totais"]
+    logger.info("Pipeline finalizado.")
+    logger.info(f"Extração: {counts.get(STATUS_OK, 0)} ok no cache | {counts.get(STATUS_FAILED, 0)} falhas | "
+                f"{counts.get(STATUS_DUPLICATE, 0)} duplicatas")
+    logger.info(f"Upload: {upload_stats['enviado']} enviados | {upload_stats['existente']} já existentes | "
+                f"{upload_stats['falha']} falhas")
+    if totais:
+        logger.info(f"Indexação: {describe_totals(totais)} | {totais['failed']} falhas")
+    if index_stats["primeiro_pesquisavel"] is not None:
+        logger.info(f"Primeiro documento pesquisável em {index_stats['primeiro_pesquisavel']:.1f} s; "
+                    f"total {time.perf_counter() - inicio:.1f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extração, upload e indexação em fluxo contínuo")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processos de extração")
+    parser.add_argument("--upload-workers", type=int, default=UPLOAD_WORKERS,
+                        help="Uploads simultâneos para o MinIO")
+    parser.add_argument("--index-threads", type=int, default=1,
+                        help="Requisições _bulk simultâneas")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE,
+                        help="Capacidade de cada fila entre etapas (limita a memória)")
+    parser.add_argument("--batch-size", type=int, default=50,
+                        help="Documentos entre cada fsync do JSONL e commit do cache de extração")
+    parser.add_argument("--bulk-docs", type=int, default=indexer.BULK_MAX_DOCS,
+                        help="Máximo de documentos por lote do _bulk")
+    parser.add_argument("--bulk-mb", type=float, default=indexer.BULK_MAX_MB,
+                        help="Máximo de MB por lote do _bulk")
+    parser.add_argument("--backend", choices=list(BACKENDS), default=extraction.DEFAULT_BACKEND)
+    parser.add_argument("--page-mode", choices=PAGE_MODES, default=extraction.DEFAULT_PAGE_MODE)
+    parser.add_argument("--text-cache", action="store_true")
+    extraction.add_limit_arguments(parser)
+    extraction.add_dedup_arguments(parser)
+    parser.add_argument("--force-upload", action="store_true",
+                        help="Reenvia os PDFs mesmo que já estejam no bucket")
+    parser.add_argument("--watch", action="store_true",
+                        help="Depois dos pendentes, continua monitorando a pasta de PDFs até Ctrl+C/SIGTERM")
+    parser.add_argument("--intervalo", type=float, default=WATCH_INTERVAL,
+                        help="Segundos entre verificações da pasta no modo --watch")
+    run_pipeline(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
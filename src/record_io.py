@@ -0,0 +1,285 @@
+import csv
+import hashlib
+import json
+import os
+import textwrap
+
+import ijson
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# Backend C do ijson (yajl2_c) sempre que estiver instalado; se a extensão não
+# foi compilada, o ijson cairia silenciosamente no backend em Python puro,
+# várias vezes mais lento.
+try:
+    ijson = ijson.get_backend("yajl2_c")
+except ImportError:
+    pass
+
+IJSON_BACKEND = ijson.backend
+
+# =========================
+# LEITURA
+# =========================
+
+def iter_records(path):
+    """
+    Lê registros de forma incremental.
+
+    Aceita tanto JSONL (um registro por linha) quanto um array JSON, que é
+    percorrido com ijson sem carregar o arquivo inteiro em memória.
+    """
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Linha incompleta de uma execução interrompida
+                    continue
+    else:
+        with open(path, "rb") as f:
+            yield from ijson.items(f, "item", use_float=True)
+
+
+# Registro que marca um PDF removido da origem (ver
+# extract_metadata.propagate_removals): como última versão de uma chave, faz
+# o documento sumir das leituras por versão mais recente.
+REMOVED_FIELD = "removido"
+
+
+def tombstone(source_filename):
+    return {"source_filename": source_filename, REMOVED_FIELD: True}
+
+
+def is_tombstone(record):
+    return bool(record.get(REMOVED_FIELD))
+
+
+def _last_occurrences(path, key):
+    """Mapeia cada chave para o índice da sua última ocorrência no arquivo."""
+    last = {}
+    for idx, record in enumerate(iter_records(path)):
+        last[record.get(key)] = idx
+    return last
+
+
+def iter_latest_records(path, key="source_filename"):
+    """
+    Como `iter_records`, mas mantém só a última versão de cada registro.
+
+    Útil para JSONL append-only, onde um documento reprocessado aparece de
+    novo no fim do arquivo. Só as chaves ficam em memória, nunca os textos.
+    Chaves cuja última versão é um tombstone (documento removido) não saem.
+    """
+    last = _last_occurrences(path, key)
+    for idx, record in enumerate(iter_records(path)):
+        if last.get(record.get(key)) == idx and not is_tombstone(record):
+            yield record
+
+
+def read_records(path, key="source_filename"):
+    """
+    Registros de entrada de uma etapa: array JSON ou JSONL da extração
+    (append-only, então só a última versão de cada registro vale).
+    """
+    if path.endswith(".jsonl"):
+        return iter_latest_records(path, key)
+    return iter_records(path)
+
+
+# =========================
+# IDENTIDADE
+# =========================
+
+def document_id(record):
+    """
+    _id estável de um documento: hash do nome do PDF.
+
+    Não depende do conteúdo, então um PDF corrigido substitui o documento
+    anterior em vez de criar outro.
+    """
+    name = record.get("source_filename") or ""
+    return hashlib.sha1(name.encode("utf-8")).hexdigest()
+
+
+def fingerprint(record):
+    """Hash do conteúdo do registro (independe da ordem das chaves)."""
+    payload = json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+# =========================
+# SINK JSONL
+# =========================
+
+class _FileLock:
+    """flock exclusivo sobre um arquivo aberto, como gerenciador de contexto."""
+
+    def __init__(self, f):
+        self.f = f
+
+    def __enter__(self):
+        fcntl.flock(self.f, fcntl.LOCK_EX)
+        return self.f
+
+    def __exit__(self, exc_type, exc, tb):
+        fcntl.flock(self.f, fcntl.LOCK_UN)
+
+
+class JsonlSink:
+    """
+    Saída append-only: um registro JSON por linha.
+
+    Cada documento custa uma escrita do tamanho do próprio registro (em vez de
+    reescrever todos os arquivos de saída). O fsync acontece a cada
+    `batch_size` registros. Ao abrir, uma linha final incompleta deixada por
+    uma execução interrompida é descartada, então o arquivo sempre termina no
+    último registro completo.
+
+    Com `shared=True` vários processos podem anexar ao mesmo arquivo (extração
+    distribuída, work_queue.py): as linhas ficam em memória até o flush, que
+    grava o lote inteiro sob flock exclusivo e descarta antes uma linha
+    incompleta deixada por um processo que caiu no meio da escrita.
+    """
+
+    def __init__(self, path, batch_size=50, shared=False):
+        if shared and fcntl is None:
+            raise RuntimeError("JsonlSink compartilhado requer fcntl (Linux/macOS)")
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.shared = shared
+        self._pending = 0
+        self._lines = []
+        if shared:
+            self._file = open(path, "a", encoding="utf-8")
+            with _FileLock(self._file):
+                self._truncate_partial_line()
+        else:
+            self._truncate_partial_line()
+            self._file = open(path, "a", encoding="utf-8")
+
+    def _truncate_partial_line(self):
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, "rb+") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size == 0:
+                return
+
+            # Procura o último "\n" a partir do fim, em blocos
+            pos = size
+            block = 64 * 1024
+            while pos > 0:
+                start = max(0, pos - block)
+                f.seek(start)
+                chunk = f.read(pos - start)
+                nl = chunk.rfind(b"\n")
+                if nl != -1:
+                    end = start + nl + 1
+                    break
+                pos = start
+            else:
+                end = 0
+
+            if end < size:
+                f.truncate(end)
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        if self.shared:
+            self._lines.append(line)
+        else:
+            self._file.write(line)
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.shared:
+            if self._lines:
+                with _FileLock(self._file):
+                    self._truncate_partial_line()
+                    self._file.write("".join(self._lines))
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                self._lines = []
+        else:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# =========================
+# EXPORTAÇÃO
+# =========================
+
+def write_json_array(records, json_path):
+    """
+    Grava um iterável de registros como array JSON (indent=4), em streaming.
+
+    O resultado é idêntico ao de `json.dump(lista, indent=4)`. A escrita vai
+    para um arquivo temporário que substitui o destino só no final.
+    """
+    tmp_path = json_path + ".tmp"
+    total = 0
+
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write("[\n" if total == 0 else ",\n")
+            f.write(textwrap.indent(json.dumps(record, ensure_ascii=False, indent=4), "    "))
+            total += 1
+        f.write("\n]" if total else "[]")
+
+    os.replace(tmp_path, json_path)
+    return total
+
+
+def write_csv(records, csv_path, drop_fields=("inteiro_teor",)):
+    """Grava os registros em CSV (UTF-8 com BOM), sem os campos de texto longo."""
+    tmp_path = csv_path + ".tmp"
+    writer = None
+    total = 0
+
+    with open(tmp_path, "w", encoding="utf-8-sig", newline="") as f:
+        for record in records:
+            row = {k: v for k, v in record.items() if k not in drop_fields}
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(row.keys()))
+                writer.writeheader()
+            writer.writerow(row)
+            total += 1
+
+    if total:
+        os.replace(tmp_path, csv_path)
+    else:
+        os.remove(tmp_path)
+    return total
+
+
+def export_json(jsonl_path, json_path, key="source_filename"):
+    return write_json_array(iter_latest_records(jsonl_path, key), json_path)
+
+
+def export_csv(jsonl_path, csv_path, key="source_filename"):
+    return write_csv(iter_latest_records(jsonl_path, key), csv_path)
@@ -0,0 +1,419 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from elasticsearch import Elasticsearch, NotFoundError
+
+from dedup import is_duplicate
+from normalization import normalize_date
+
+# =========================
+# SERVIÇO DE BUSCA
+# =========================
+#
+# Camada de consulta sobre o alias natjus_notas, para que os consumidores
+# (dashboard, scripts) não montem as próprias queries:
+#
+#   - construtores de query por tipo de campo (keyword, texto, data), que
+#     validam campos e valores antes de qualquer requisição;
+#   - cache de resultados LRU com expiração (TTL), invalidado quando o
+#     indexador publica uma nova geração do índice;
+#   - tabelas de agregados (por cid, desfecho, tipo, mês de data_do_envio e
+#     desfecho por cid) calculadas pelo indexador a cada execução e gravadas
+#     em META_INDEX: o dashboard lê um documento pronto em vez de rodar as
+#     agregações no cluster a cada carga.
+#
+# O indexador (02_index_legacy.py, pipeline.py) chama publish_generation no
+# fim de cada execução; o serviço confere a geração no máximo a cada
+# GENERATION_CHECK_INTERVAL segundos.
+#
+# Uso como serviço HTTP (JSON):
+#   python search.py --porta 8000
+#   GET /buscar?q=dupilumabe&cid=L20.8&desfecho=Favorável&de=2023-01-01&ate=2023-12-31&pagina=2
+#   GET /agregados
+#   GET /saude
+
+ELASTIC_HOST = os.getenv("ELASTICSEARCH_URL", "http://127.0.0.1:9200")
+INDEX_NAME = "natjus_notas"
+META_INDEX = "natjus_notas_meta"   # geração e agregados; fora do padrão natjus_notas-*
+GENERATION_DOC = "geracao"
+AGGREGATES_DOC = "agregados"
+
+CACHE_SIZE = 1024                 # resultados guardados
+CACHE_TTL = 300                   # segundos
+GENERATION_CHECK_INTERVAL = 5     # segundos entre consultas à geração
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+SERVICE_PORT = 8000
+
+KEYWORD_FIELDS = ("cid", "desfecho", "tipo_arquivo", "processo", "source_filename", "duplicatas",
+                  "n_nota_tecnica.exato", "Assunto.exato")
+# Campos de texto (analisador portuguese) e peso de cada um na busca livre
+TEXT_FIELDS = {
+    "objeto": 3,
+    "medicamento_e_insumo": 3,
+    "Assunto": 2,
+    "n_nota_tecnica": 2,
+    "classificador_do_objeto": 1,
+    "informacao_complementar": 1,
+    "inteiro_teor": 1,
+}
+DATE_FIELD = "data_do_envio"
+SORTS = ("relevancia", "data")
+
+# Tabelas materializadas: nome -> campo agrupado
+AGGREGATE_FIELDS = {"por_cid": "cid", "por_desfecho": "desfecho", "por_tipo_arquivo": "tipo_arquivo"}
+
+# =========================
+# CONSTRUTORES DE QUERY
+# =========================
+
+def keyword_filter(field, values):
+    """term/terms exato sobre um campo keyword."""
+    if field not in KEYWORD_FIELDS:
+        raise ValueError(f"campo keyword desconhecido: {field}")
+    values = [values] if isinstance(values, str) else list(values)
+    if not values or not all(isinstance(value, str) and value.strip() for value in values):
+        raise ValueError(f"valor inválido para {field}: {values!r}")
+    if len(values) == 1:
+        return {"term": {field: values[0]}}
+    return {"terms": {field: values}}
+
+
+def text_query(text, fields=None):
+    """Busca livre (todas as palavras) nos campos de texto, com os pesos de TEXT_FIELDS."""
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError("texto da busca vazio")
+    fields = fields or list(TEXT_FIELDS)
+    unknown = [field for field in fields if field not in TEXT_FIELDS]
+    if unknown:
+        raise ValueError(f"campo de texto desconhecido: {', '.join(unknown)}")
+    return {"multi_match": {"query": text.strip(), "fields": [f"{field}^{TEXT_FIELDS[field]}" for field in fields],
+                            "operator": "and"}}
+
+
+def date_range(start=None, end=None):
+    """Intervalo fechado de data_do_envio; aceita os formatos de normalize_date."""
+    bounds = {}
+    for key, value in (("gte", start), ("lte", end)):
+        if value in (None, ""):
+            continue
+        iso = normalize_date(value)
+        if iso is None:
+            raise ValueError(f"data inválida: {value!r}")
+        bounds[key] = iso
+    if not bounds:
+        raise ValueError("intervalo de datas vazio")
+    if "gte" in bounds and "lte" in bounds and bounds["gte"] > bounds["lte"]:
+        raise ValueError(f"intervalo de datas invertido: {bounds['gte']} > {bounds['lte']}")
+    return {"range": {DATE_FIELD: dict(bounds, format="yyyy-MM-dd")}}
+
+
+class SearchQuery:
+    """
+    Busca validada na construção. `filters` é {campo keyword: valor ou lista
+    de valores}; `page` começa em 1.
+    """
+
+    def __init__(self, text=None, filters=None, date_from=None, date_to=None, page=1,
+                 size=DEFAULT_PAGE_SIZE, sort="relevancia"):
+        if sort not in SORTS:
+            raise ValueError(f"ordenação desconhecida: {sort} (use {', '.join(SORTS)})")
+        if not 1 <= size <= MAX_PAGE_SIZE:
+            raise ValueError(f"tamanho de página fora de 1..{MAX_PAGE_SIZE}: {size}")
+        if page < 1:
+            raise ValueError(f"página inválida: {page}")
+
+        self.text = text.strip() if text else None
+        self.must = [text_query(self.text)] if self.text else []
+        self.filters = [keyword_filter(field, values) for field, values in sorted((filters or {}).items())]
+        if date_from or date_to:
+            self.filters.append(date_range(date_from, date_to))
+        self.page = page
+        self.size = size
+        self.sort = sort
+
+    @classmethod
+    def from_params(cls, params):
+        """A partir da query string (parse_qs) do serviço HTTP."""
+        def first(name, default=None):
+            return params.get(name, [default])[0]
+
+        try:
+            page = int(first("pagina", 1))
+            size = int(first("tamanho", DEFAULT_PAGE_SIZE))
+        except ValueError:
+            raise ValueError("pagina e tamanho devem ser números inteiros") from None
+        filters = {field: params[field] for field in KEYWORD_FIELDS if field in params}
+        return cls(first("q"), filters, first("de"), first("ate"), page, size, first("ordem", "relevancia"))
+
+    def body(self):
+        body = {
+            "query": {"bool": {"must": self.must or [{"match_all": {}}], "filter": self.filters}},
+            "from": (self.page - 1) * self.size,
+            "size": self.size,
+            "_source": {"excludes": ["inteiro_teor", "fingerprint"]},
+            "track_total_hits": True,
+        }
+        if self.sort == "data":
+            body["sort"] = [{DATE_FIELD: {"order": "desc", "missing": "_last"}}, "_score"]
+        if self.text:
+            body["highlight"] = {"fields": {"inteiro_teor": {"fragment_size": 200, "number_of_fragments": 2}}}
+        return body
+
+    def key(self):
+        return json.dumps(self.body(), sort_keys=True, ensure_ascii=False)
+
+# =========================
+# CACHE
+# =========================
+
+class ResultCache:
+    """LRU com expiração por idade, seguro entre threads."""
+
+    def __init__(self, size=CACHE_SIZE, ttl=CACHE_TTL, clock=time.monotonic):
+        self.size = size
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()   # chave -> (instante de gravação, valor)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and self.clock() - entry[0] <= self.ttl:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (self.clock(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {"entradas": len(self.entries), "acertos": self.hits, "faltas": self.misses}
+
+# =========================
+# AGREGADOS / GERAÇÃO (lado do indexador)
+# =========================
+
+class AggregateBuilder:
+    """
+    Tabelas de agregados acumuladas registro a registro, para serem montadas
+    na mesma passada que indexa os registros (observe) em vez de reler a
+    entrada depois.
+    """
+
+    def __init__(self):
+        self.tables = {name: Counter() for name in AGGREGATE_FIELDS}
+        self.by_month = Counter()
+        self.outcomes_by_cid = defaultdict(Counter)
+        self.total = 0
+
+    def add(self, record):
+        if is_duplicate(record):
+            return
+        self.total += 1
+        for name, field in AGGREGATE_FIELDS.items():
+            self.tables[name][record.get(field) or "(vazio)"] += 1
+        iso = normalize_date(record.get(DATE_FIELD))
+        self.by_month[iso[:7] if iso else "(sem data)"] += 1
+        self.outcomes_by_cid[record.get("cid") or "(vazio)"][record.get("desfecho") or "(vazio)"] += 1
+
+    def observe(self, records):
+        """Repassa `records` contando cada um antes de entregá-lo."""
+        for record in records:
+            self.add(record)
+            yield record
+
+    def result(self):
+        aggregates = {"total": self.total}
+        aggregates.update({name: dict(counts.most_common()) for name, counts in self.tables.items()})
+        aggregates["por_mes"] = dict(sorted(self.by_month.items()))
+        aggregates["desfecho_por_cid"] = {cid: dict(counts.most_common())
+                                          for cid, counts in sorted(self.outcomes_by_cid.items())}
+        return aggregates
+
+
+def build_aggregates(records):
+    """Tabelas de contagem a partir dos registros de entrada da indexação, em uma passada."""
+    builder = AggregateBuilder()
+    for record in records:
+        builder.add(record)
+    return builder.result()
+
+
+def ensure_meta_index(es):
+    if not es.indices.exists(index=META_INDEX):
+        # Sem mapeamento dos campos: as tabelas têm chaves arbitrárias (CIDs, meses)
+        es.indices.create(index=META_INDEX, settings={"number_of_shards": 1, "number_of_replicas": 0},
+                          mappings={"enabled": False})
+
+
+def publish_generation(es, aggregates=None):
+    """
+    Grava as tabelas de agregados (se informadas) e depois a nova geração,
+    que invalida os caches do serviço. Retorna o identificador da geração.
+    """
+    ensure_meta_index(es)
+    now = datetime.now()
+    if aggregates is not None:
+        es.index(index=META_INDEX, id=AGGREGATES_DOC,
+                 document=dict(aggregates, atualizado_em=now.isoformat(timespec="seconds")))
+    generation = now.strftime("%Y%m%d%H%M%S%f")
+    es.index(index=META_INDEX, id=GENERATION_DOC,
+             document={"geracao": generation, "atualizado_em": now.isoformat(timespec="seconds")},
+             refresh=True)
+    return generation
+
+# =========================
+# SERVIÇO
+# =========================
+
+class SearchService:
+    def __init__(self, es, index=INDEX_NAME, cache=None, check_interval=GENERATION_CHECK_INTERVAL,
+                 clock=time.monotonic):
+        self.es = es
+        self.index = index
+        self.cache = cache if cache is not None else ResultCache(clock=clock)
+        self.check_interval = check_interval
+        self.clock = clock
+        self.generation = None
+        self.checked_at = None
+        self.lock = threading.Lock()
+
+    def _meta(self, doc_id):
+        try:
+            return self.es.get(index=META_INDEX, id=doc_id)["_source"]
+        except NotFoundError:
+            return None
+
+    def current_generation(self):
+        """Geração publicada pelo indexador; limpa o cache quando ela muda."""
+        with self.lock:
+            now = self.clock()
+            if self.checked_at is not None and now - self.checked_at < self.check_interval:
+                return self.generation
+            self.checked_at = now
+            generation = (self._meta(GENERATION_DOC) or {}).get("geracao")
+            if generation != self.generation:
+                self.cache.clear()
+                self.generation = generation
+            return generation
+
+    def _cached(self, key, compute):
+        self.current_generation()
+        result = self.cache.get(key)
+        if result is None:
+            result = compute()
+            self.cache.put(key, result)
+        return result
+
+    def search(self, query):
+        def compute():
+            response = self.es.search(index=self.index, body=query.body())
+            return {
+                "total": response["hits"]["total"]["value"],
+                "pagina": query.page,
+                "tamanho": query.size,
+                "resultados": [
+                    dict(hit["_source"], _id=hit["_id"], _score=hit.get("_score"),
+                         **({"trechos": hit["highlight"].get("inteiro_teor", [])} if "highlight" in hit else {}))
+                    for hit in response["hits"]["hits"]
+                ],
+            }
+        return self._cached(("busca", query.key()), compute)
+
+    def aggregates(self):
+        """Tabelas materializadas pelo indexador (vazio se ele ainda não publicou nenhuma)."""
+        return self._cached(("agregados",), lambda: self._meta(AGGREGATES_DOC) or {})
+
+    def outcomes_by_cid(self, cid):
+        return self.aggregates().get("desfecho_por_cid", {}).get(cid, {})
+
+    def health(self):
+        return {"indice": self.index, "geracao": self.current_generation(), "cache": self.cache.stats()}
+
+# =========================
+# HTTP
+# =========================
+
+class _Handler(BaseHTTPRequestHandler):
+    service = None
+
+    def reply(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        try:
+            if url.path == "/buscar":
+                return self.reply(200, self.service.search(SearchQuery.from_params(params)))
+            if url.path == "/agregados":
+                return self.reply(200, self.service.aggregates())
+            if url.path == "/saude":
+                return self.reply(200, self.service.health())
+            return self.reply(404, {"erro": f"rota desconhecida: {url.path}"})
+        except ValueError as e:
+            return self.reply(400, {"erro": str(e)})
+        except Exception as e:
+            return self.reply(502, {"erro": f"falha no Elasticsearch: {e}"})
+
+    def log_message(self, format, *args):
+        print(f"{self.address_string()} {format % args}")
+
+
+def serve(service, host="127.0.0.1", port=SERVICE_PORT):
+    handler = type("Handler", (_Handler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"Serviço de busca em http://{host}:{server.server_address[1]} (índice {service.index})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API de busca com cache sobre o índice natjus_notas")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=SERVICE_PORT)
+    parser.add_argument("--cache-tamanho", type=int, default=CACHE_SIZE,
+                        help="Máximo de resultados em cache")
+    parser.add_argument("--cache-ttl", type=float, default=CACHE_TTL,
+                        help="Segundos até um resultado em cache expirar")
+    args = parser.parse_args()
+
+    es = Elasticsearch(ELASTIC_HOST, request_timeout=30)
+    serve(SearchService(es, cache=ResultCache(args.cache_tamanho, args.cache_ttl)), args.host, args.porta)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import multiprocessing
+import os
+import time
+from collections import deque
+from multiprocessing.connection import wait
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - dependência opcional
+    psutil = None
+
+# =========================
+# WORKERS SUPERVISIONADOS
+# =========================
+#
+# Pool de processos em que cada worker recebe um documento por vez, então o
+# supervisor sabe sempre qual arquivo cada processo está tratando e pode:
+#
+#   - matar o worker que passar de `timeout` segundos no mesmo documento
+#     (pdfminer preso em loop);
+#   - matar o worker cuja memória residente passar de `max_rss_mb`
+#     (PDFs que consomem gigabytes);
+#   - reciclar o worker a cada `max_tasks` documentos, devolvendo ao sistema
+#     a memória que o processo acumula ao longo de execuções longas.
+#
+# O documento afetado sai com WorkerLimitExceeded (ou erro de worker
+# encerrado, se o processo morrer sozinho) e um worker novo assume o lugar;
+# os demais documentos seguem normalmente.
+#
+# A memória é lida com psutil, se instalado, ou de /proc (Linux). Sem
+# nenhum dos dois, o limite de memória não é aplicado.
+
+POLL_INTERVAL = 0.5   # segundos entre verificações de tempo e memória
+
+
+class WorkerLimitExceeded(Exception):
+    """Documento interrompido por tempo ou memória."""
+
+
+class DocumentTimeout(WorkerLimitExceeded):
+    pass
+
+
+class MemoryLimitExceeded(WorkerLimitExceeded):
+    pass
+
+
+class WorkerDied(Exception):
+    pass
+
+
+def rss_mb(pid):
+    """Memória residente do processo em MB, ou None se não for possível medir."""
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss / 2 ** 20
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _worker_main(conn, function, options):
+    while True:
+        task = conn.recv()
+        if task is None:
+            return
+        index, item = task
+        try:
+            conn.send((index, function(item, **options), None))
+        except Exception as e:
+            try:
+                conn.send((index, None, e))
+            except Exception:
+                # Exceção que não pode ser serializada
+                conn.send((index, None, RuntimeError(repr(e))))
+
+
+class _Worker:
+    def __init__(self, context, function, options):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, function, options), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.task = None      # (índice, item) em processamento
+        self.started = None
+        self.completed = 0
+
+    def assign(self, index, item):
+        self.task = (index, item)
+        self.started = time.monotonic()
+        self.conn.send(self.task)
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+
+
+class SupervisedPool:
+    def __init__(self, function, workers=1, timeout=None, max_rss_mb=None, max_tasks=None, log=None, **options):
+        self.function = function
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.max_rss_mb = max_rss_mb
+        self.max_tasks = max_tasks
+        self.options = options
+        self.log = log
+        self.context = multiprocessing.get_context()
+        self.recycled = 0
+        self.killed = 0
+
+    def _spawn(self):
+        return _Worker(self.context, self.function, self.options)
+
+    def _note(self, message):
+        if self.log is not None:
+            self.log(message)
+
+    def _replace(self, pool, worker, kill):
+        """Troca `worker` por um processo novo na mesma posição e retorna o novo."""
+        if kill:
+            worker.kill()
+            worker.conn.close()
+        else:
+            worker.stop()
+        new = self._spawn()
+        pool[pool.index(worker)] = new
+        return new
+
+    def _check_limits(self, worker):
+        """Erro a atribuir ao documento do worker, se ele passou de algum limite."""
+        elapsed = time.monotonic() - worker.started
+        if self.timeout and elapsed > self.timeout:
+            return DocumentTimeout(f"tempo limite de {self.timeout:g} s excedido")
+        if self.max_rss_mb:
+            rss = rss_mb(worker.process.pid)
+            if rss is not None and rss > self.max_rss_mb:
+                return MemoryLimitExceeded(f"memória do worker em {rss:.0f} MB (limite {self.max_rss_mb:g} MB) "
+                                           f"após {elapsed:.1f} s")
+        return None
+
+    def _collect(self, pool, worker, done):
+        index, item = worker.task
+        try:
+            _index, result, error = worker.conn.recv()
+        except (EOFError, OSError):
+            worker.process.join(1)
+            code = worker.process.exitcode
+            self._note(f"Worker encerrado inesperadamente (código {code}) em {item}")
+            done[index] = (item, None, WorkerDied(f"worker encerrado inesperadamente (código {code})"))
+            self._replace(pool, worker, kill=True)
+            return
+
+        done[index] = (item, result, error)
+        worker.task = None
+        worker.completed += 1
+        if self.max_tasks and worker.completed >= self.max_tasks:
+            self.recycled += 1
+            self._replace(pool, worker, kill=False)
+        elif self.max_rss_mb and (rss_mb(worker.process.pid) or 0) > self.max_rss_mb:
+            # Ocioso e ainda acima do limite: a memória não volta sem reiniciar
+            self.recycled += 1
+            self._replace(pool, worker, kill=False)
+
+    def imap(self, items):
+        """
+        Gera (item, resultado, erro) na mesma ordem de `items`, com no máximo
+        2 * workers documentos entre submetidos e prontos para sair.
+        """
+        pending = deque(enumerate(items))
+        window = self.workers * 2
+        done = {}
+        next_out = 0
+        pool = [self._spawn() for _ in range(min(self.workers, len(pending)))]
+
+        try:
+            while True:
+                for worker in pool:
+                    in_flight = sum(w.task is not None for w in pool) + len(done)
+                    if worker.task is None and pending and in_flight < window:
+                        worker.assign(*pending.popleft())
+
+                busy = [w for w in pool if w.task is not None]
+                if not busy and not pending:
+                    break
+
+                ready = wait([w.conn for w in busy], timeout=POLL_INTERVAL)
+                for worker in busy:
+                    if worker.conn in ready:
+                        self._collect(pool, worker, done)
+                        continue
+
+                    error = self._check_limits(worker)
+                    if error is not None:
+                        index, item = worker.task
+                        self.killed += 1
+                        self._note(f"{item}: {error}; worker reiniciado")
+                        done[index] = (item, None, error)
+                        self._replace(pool, worker, kill=True)
+
+                while next_out in done:
+                    yield done.pop(next_out)
+                    next_out += 1
+        finally:
+            for worker in pool:
+                if worker.task is not None:
+                    worker.kill()
+                    worker.conn.close()
+                else:
+                    worker.stop()
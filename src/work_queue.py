@@ -0,0 +1,265 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# =========================
+# FILA DE TRABALHO COM LEASES
+# =========================
+#
+# Permite que vários extratores (containers ou hosts com a mesma pasta
+# processed_data montada) dividam o corpus sem processar o mesmo PDF ao
+# mesmo tempo:
+#
+#   pending --claim--> leased --complete--> done | failed
+#                        |
+#                        +-- lease vencido (worker caiu) --> volta a ser reivindicável
+#
+# Cada worker reivindica alguns arquivos por vez e uma thread de heartbeat
+# renova o lease deles enquanto o processo estiver vivo. Se o processo morre,
+# o lease vence em `lease_seconds` e outro worker assume os arquivos. Um
+# arquivo reivindicado MAX_ATTEMPTS vezes sem conclusão (derruba o processo
+# toda vez) sai da fila como `failed`.
+#
+# A fila fica num SQLite em modo WAL ao lado do cache de extração; as
+# transações são curtas (reivindicar, concluir, renovar). Isso exige que os
+# workers vejam o mesmo sistema de arquivos local (volume do Docker no mesmo
+# host); SQLite e flock não são confiáveis sobre NFS/SMB.
+
+STATE_PENDING = "pending"
+STATE_LEASED = "leased"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+
+LEASE_SECONDS = 120
+MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS work_items (
+    source_filename TEXT PRIMARY KEY,
+    sha256          TEXT NOT NULL,
+    version         TEXT NOT NULL,
+    state           TEXT NOT NULL,
+    owner           TEXT,
+    lease_until     REAL,
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    error           TEXT,
+    updated_at      TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_work_items_state ON work_items (state, lease_until);
+
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id    TEXT PRIMARY KEY,
+    started_at   TEXT NOT NULL,
+    heartbeat_at TEXT NOT NULL,
+    completed    INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def default_worker_id():
+    """hostname-pid: único entre containers (cada um tem o próprio hostname)."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _now_iso():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+@contextmanager
+def file_lock(path):
+    """Lock exclusivo entre processos (flock) sobre `path`, criado se preciso."""
+    if fcntl is None:
+        raise RuntimeError("file_lock requer fcntl (Linux/macOS)")
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class WorkQueue:
+    def __init__(self, db_path, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS, clock=time.time):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.clock = clock
+        # Autocommit: cada operação abre e fecha a própria transação
+        self.conn = sqlite3.connect(db_path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def _transaction(self):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    # ---------- produtor ----------
+
+    def enqueue(self, items, version):
+        """
+        Acrescenta (source_filename, sha256) como pendentes. Arquivos já
+        concluídos só voltam para a fila se o conteúdo ou a versão do extrator
+        mudaram, ou se falharam; arquivos em lease não são tocados.
+        """
+        now = _now_iso()
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT INTO work_items (source_filename, sha256, version, state, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (source_filename) DO UPDATE SET "
+                "  sha256 = excluded.sha256, version = excluded.version, state = excluded.state, "
+                "  owner = NULL, lease_until = NULL, attempts = 0, error = NULL, updated_at = excluded.updated_at "
+                "WHERE work_items.state = ? "
+                "   OR (work_items.state = ? AND (work_items.sha256 <> excluded.sha256 "
+                "                                 OR work_items.version <> excluded.version))",
+                [(name, sha, version, STATE_PENDING, now, STATE_FAILED, STATE_DONE) for name, sha in items],
+            )
+            return conn.total_changes - before
+
+    # ---------- consumidor ----------
+
+    def register(self, worker_id):
+        now = _now_iso()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO workers (worker_id, started_at, heartbeat_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (worker_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at",
+                (worker_id, now, now),
+            )
+
+    def claim(self, worker_id, limit=1):
+        """
+        Reivindica até `limit` arquivos pendentes ou com lease vencido, em
+        ordem de nome. Retorna [(source_filename, sha256)].
+        """
+        now = self.clock()
+        with self._transaction() as conn:
+            # Vencidos que já esgotaram as tentativas: derrubam o worker toda vez
+            conn.execute(
+                "UPDATE work_items SET state = ?, owner = NULL, lease_until = NULL, updated_at = ?, "
+                "error = 'lease vencido ' || attempts || ' vez(es); worker interrompido durante a extração' "
+                "WHERE state = ? AND lease_until < ? AND attempts >= ?",
+                (STATE_FAILED, _now_iso(), STATE_LEASED, now, self.max_attempts),
+            )
+            rows = conn.execute(
+                "SELECT source_filename, sha256 FROM work_items "
+                "WHERE state = ? OR (state = ? AND lease_until < ?) "
+                "ORDER BY source_filename LIMIT ?",
+                (STATE_PENDING, STATE_LEASED, now, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE work_items SET state = ?, owner = ?, lease_until = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE source_filename = ?",
+                [(STATE_LEASED, worker_id, now + self.lease_seconds, _now_iso(), name) for name, _sha in rows],
+            )
+        return rows
+
+    def complete(self, worker_id, source_filename, error=None):
+        """Conclui um arquivo do worker; ignorado se o lease já passou para outro."""
+        state = STATE_DONE if error is None else STATE_FAILED
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE work_items SET state = ?, error = ?, lease_until = NULL, updated_at = ? "
+                "WHERE source_filename = ? AND owner = ?",
+                (state, None if error is None else str(error), _now_iso(), source_filename, worker_id),
+            ).rowcount
+            if updated and error is None:
+                conn.execute("UPDATE workers SET completed = completed + 1 WHERE worker_id = ?", (worker_id,))
+        return bool(updated)
+
+    def heartbeat(self, worker_id):
+        """Renova os leases do worker; retorna quantos arquivos ele ainda segura."""
+        with self._transaction() as conn:
+            renewed = conn.execute(
+                "UPDATE work_items SET lease_until = ? WHERE owner = ? AND state = ?",
+                (self.clock() + self.lease_seconds, worker_id, STATE_LEASED),
+            ).rowcount
+            conn.execute("UPDATE workers SET heartbeat_at = ? WHERE worker_id = ?", (_now_iso(), worker_id))
+        return renewed
+
+    def release(self, worker_id):
+        """Devolve à fila os arquivos ainda em lease do worker (saída normal ou interrompida)."""
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE work_items SET state = ?, owner = NULL, lease_until = NULL, attempts = attempts - 1, "
+                "updated_at = ? WHERE owner = ? AND state = ?",
+                (STATE_PENDING, _now_iso(), worker_id, STATE_LEASED),
+            ).rowcount
+
+    # ---------- consulta ----------
+
+    def outstanding(self):
+        """Arquivos ainda por fazer: pendentes ou em lease (vivo ou vencido)."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM work_items WHERE state IN (?, ?)", (STATE_PENDING, STATE_LEASED)
+            ).fetchone()[0]
+
+    def counts(self):
+        with self.lock:
+            return dict(self.conn.execute("SELECT state, COUNT(*) FROM work_items GROUP BY state").fetchall())
+
+    def workers(self):
+        """(worker_id, início, último heartbeat, concluídos), do mais recente para o mais antigo."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT worker_id, started_at, heartbeat_at, completed FROM workers ORDER BY heartbeat_at DESC"
+            ).fetchall()
+
+    def failed(self):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT source_filename, error FROM work_items WHERE state = ? ORDER BY source_filename",
+                (STATE_FAILED,),
+            ).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+class Heartbeat:
+    """Thread que renova os leases de `worker_id` a cada terço do lease."""
+
+    def __init__(self, queue, worker_id, log=None):
+        self.queue = queue
+        self.worker_id = worker_id
+        self.log = log
+        self.interval = queue.lease_seconds / 3
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="heartbeat", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.queue.heartbeat(self.worker_id)
+            except sqlite3.Error as e:
+                # Tenta de novo no próximo intervalo; o lease ainda tem 2/3 da validade
+                if self.log is not None:
+                    self.log(f"Falha ao renovar leases de {self.worker_id}: {e}")
+
+    def __enter__(self):
+        self.queue.register(self.worker_id)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()